@@ -80,9 +80,53 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Applied to every new SQLite connection by main.sqlite.configure_sqlite_connection.
+# Set a pragma to None to keep SQLite's default, or the whole dict to {} to disable.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+
+# Report results are cached per data version (see main.caching), so entries
+# are invalidated by writes rather than by the timeout.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gerdoo',
     }
 }
 
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Holds the data version the cache keys and ETags are built from. Every
+# worker process reads it, so a write in one invalidates them all.
+
+DATA_VERSION_FILE = BASE_DIR / 'data-version'
+
+# Worker threads the async dashboard views use to run ORM aggregates concurrently.
+
+ASYNC_DB_WORKERS = 4
+
+# Background report exports: worker threads, where finished files are kept
+# (keyed by filters and data version) and how long before they are deleted.
+
+EXPORT_WORKERS = 2
+EXPORT_SPOOL_DIR = Path(BASE_DIR, 'exports')
+EXPORT_SPOOL_MAX_AGE = 24 * 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.contrib import admin
 from jalali_date.admin import ModelAdminJalaliMixin
 from .utils import (
@@ -11,6 +12,11 @@ from .models import (
     Gold,
     BackupHistory,
     Tag,
+    MonthlyCategoryTotal,
+)
+from .ledger import (
+    record_transaction,
+    reverse_transaction,
 )
 
 
@@ -182,6 +188,7 @@ class TransactionAdmin(ModelAdminJalaliMixin, admin.ModelAdmin):
     fields = (
         'kind',
         'amount',
+        'commission',
         'source',
         'source_balance_after',
         'destination',
@@ -203,6 +210,41 @@ class TransactionAdmin(ModelAdminJalaliMixin, admin.ModelAdmin):
     )
     date_hierarchy = 'date'
 
+    # Snapshots are maintained by the ledger, not typed in.
+    readonly_fields = (
+        'source_balance_after',
+        'destination_balance_after',
+    )
+
+    def save_model(self, request, obj, form, change):
+        # An edit is posted to the ledger as a reversal of the stored
+        # version followed by the new one, so balances, snapshots and
+        # checkpoints stay consistent.
+        with transaction.atomic():
+            if change:
+                stored = Transaction.objects.select_for_update().get(pk=obj.pk)
+                reverse_transaction(stored)
+                MonthlyCategoryTotal.apply(stored, sign=-1)
+
+            obj.source_balance_after = None
+            obj.destination_balance_after = None
+            super().save_model(request, obj, form, change)
+            record_transaction(obj)
+            MonthlyCategoryTotal.apply(obj)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            reverse_transaction(obj)
+            MonthlyCategoryTotal.apply(obj, sign=-1)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for obj in queryset:
+                reverse_transaction(obj)
+                MonthlyCategoryTotal.apply(obj, sign=-1)
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(BackupHistory)
 class BackupHistoryAdmin(ModelAdminJalaliMixin, admin.ModelAdmin):
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .sqlite import configure_sqlite_connection
+        from . import signals  # noqa: F401
+
+        connection_created.connect(
+            configure_sqlite_connection,
+            dispatch_uid='main.sqlite.configure_sqlite_connection',
+        )
@@ -0,0 +1,131 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+import jdatetime
+from pathlib import Path
+from functools import wraps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+
+def get_cache_timeout():
+    return getattr(settings, 'REPORT_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_version_path():
+    return Path(getattr(settings, 'DATA_VERSION_FILE', Path(settings.BASE_DIR, 'data-version')))
+
+
+def _write_data_version():
+    # The version lives in a file rather than in the per-process cache, so
+    # a write in one worker process invalidates every other one's entries.
+    # Clock and pid make it unique, so no version is ever handed out twice.
+    path = get_version_path()
+    version = f'{time.time_ns()}-{os.getpid()}'
+    temp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}')
+    temp_path.write_text(version)
+    os.replace(temp_path, path)
+    return version
+
+
+def get_data_version():
+    try:
+        return get_version_path().read_text()
+    except FileNotFoundError:
+        return _write_data_version()
+
+
+def get_data_modified():
+    """When the data version last changed."""
+    get_data_version()
+    return datetime.datetime.fromtimestamp(
+        get_version_path().stat().st_mtime,
+        tz=datetime.timezone.utc,
+    )
+
+
+def bump_data_version():
+    """Invalidates every cached report, in every process, once the current transaction commits."""
+    transaction.on_commit(_write_data_version)
+
+
+def get_cache_key(endpoint, *params):
+    # The Jalali date is part of the key because "current month" answers
+    # (and the daily average) move with the calendar, not only with writes.
+    return ':'.join(
+        [
+            'main',
+            endpoint,
+            *(str(p) for p in params),
+            str(jdatetime.date.today()),
+            f'v{get_data_version()}',
+        ]
+    )
+
+
+def get_or_compute(endpoint, params, compute):
+    """Returns the cached result of ``compute()`` for (endpoint, params, Jalali day, data version)."""
+    key = get_cache_key(endpoint, *params)
+
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, get_cache_timeout())
+    return result
+
+
+def get_data_etag(request, *args, **kwargs):
+    """Strong ETag for a read-only view: data version, Jalali day, path and query."""
+    raw = '|'.join(
+        [
+            request.path,
+            str(sorted(request.GET.lists())),
+            request.headers.get('x-requested-with', ''),
+            str(jdatetime.date.today()),
+            str(get_data_version()),
+        ]
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_data_last_modified(request, *args, **kwargs):
+    # Answers about "today" change at midnight even without writes.
+    start_of_day = timezone.localtime().replace(
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+    return max(get_data_modified(), start_of_day)
+
+
+_data_condition = condition(
+    etag_func=get_data_etag,
+    last_modified_func=get_data_last_modified,
+)
+
+
+def _drop_validators(response):
+    # Only a successful answer may be revalidated into a 304 later.
+    if response.status_code not in (200, 304):
+        response.headers.pop('ETag', None)
+        response.headers.pop('Last-Modified', None)
+    return response
+
+
+def conditional_on_data(view):
+    """Lets a read-only JSON view answer a matching If-None-Match/If-Modified-Since with 304
+    before any aggregate runs. Apply it under @login_required.
+    """
+    conditional_view = _data_condition(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return _drop_validators(conditional_view(request, *args, **kwargs))
+
+    return wrapper
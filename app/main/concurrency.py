@@ -0,0 +1,37 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_db_executor():
+    """Shared pool that bounds how many ORM calls async views run at once."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_DB_WORKERS', 4),
+                thread_name_prefix='gerdoo-db',
+            )
+    return _executor
+
+
+def run_in_pool(func, *args, **kwargs):
+    """Awaitable running ``func`` on the shared pool, each call on its own connection."""
+    def job():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(
+        job,
+        thread_sensitive=False,
+        executor=get_db_executor(),
+    )()
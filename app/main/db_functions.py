@@ -0,0 +1,34 @@
+from django.db.models import (
+    Func,
+    PositiveSmallIntegerField,
+)
+
+
+# Wrappers for the SQL functions registered by main.sqlite.register_jalali_functions,
+# e.g. Transaction.objects.values(week=JalaliWeek('date')).annotate(total=Sum('amount')).
+
+class JalaliFunc(Func):
+    arity = 1
+    output_field = PositiveSmallIntegerField()
+
+
+class JalaliYear(JalaliFunc):
+    function = 'jalali_year'
+
+
+class JalaliMonth(JalaliFunc):
+    function = 'jalali_month'
+
+
+class JalaliDay(JalaliFunc):
+    function = 'jalali_day'
+
+
+class JalaliWeek(JalaliFunc):
+    """Saturday-start week of the Jalali year (1-53)."""
+    function = 'jalali_week'
+
+
+class JalaliWeekday(JalaliFunc):
+    """Day of the week, Saturday = 0."""
+    function = 'jalali_weekday'
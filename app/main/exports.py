@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from .caching import get_data_version
+
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{40}')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Serializes the "already queued or built?" check with queueing the job.
+_jobs_lock = threading.Lock()
+
+
+def get_spool_dir():
+    spool_dir = Path(getattr(settings, 'EXPORT_SPOOL_DIR', Path(settings.BASE_DIR, 'exports')))
+    os.makedirs(spool_dir, exist_ok=True)
+    return spool_dir
+
+
+def get_export_executor():
+    """Pool that builds exports off the request thread, separate from the async views' ORM pool."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'EXPORT_WORKERS', 2),
+                thread_name_prefix='gerdoo-export',
+            )
+    return _executor
+
+
+def get_job_id(export_format, report_key):
+    """Stable id of an export: its format, the ReportFilter key and the data version.
+
+    Any write bumps the data version, so an unchanged report maps to the
+    same id (and artifact) and a changed one never does.
+    """
+    raw = json.dumps([export_format, report_key, get_data_version()])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _get_state_path(job_id):
+    return get_spool_dir() / f'{job_id}.json'
+
+
+def get_artifact_path(job_id, export_format):
+    return get_spool_dir() / f'{job_id}.{export_format}'
+
+
+def read_job(job_id):
+    """State dict of a job, or None for an unknown or malformed id."""
+    if not JOB_ID_PATTERN.fullmatch(job_id or ''):
+        return None
+    try:
+        with open(_get_state_path(job_id), encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_job(job_id, **changes):
+    # State lives next to the artifact rather than in the cache, so any
+    # worker process can answer a poll for a job another one is running.
+    state = {**(read_job(job_id) or {}), **changes, 'updated': time.time()}
+    temp_path = get_spool_dir() / f'{job_id}.json.{os.getpid()}.{threading.get_ident()}'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, ensure_ascii=False)
+    os.replace(temp_path, _get_state_path(job_id))
+    return state
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def is_job_usable(state):
+    """Whether a job is done with its artifact on disk, or still being built by a live process."""
+    if state['status'] == 'done':
+        return get_artifact_path(state['id'], state['format']).exists()
+    if state['status'] in ('queued', 'running'):
+        return _is_alive(state['pid'])
+    return False
+
+
+def prune_spool():
+    """Deletes artifacts and states older than EXPORT_SPOOL_MAX_AGE seconds."""
+    max_age = getattr(settings, 'EXPORT_SPOOL_MAX_AGE', 24 * 60 * 60)
+    cutoff = time.time() - max_age
+    for path in get_spool_dir().iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def submit_export_job(job_id, export_format, file_name, write):
+    """Queues ``write(file, progress)`` to build the artifact of ``job_id``; returns the job state.
+
+    ``progress(done, total)`` may be called as rows are written. A job that
+    is already built, queued or running is returned as is instead of
+    being queued again.
+    """
+    with _jobs_lock:
+        state = read_job(job_id)
+        if state and is_job_usable(state):
+            return state
+
+        prune_spool()
+        state = _write_job(
+            job_id,
+            id=job_id,
+            format=export_format,
+            file_name=file_name,
+            status='queued',
+            done=0,
+            total=None,
+            pid=os.getpid(),
+        )
+        get_export_executor().submit(_run_job, job_id, export_format, write)
+    return state
+
+
+def _run_job(job_id, export_format, write):
+    artifact_path = get_artifact_path(job_id, export_format)
+    temp_path = artifact_path.with_name(f'{artifact_path.name}.part')
+
+    def progress(done, total):
+        _write_job(job_id, status='running', done=done, total=total)
+
+    try:
+        _write_job(job_id, status='running')
+        with open(temp_path, 'wb') as file:
+            write(file, progress)
+        os.replace(temp_path, artifact_path)
+        _write_job(job_id, status='done')
+    except Exception:
+        logger.exception('Export job %s failed', job_id)
+        temp_path.unlink(missing_ok=True)
+        _write_job(job_id, status='failed')
+    finally:
+        close_old_connections()
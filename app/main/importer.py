@@ -0,0 +1,384 @@
+import io
+import re
+import csv
+import datetime
+from zipfile import BadZipFile
+from xml.etree.ElementTree import ParseError
+from decimal import (
+    Decimal,
+    InvalidOperation,
+)
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from django.db import transaction
+from .models import (
+    Tag,
+    Card,
+    Category,
+    Transaction,
+    MonthlyCategoryTotal,
+)
+from .jcalendar import (
+    to_gregorian,
+    to_jalali_parts,
+)
+from .periods import parse_jalali_parts
+from .ledger import bulk_record_transactions
+from .search import index_transactions
+from .sqlite import insert_rows
+from .caching import bump_data_version
+from .serializers import (
+    KIND_DISPLAY,
+    get_card_label,
+)
+from .utils import normalize_persian_text
+
+
+# Accepted column headers, including the ones written by the Excel export.
+HEADER_ALIASES = {
+    'date': 'date',
+    'تاریخ': 'date',
+    'kind': 'kind',
+    'نوع تراکنش': 'kind',
+    'amount': 'amount',
+    'مبلغ': 'amount',
+    'مبلغ (ریال)': 'amount',
+    'مبلغ (تومان)': 'amount',
+    'commission': 'commission',
+    'کارمزد': 'commission',
+    'category': 'category',
+    'دسته‌بندی': 'category',
+    'tags': 'tags',
+    'تگ‌ها': 'tags',
+    'source': 'source',
+    'حساب مبدأ': 'source',
+    'destination': 'destination',
+    'حساب مقصد': 'destination',
+    'description': 'description',
+    'توضیحات': 'description',
+}
+
+EMPTY_VALUES = ('', '---', 'نامشخص')
+
+AMOUNT_MAX_DIGITS = Transaction._meta.get_field('amount').max_digits
+
+# What a renamed, truncated or otherwise corrupt upload raises while it is
+# read: not a zip, a zip without workbook parts, broken XML, or bytes that
+# are not UTF-8.
+UNREADABLE_FILE_ERRORS = (
+    BadZipFile,
+    InvalidFileException,
+    KeyError,
+    ParseError,
+    UnicodeDecodeError,
+)
+
+TAG_SEPARATORS = re.compile(r'[,،]')
+
+
+def _to_text(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def read_rows(file, filename):
+    """(row number, {field: value}) for every data row of a CSV or XLSX upload.
+
+    Raises ValueError for an unsupported, unreadable or corrupt file.
+    """
+    try:
+        yield from _read_rows(file, filename)
+    except UNREADABLE_FILE_ERRORS as e:
+        raise ValueError('فایل خراب است یا با پسوند آن همخوانی ندارد.') from e
+
+
+def _read_rows(file, filename):
+    if filename.lower().endswith('.xlsx'):
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+    elif filename.lower().endswith('.csv'):
+        rows = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    else:
+        raise ValueError('قالب فایل پشتیبانی نمی‌شود. (CSV یا XLSX)')
+
+    header = next(rows, None) or ()
+    fields = [HEADER_ALIASES.get(_to_text(name)) for name in header]
+    if 'date' not in fields or 'amount' not in fields:
+        raise ValueError('ستون‌های تاریخ و مبلغ در سطر اول فایل یافت نشد.')
+
+    for row_number, values in enumerate(rows, start=2):
+        row = {
+            field: value
+            for field, value in zip(fields, values)
+            if field
+        }
+        # Blank lines and the export's totals row carry no date or description.
+        if not _to_text(row.get('date')) and not _to_text(row.get('description')):
+            continue
+        yield row_number, row
+
+
+def parse_jalali_date(value):
+    """(Gregorian date, (jyear, jmonth, jday)) of a 'YYYY/MM/DD' cell, or of a Gregorian date cell."""
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        return value, to_jalali_parts(value)
+
+    year, month, day = parse_jalali_parts(_to_text(value))
+    return to_gregorian(year, month, day), (year, month, day)
+
+
+def parse_amount(value):
+    """Decimal of an amount cell; raises InvalidOperation for text that is not a number."""
+    if isinstance(value, (int, float, Decimal)):
+        return Decimal(str(value))
+    text = normalize_persian_text(_to_text(value)).replace(',', '').replace('،', '')
+    return Decimal(text)
+
+
+def get_rial_error(value):
+    """Why ``value`` cannot be stored as a whole-rial amount, or None when it can."""
+    if not value.is_finite():
+        return 'مبلغ وارد شده نامعتبر است!'
+    if value != value.to_integral_value():
+        return 'مبلغ باید به ریال و بدون اعشار باشد!'
+    if len(value.to_integral_value().as_tuple().digits) > AMOUNT_MAX_DIGITS:
+        return 'مبلغ بیش از حد مجاز است!'
+    return None
+
+
+class RowValidator:
+    """Resolves import rows against cards, categories and tags loaded once up front."""
+
+    def __init__(self):
+        self.kinds = {code: code for code in KIND_DISPLAY}
+        self.kinds.update({display: code for code, display in KIND_DISPLAY.items()})
+
+        self.cards = {}
+        self.cards_by_id = {}
+        for card in Card.objects.all():
+            self.cards_by_id[card.id] = card
+            self.cards[str(card.id)] = card
+            self.cards[get_card_label(card)] = card
+
+        self.categories = {}
+        self.categories_by_name = {}
+        for category in Category.objects.all():
+            name = normalize_persian_text(category.name)
+            self.categories[str(category.id)] = category
+            self.categories[(name, category.kind)] = category
+            self.categories_by_name.setdefault(name, []).append(category)
+
+    def get_card(self, value):
+        text = _to_text(value)
+        if text.endswith('.0'):
+            text = text[:-2]
+        return self.cards.get(text)
+
+    def get_category(self, value, kind):
+        text = _to_text(value)
+        if text.endswith('.0'):
+            text = text[:-2]
+
+        category = self.categories.get(text)
+        if category is None:
+            name = normalize_persian_text(text)
+            category = self.categories.get((name, kind))
+            if category is None and len(self.categories_by_name.get(name, ())) == 1:
+                category = self.categories_by_name[name][0]
+        return category
+
+    def validate(self, row):
+        """(unsaved Transaction, [tag names], {field: error})."""
+        errors = {}
+
+        kind = self.kinds.get(_to_text(row.get('kind')))
+        if kind is None:
+            errors['kind'] = 'نوع تراکنش نامعتبر است!'
+
+        # Amounts are checked up front because the bulk insert skips the
+        # model field's own conversion; int() also turns -0 into 0.
+        amount = None
+        try:
+            amount = parse_amount(row.get('amount'))
+        except InvalidOperation:
+            errors['amount'] = 'وارد کردن مبلغ الزامی است!'
+        else:
+            rial_error = get_rial_error(amount)
+            if rial_error:
+                errors['amount'] = rial_error
+            elif amount <= 0:
+                errors['amount'] = 'مبلغ باید یک عدد مثبت باشد!'
+            else:
+                amount = Decimal(int(amount))
+
+        commission = Decimal(0)
+        if kind == 'T' and _to_text(row.get('commission')) not in EMPTY_VALUES:
+            try:
+                commission = parse_amount(row.get('commission'))
+            except InvalidOperation:
+                errors['commission'] = 'کارمزد وارد شده نامعتبر است!'
+            else:
+                rial_error = get_rial_error(commission)
+                if rial_error:
+                    errors['commission'] = rial_error
+                elif commission < 0:
+                    errors['commission'] = 'کارمزد نمی‌تواند منفی باشد!'
+                else:
+                    commission = Decimal(int(commission))
+
+        source = None
+        if kind in ('E', 'T'):
+            source = self.get_card(row.get('source'))
+            if _to_text(row.get('source')) in EMPTY_VALUES:
+                errors['source'] = 'برای هزینه و انتقال، حساب مبدأ الزامی است!'
+            elif source is None:
+                errors['source'] = 'حساب مبدأ نامعتبر است!'
+
+        destination = None
+        if kind in ('I', 'T'):
+            destination = self.get_card(row.get('destination'))
+            if _to_text(row.get('destination')) in EMPTY_VALUES:
+                errors['destination'] = 'برای درآمد و انتقال، حساب مقصد الزامی است!'
+            elif destination is None:
+                errors['destination'] = 'حساب مقصد نامعتبر است!'
+
+        category = self.get_category(row.get('category'), kind)
+        if category is None:
+            errors['category'] = 'دسته‌بندی نامعتبر است!'
+
+        date, jalali_parts = None, None
+        try:
+            date, jalali_parts = parse_jalali_date(row.get('date'))
+        except ValueError:
+            errors['date'] = 'قالب تاریخ نامعتبر است. (انتظار: YYYY/MM/DD)'
+
+        description = _to_text(row.get('description'))
+        if not description:
+            errors['description'] = 'نوشتن توضیحات الزامی است! (هر چند کوتاه ...)'
+
+        tag_names = [
+            name.strip()
+            for name in TAG_SEPARATORS.split(_to_text(row.get('tags')))
+            if name.strip() not in EMPTY_VALUES
+        ]
+
+        if errors:
+            return None, tag_names, errors
+
+        jyear, jmonth, jday = jalali_parts
+        return Transaction(
+            kind=kind,
+            amount=amount,
+            commission=commission,
+            source_id=source.id if source else None,
+            destination_id=destination.id if destination else None,
+            category_id=category.id,
+            date=date,
+            description=description,
+            jyear=jyear,
+            jmonth=jmonth,
+            jday=jday,
+        ), tag_names, errors
+
+
+def get_balance_errors(rows, cards):
+    """Errors for rows that would overdraw their source card.
+
+    ``rows`` are (row number, transaction) pairs in the order they are
+    inserted. As add_transaction() does for a single transaction, every
+    deduction must be covered by the card's balance at that point: its
+    current balance plus the rows before it. A rejected row is not applied.
+    """
+    balances = {card_id: card.balance for card_id, card in cards.items()}
+    errors = []
+    for row_number, t in rows:
+        if t.kind in ('E', 'T'):
+            deduction = t.amount + t.commission
+            if deduction > balances[t.source_id]:
+                errors.append(
+                    {
+                        'row': row_number,
+                        'errors': {
+                            'source': f'موجودی حساب {get_card_label(cards[t.source_id])} '
+                                      f'برای این ردیف کافی نیست!',
+                        },
+                    }
+                )
+                continue
+            balances[t.source_id] -= deduction
+        if t.kind in ('I', 'T'):
+            balances[t.destination_id] += t.amount
+    return errors
+
+
+def get_tag_ids(names):
+    """{tag name: id} for the given names, creating the missing tags in one INSERT."""
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = [Tag(name=name) for name in names if name not in tag_ids]
+    if missing:
+        Tag.objects.bulk_create(missing)
+        tag_ids.update(
+            Tag.objects.filter(name__in=[tag.name for tag in missing]).values_list('name', 'id')
+        )
+    return tag_ids
+
+
+def import_transactions(rows, dry_run=False):
+    """Validates and inserts import rows as one all-or-nothing batch.
+
+    ``rows`` yields (row number, {field: value}) as read_rows() does. Returns
+    (number of transactions, [{'row': n, 'errors': {...}}]); nothing is
+    written when there are errors or ``dry_run`` is set.
+    """
+    # The file is read before the write lock is taken; cards, categories
+    # and balances are only read under it, so they cannot change between
+    # the checks and the insert.
+    rows = list(rows)
+
+    with transaction.atomic():
+        validator = RowValidator()
+        valid_rows, errors = [], []
+
+        for row_number, row in rows:
+            t, tag_names, row_errors = validator.validate(row)
+            if row_errors:
+                errors.append({'row': row_number, 'errors': row_errors})
+            elif not errors:
+                valid_rows.append((row_number, t, tag_names))
+
+        # Date order (file order within a day) keeps the bulk-assigned ids in
+        # the ledger's (date, id) order; balances are checked in that order.
+        valid_rows.sort(key=lambda valid_row: valid_row[1].date)
+
+        if not errors:
+            errors = get_balance_errors(
+                [(row_number, t) for row_number, t, _ in valid_rows],
+                validator.cards_by_id,
+            )
+        if errors or dry_run:
+            return len(valid_rows), errors
+
+        transactions = [t for _, t, _ in valid_rows]
+        row_tags = [tag_names for _, _, tag_names in valid_rows]
+
+        bulk_record_transactions(transactions)
+
+        tag_ids = get_tag_ids({name for names in row_tags for name in names})
+        insert_rows(
+            Transaction.tags.through,
+            ('transaction', 'tag'),
+            [
+                (t.id, tag_ids[name])
+                for t, names in zip(transactions, row_tags)
+                for name in dict.fromkeys(names)
+            ],
+        )
+
+        MonthlyCategoryTotal.apply_many(transactions)
+        index_transactions(transactions)
+        bump_data_version()
+
+    return len(transactions), []
@@ -0,0 +1,113 @@
+import datetime
+import threading
+import jdatetime
+
+
+# Years covered by the lookup table; anything outside falls back to jdatetime.
+FIRST_JALALI_YEAR = 1350
+LAST_JALALI_YEAR = 1450
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_month_length(year, month):
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if jdatetime.date(year, 1, 1).isleap() else 29
+
+
+def _build_table():
+    first_ordinal = jdatetime.date(FIRST_JALALI_YEAR, 1, 1).togregorian().toordinal()
+    parts = []
+    strings = []
+    year_starts = []
+
+    for year in range(FIRST_JALALI_YEAR, LAST_JALALI_YEAR + 1):
+        year_starts.append(len(parts))
+        for month in range(1, 13):
+            for day in range(1, get_month_length(year, month) + 1):
+                parts.append((year, month, day))
+                strings.append(f'{year:04d}/{month:02d}/{day:02d}')
+
+    year_starts.append(len(parts))
+    return first_ordinal, parts, strings, year_starts
+
+
+def get_table():
+    """(first Gregorian ordinal, [(y, m, d), ...], ['YYYY/MM/DD', ...], year start offsets), built on first use."""
+    global _table
+
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = _build_table()
+    return _table
+
+
+def _lookup(value):
+    first_ordinal, parts, strings, _ = get_table()
+    index = value.toordinal() - first_ordinal
+
+    if 0 <= index < len(parts):
+        return parts[index], strings[index]
+    return None
+
+
+def to_jalali_parts(value):
+    """(year, month, day) of a Gregorian date or datetime (its own wall-clock date)."""
+    found = _lookup(value)
+    if found:
+        return found[0]
+
+    jalali = jdatetime.date.fromgregorian(
+        date=value.date() if isinstance(value, datetime.datetime) else value
+    )
+    return jalali.year, jalali.month, jalali.day
+
+
+def to_jalali_string(value):
+    """'YYYY/MM/DD' for a Gregorian date or datetime."""
+    found = _lookup(value)
+    if found:
+        return found[1]
+    return '{:04d}/{:02d}/{:02d}'.format(*to_jalali_parts(value))
+
+
+def to_jalali_weekday(value):
+    """Day of the week with Saturday as 0, as on Iranian calendars."""
+    return (value.weekday() + 2) % 7
+
+
+def get_day_of_year(month, day):
+    if month <= 7:
+        return (month - 1) * 31 + day
+    return 186 + (month - 7) * 30 + day
+
+
+def to_jalali_week(value):
+    """Saturday-start week of the Jalali year; week 1 is the one containing 1 Farvardin."""
+    _, month, day = to_jalali_parts(value)
+    day_of_year = get_day_of_year(month, day)
+    first_weekday = (to_jalali_weekday(value) - (day_of_year - 1)) % 7
+    return (day_of_year - 1 + first_weekday) // 7 + 1
+
+
+def to_gregorian(year, month, day):
+    """Gregorian date of a Jalali year/month/day; raises ValueError for an invalid date."""
+    if not FIRST_JALALI_YEAR <= year <= LAST_JALALI_YEAR:
+        return jdatetime.date(year, month, day).togregorian()
+
+    first_ordinal, _, _, year_starts = get_table()
+    start = year_starts[year - FIRST_JALALI_YEAR]
+    year_length = year_starts[year - FIRST_JALALI_YEAR + 1] - start
+
+    if not 1 <= month <= 12:
+        raise ValueError(f'Invalid Jalali month: {month}')
+    month_length = 31 if month <= 6 else 30 if month <= 11 else year_length - 336
+    if not 1 <= day <= month_length:
+        raise ValueError(f'Invalid Jalali day: {year}/{month}/{day}')
+
+    return datetime.date.fromordinal(first_ordinal + start + get_day_of_year(month, day) - 1)
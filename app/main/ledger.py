@@ -0,0 +1,446 @@
+import datetime
+from decimal import Decimal
+from collections import defaultdict
+from django.db import connection
+from django.utils import timezone
+from django.db.models.functions import Coalesce
+from django.db.models import (
+    F,
+    Q,
+    Sum,
+    Count,
+    Value,
+    OuterRef,
+    Subquery,
+    DecimalField,
+)
+from .models import (
+    Card,
+    Transaction,
+    CardLedgerEntry,
+    CardBalanceCheckpoint,
+)
+from .sqlite import insert_rows
+
+
+# A new checkpoint is written once this many entries have piled up after
+# the latest one, which bounds the tail scanned by get_balance_at().
+CHECKPOINT_INTERVAL = 100
+
+ONE_DAY = datetime.timedelta(days=1)
+
+SNAPSHOT_CARD_FIELDS = {
+    'source_balance_after': 'source_id',
+    'destination_balance_after': 'destination_id',
+}
+
+# Columns written by bulk_record_transactions(), in the order of its tuples.
+BULK_TRANSACTION_FIELDS = (
+    'kind',
+    'amount',
+    'commission',
+    'source',
+    'source_balance_after',
+    'destination',
+    'destination_balance_after',
+    'category',
+    'date',
+    'description',
+    'jyear',
+    'jmonth',
+    'jday',
+)
+
+BULK_LEDGER_FIELDS = (
+    'card',
+    'transaction',
+    'date',
+    'amount',
+    'created_at',
+)
+
+
+def get_transaction_legs(transaction):
+    """Returns (card_id, signed amount, snapshot field) for each card a transaction touches."""
+    legs = []
+
+    if transaction.kind in ('E', 'T') and transaction.source_id:
+        legs.append(
+            (
+                transaction.source_id,
+                -(transaction.amount + (transaction.commission or Decimal(0))),
+                'source_balance_after',
+            )
+        )
+
+    if transaction.kind in ('I', 'T') and transaction.destination_id:
+        legs.append(
+            (
+                transaction.destination_id,
+                transaction.amount,
+                'destination_balance_after',
+            )
+        )
+
+    return legs
+
+
+def get_balance_at(card_id, date, opening_balance=None):
+    """Balance of a card at the end of ``date``: the nearest checkpoint plus a bounded tail."""
+    checkpoint = CardBalanceCheckpoint.objects.filter(
+        card_id=card_id,
+        date__lte=date,
+    ).order_by('-date').values('date', 'balance').first()
+
+    tail = CardLedgerEntry.objects.filter(
+        card_id=card_id,
+        date__lte=date,
+    )
+
+    if checkpoint:
+        base = checkpoint['balance']
+        tail = tail.filter(date__gt=checkpoint['date'])
+    elif opening_balance is not None:
+        base = opening_balance
+    else:
+        base = Card.objects.values_list('opening_balance', flat=True).get(pk=card_id)
+
+    return base + (tail.aggregate(total=Sum('amount'))['total'] or Decimal(0))
+
+
+def annotate_balance_at(queryset, date):
+    """Annotates a Card queryset with ``balance_at``, each card's balance at the end of ``date``."""
+    checkpoints = CardBalanceCheckpoint.objects.filter(
+        card=OuterRef('pk'),
+        date__lte=date,
+    ).order_by('-date')
+
+    tail = CardLedgerEntry.objects.filter(
+        card=OuterRef('pk'),
+        date__lte=date,
+        date__gt=Coalesce(OuterRef('checkpoint_date'), Value(datetime.date.min)),
+    ).values('card').annotate(
+        total=Sum('amount'),
+    ).values('total')
+
+    amount_field = DecimalField(max_digits=20, decimal_places=0)
+
+    return queryset.annotate(
+        checkpoint_date=Subquery(checkpoints.values('date')[:1]),
+        checkpoint_balance=Subquery(checkpoints.values('balance')[:1]),
+    ).annotate(
+        balance_at=Coalesce(
+            'checkpoint_balance',
+            'opening_balance',
+            output_field=amount_field,
+        ) + Coalesce(
+            Subquery(tail),
+            Value(Decimal(0)),
+            output_field=amount_field,
+        ),
+    )
+
+
+def get_total_balance_at(date, queryset=None):
+    """Sum of card balances at the end of ``date`` in a single query (active cards by default)."""
+    if queryset is None:
+        queryset = Card.objects.filter(active=True)
+
+    return annotate_balance_at(queryset, date).aggregate(
+        total=Sum('balance_at'),
+    )['total'] or Decimal(0)
+
+
+def shift_history(card_id, date, transaction_id, amount):
+    """Applies ``amount`` to everything recorded after (date, transaction_id) in bulk."""
+    Card.objects.filter(pk=card_id).update(
+        balance=F('balance') + amount,
+    )
+
+    CardBalanceCheckpoint.objects.filter(
+        card_id=card_id,
+        date__gte=date,
+    ).update(
+        balance=F('balance') + amount,
+    )
+
+    later = Q(date__gt=date) | Q(date=date, id__gt=transaction_id)
+
+    Transaction.objects.filter(later, source_id=card_id).update(
+        source_balance_after=F('source_balance_after') + amount,
+    )
+    Transaction.objects.filter(later, destination_id=card_id).update(
+        destination_balance_after=F('destination_balance_after') + amount,
+    )
+
+
+def create_checkpoint_if_due(card_id):
+    last_checkpoint_date = CardBalanceCheckpoint.objects.filter(
+        card_id=card_id,
+    ).order_by('-date').values_list('date', flat=True).first()
+
+    pending = CardLedgerEntry.objects.filter(card_id=card_id)
+    if last_checkpoint_date:
+        pending = pending.filter(date__gt=last_checkpoint_date)
+
+    pending_dates = pending.order_by('-date').values_list('date', flat=True)[:CHECKPOINT_INTERVAL]
+    pending_dates = list(pending_dates)
+
+    if len(pending_dates) < CHECKPOINT_INTERVAL:
+        return None
+
+    checkpoint_date = pending_dates[0]
+    return CardBalanceCheckpoint.objects.create(
+        card_id=card_id,
+        date=checkpoint_date,
+        balance=get_balance_at(card_id, checkpoint_date),
+    )
+
+
+def get_later_same_day_total(card_id, date, transaction_id):
+    """Net amount moved on a card by transactions recorded after ``transaction_id`` on the same day."""
+    totals = Transaction.objects.filter(
+        Q(source_id=card_id) | Q(destination_id=card_id),
+        date=date,
+        id__gt=transaction_id,
+    ).aggregate(
+        outgoing=Sum(
+            F('amount') + F('commission'),
+            filter=Q(source_id=card_id, kind__in=('E', 'T')),
+        ),
+        incoming=Sum(
+            'amount',
+            filter=Q(destination_id=card_id, kind__in=('I', 'T')),
+        ),
+    )
+    return (totals['incoming'] or Decimal(0)) - (totals['outgoing'] or Decimal(0))
+
+
+def record_transaction(transaction):
+    """Posts a saved transaction to the ledger of every card it touches.
+
+    Later balance snapshots and checkpoints are repaired with bulk UPDATEs,
+    so back-dated transactions cost the same as current ones. Must run inside
+    the atomic block that created the transaction.
+    """
+    snapshots = {}
+
+    for card_id, amount, snapshot_field in get_transaction_legs(transaction):
+        CardLedgerEntry.objects.create(
+            card_id=card_id,
+            transaction=transaction,
+            date=transaction.date,
+            amount=amount,
+        )
+        shift_history(card_id, transaction.date, transaction.id, amount)
+
+        # An edited transaction keeps its id, so later ones of the same day
+        # may already be posted; they come after it in (date, id) order.
+        snapshots[snapshot_field] = get_balance_at(card_id, transaction.date) - get_later_same_day_total(
+            card_id,
+            transaction.date,
+            transaction.id,
+        )
+        create_checkpoint_if_due(card_id)
+
+    if snapshots:
+        Transaction.objects.filter(pk=transaction.pk).update(**snapshots)
+        for field, value in snapshots.items():
+            setattr(transaction, field, value)
+
+
+def reverse_transaction(transaction):
+    """Appends reversing entries for a transaction that is about to be deleted or re-recorded."""
+    # Entries already reversed by an earlier edit stay out.
+    entries = CardLedgerEntry.objects.filter(
+        transaction=transaction,
+        reverses__isnull=True,
+        reversals__isnull=True,
+    )
+
+    for entry in entries:
+        CardLedgerEntry.objects.create(
+            card_id=entry.card_id,
+            reverses=entry,
+            date=entry.date,
+            amount=-entry.amount,
+        )
+        shift_history(entry.card_id, entry.date, transaction.id, -entry.amount)
+
+
+def fill_checkpoints(card_id):
+    """Writes every checkpoint that is due after a card's latest one in a single pass."""
+    last_checkpoint = CardBalanceCheckpoint.objects.filter(
+        card_id=card_id,
+    ).order_by('-date').values('date', 'balance').first()
+
+    pending = CardLedgerEntry.objects.filter(card_id=card_id)
+    if last_checkpoint:
+        balance = last_checkpoint['balance']
+        pending = pending.filter(date__gt=last_checkpoint['date'])
+    else:
+        balance = Card.objects.values_list('opening_balance', flat=True).get(pk=card_id)
+
+    days = pending.values('date').annotate(
+        total=Sum('amount'),
+        num=Count('id'),
+    ).order_by('date')
+
+    checkpoints, pending_count = [], 0
+    for day in days:
+        balance += day['total']
+        pending_count += day['num']
+        if pending_count >= CHECKPOINT_INTERVAL:
+            checkpoints.append(
+                CardBalanceCheckpoint(
+                    card_id=card_id,
+                    date=day['date'],
+                    balance=balance,
+                )
+            )
+            pending_count = 0
+
+    CardBalanceCheckpoint.objects.bulk_create(checkpoints)
+    return len(checkpoints)
+
+
+def _set_bulk_snapshots(legs_by_card):
+    # New rows get ids above every existing one, so on a shared date they
+    # sort after the existing rows and their snapshots include them.
+    for card_id, legs in legs_by_card.items():
+        first_date = legs[0][0].date
+        balance = get_balance_at(card_id, first_date - ONE_DAY)
+
+        existing = list(
+            CardLedgerEntry.objects.filter(
+                card_id=card_id,
+                date__gte=first_date,
+            ).values('date').annotate(
+                total=Sum('amount'),
+            ).order_by('date').values_list('date', 'total')
+        )
+
+        position = 0
+        for transaction, amount, snapshot_field in legs:
+            while position < len(existing) and existing[position][0] <= transaction.date:
+                balance += existing[position][1]
+                position += 1
+            balance += amount
+            setattr(transaction, snapshot_field, balance)
+
+
+def _to_db_decimal(model, field_name, value):
+    # What save() would store: quantized to the column's decimal places,
+    # with non-finite values and too many digits rejected.
+    return model._meta.get_field(field_name).get_db_prep_save(value, connection)
+
+
+def bulk_record_transactions(transactions):
+    """Inserts unsaved transactions and posts them to the ledger in bulk.
+
+    ``transactions`` must be sorted by date. Instead of one shift_history()
+    per row, every card gets one balance update, one snapshot repair per
+    side and one checkpoint rebuild from the earliest date it touches.
+    Must run inside an atomic block, whose write lock keeps the ids handed
+    out to the new rows contiguous.
+    """
+    legs_by_card = defaultdict(list)
+    for transaction in transactions:
+        for card_id, amount, snapshot_field in get_transaction_legs(transaction):
+            legs_by_card[card_id].append((transaction, amount, snapshot_field))
+
+    _set_bulk_snapshots(legs_by_card)
+
+    last_existing_id = Transaction.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    insert_rows(
+        Transaction,
+        BULK_TRANSACTION_FIELDS,
+        [
+            (
+                t.kind,
+                _to_db_decimal(Transaction, 'amount', t.amount),
+                _to_db_decimal(Transaction, 'commission', t.commission),
+                t.source_id,
+                _to_db_decimal(Transaction, 'source_balance_after', t.source_balance_after),
+                t.destination_id,
+                _to_db_decimal(Transaction, 'destination_balance_after', t.destination_balance_after),
+                t.category_id,
+                t.date.isoformat(),
+                t.description,
+                t.jyear,
+                t.jmonth,
+                t.jday,
+            )
+            for t in transactions
+        ],
+    )
+
+    new_ids = list(
+        Transaction.objects.filter(
+            id__gt=last_existing_id,
+        ).order_by('id').values_list('id', flat=True)
+    )
+    if len(new_ids) != len(transactions):
+        raise RuntimeError('Transactions were inserted concurrently with a bulk import.')
+    for transaction, transaction_id in zip(transactions, new_ids):
+        transaction.id = transaction_id
+
+    created_at = CardLedgerEntry._meta.get_field('created_at').get_db_prep_save(
+        timezone.now(),
+        connection,
+    )
+    insert_rows(
+        CardLedgerEntry,
+        BULK_LEDGER_FIELDS,
+        [
+            (
+                card_id,
+                transaction.id,
+                transaction.date.isoformat(),
+                _to_db_decimal(CardLedgerEntry, 'amount', amount),
+                created_at,
+            )
+            for card_id, legs in legs_by_card.items()
+            for transaction, amount, _ in legs
+        ],
+    )
+
+    amount_field = DecimalField(max_digits=20, decimal_places=0)
+
+    for card_id, legs in legs_by_card.items():
+        first_date = legs[0][0].date
+
+        Card.objects.filter(pk=card_id).update(
+            balance=F('balance') + sum(amount for _, amount, _ in legs),
+        )
+
+        inserted_before = CardLedgerEntry.objects.filter(
+            card_id=card_id,
+            transaction_id__gt=last_existing_id,
+            date__lt=OuterRef('date'),
+        ).values('card').annotate(
+            total=Sum('amount'),
+        ).values('total')
+
+        for snapshot_field, card_field in SNAPSHOT_CARD_FIELDS.items():
+            Transaction.objects.filter(
+                **{card_field: card_id},
+                date__gt=first_date,
+                id__lte=last_existing_id,
+            ).update(
+                **{
+                    snapshot_field: F(snapshot_field) + Coalesce(
+                        Subquery(inserted_before),
+                        Value(Decimal(0)),
+                        output_field=amount_field,
+                    ),
+                },
+            )
+
+        CardBalanceCheckpoint.objects.filter(
+            card_id=card_id,
+            date__gte=first_date,
+        ).delete()
+        fill_checkpoints(card_id)
+
+    return transactions
@@ -0,0 +1,141 @@
+import sys
+import time
+import socket
+import statistics
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import (
+    get_user_model,
+    SESSION_KEY,
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+)
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+
+# (label, WSGI path, ASGI path) for every endpoint compared side by side.
+ENDPOINTS = (
+    ('dashboard', '/dashboard', '/async/dashboard'),
+)
+
+
+class Command(BaseCommand):
+    help = ("Compares request latency of the synchronous dashboard view under the WSGI "
+            "development server with its async version under uvicorn. Needs uvicorn, which "
+            "is not in requirements.txt: pip install uvicorn.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User the requests are authenticated as (default: first superuser).')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--wsgi-port', type=int, default=8801)
+        parser.add_argument('--asgi-port', type=int, default=8802)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('uvicorn is not installed; run "pip install uvicorn" to benchmark the ASGI path.')
+
+        session_key = self.create_session(options['username'])
+
+        servers = [
+            subprocess.Popen(
+                [sys.executable, 'manage.py', 'runserver', '--noreload', f"127.0.0.1:{options['wsgi_port']}"],
+                cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            ),
+            subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+                 '--host', '127.0.0.1', '--port', str(options['asgi_port']), '--log-level', 'warning'],
+                cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            ),
+        ]
+
+        try:
+            for port in (options['wsgi_port'], options['asgi_port']):
+                self.wait_for_port(port)
+
+            for label, wsgi_path, asgi_path in ENDPOINTS:
+                for server, port, path in (
+                    ('wsgi', options['wsgi_port'], wsgi_path),
+                    ('uvicorn', options['asgi_port'], asgi_path),
+                ):
+                    url = f'http://127.0.0.1:{port}{path}'
+                    latencies = self.run_requests(url, session_key, options)
+                    self.stdout.write(
+                        f"{label:<14} {server:<8} "
+                        f"mean: {statistics.mean(latencies):>8.2f} ms  "
+                        f"p50: {statistics.median(latencies):>8.2f} ms  "
+                        f"p95: {self.percentile(latencies, 95):>8.2f} ms"
+                    )
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+            SessionStore(session_key=session_key).delete()
+
+    @staticmethod
+    def create_session(username):
+        users = get_user_model().objects.all()
+
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(is_superuser=True).order_by('id').first()
+
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --username or create a superuser.')
+
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    @staticmethod
+    def wait_for_port(port, timeout=15.0):
+        deadline = time.perf_counter() + timeout
+
+        while time.perf_counter() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.1)
+
+        raise CommandError(f'Server on port {port} did not start within {timeout:.0f} seconds.')
+
+    @staticmethod
+    def run_requests(url, session_key, options):
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session_key}'
+
+        def fetch(_):
+            request = urllib.request.Request(url, headers={'Cookie': cookie})
+            started = time.perf_counter()
+            with urllib.request.urlopen(request) as response:
+                response.read()
+            return (time.perf_counter() - started) * 1000
+
+        # One warm-up request so both servers have imported and connected.
+        fetch(None)
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            return list(pool.map(fetch, range(options['requests'])))
+
+    @staticmethod
+    def percentile(values, pct):
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index]
@@ -0,0 +1,194 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import datetime
+import resource
+import tempfile
+import subprocess
+from decimal import Decimal
+from openpyxl import Workbook
+from django.conf import settings
+from django.db import (
+    connections,
+    transaction,
+)
+from django.test import RequestFactory
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from ...models import (
+    Tag,
+    Card,
+    Category,
+    Transaction,
+)
+from ...jcalendar import to_jalali_parts
+from ...ledger import bulk_record_transactions
+from ...sqlite import (
+    insert_rows,
+    get_sqlite_pragmas,
+)
+from ...serializers import iter_transaction_rows
+from ...views.reporting import export_transactions_excel
+
+
+SEED_BATCH_SIZE = 20000
+
+
+class Command(BaseCommand):
+    help = ("Measures peak RSS and duration of the annual Excel export on scratch databases "
+            "of growing size, for the streaming export and an in-memory workbook.")
+
+    # Child processes repoint the default database before touching it.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000, 100000])
+        parser.add_argument('--child', choices=['seed', 'stream', 'memory'], help='Internal.')
+        parser.add_argument('--db', help='Internal.')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            connections['default'].settings_dict['NAME'] = options['db']
+            # Without mmap, RSS tracks the export itself rather than how much
+            # of the database file happened to be mapped.
+            settings.SQLITE_PRAGMAS = {**get_sqlite_pragmas(), 'mmap_size': 0}
+            return self.run_child(options['child'], options['rows'][0])
+
+        for rows in options['rows']:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                self.spawn('seed', rows, path)
+
+                for mode in ('stream', 'memory'):
+                    result = json.loads(self.spawn(mode, rows, path))
+                    self.stdout.write(
+                        f"{rows:>9} rows  {mode:<7} "
+                        f"peak RSS: {result['peak_mb']:>8.1f} MB "
+                        f"(+{result['peak_mb'] - result['start_mb']:>7.1f} MB)  "
+                        f"time: {result['seconds']:>6.2f} s  "
+                        f"size: {result['bytes'] / 1024 / 1024:>6.1f} MB"
+                    )
+
+    def spawn(self, mode, rows, path):
+        completed = subprocess.run(
+            [sys.executable, 'manage.py', 'benchmark_export', '--child', mode, '--rows', str(rows), '--db', path],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ''
+
+    def run_child(self, mode, rows):
+        if mode == 'seed':
+            call_command('migrate', verbosity=0)
+            self.seed(rows)
+            return
+
+        start_mb = self.get_peak_rss_mb()
+        started = time.perf_counter()
+
+        if mode == 'stream':
+            request = RequestFactory().get('/api/reports/export/', {'type': 'all'})
+            request.user = get_user_model()(username='benchmark')
+            response = export_transactions_excel(request)
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            response.close()
+        else:
+            size = self.export_in_memory()
+
+        self.stdout.write(
+            json.dumps(
+                {
+                    'start_mb': start_mb,
+                    'peak_mb': self.get_peak_rss_mb(),
+                    'seconds': time.perf_counter() - started,
+                    'bytes': size,
+                },
+            )
+        )
+
+    @staticmethod
+    def seed(rows):
+        rng = random.Random(0)
+        cards = [
+            Card.objects.create(
+                name='melli',
+                owner=f'benchmark {i}',
+                number=f'60379910000000{i:02d}',
+                opening_balance=10 ** 12,
+                balance=10 ** 12,
+            )
+            for i in range(5)
+        ]
+        categories = {
+            kind: Category.objects.create(name=f'benchmark {kind}', kind=kind)
+            for kind in 'IET'
+        }
+        tags = [Tag.objects.create(name=f'benchmark {i}') for i in range(5)]
+
+        first_date = datetime.date.today() - datetime.timedelta(days=3650)
+        offsets = sorted(rng.randrange(3650) for _ in range(rows))
+
+        for batch_start in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for offset in offsets[batch_start:batch_start + SEED_BATCH_SIZE]:
+                kind = rng.choice('IET')
+                date = first_date + datetime.timedelta(days=offset)
+                jyear, jmonth, jday = to_jalali_parts(date)
+                batch.append(
+                    Transaction(
+                        kind=kind,
+                        amount=Decimal(rng.randrange(1, 1000) * 1000),
+                        source_id=rng.choice(cards).id if kind in 'ET' else None,
+                        destination_id=rng.choice(cards).id if kind in 'IT' else None,
+                        category_id=categories[kind].id,
+                        date=date,
+                        description=f'تراکنش آزمایشی شماره {batch_start + len(batch)}',
+                        jyear=jyear,
+                        jmonth=jmonth,
+                        jday=jday,
+                    )
+                )
+
+            with transaction.atomic():
+                bulk_record_transactions(batch)
+                insert_rows(
+                    Transaction.tags.through,
+                    ('transaction', 'tag'),
+                    [(t.id, rng.choice(tags).id) for t in batch if rng.random() < 0.3],
+                )
+
+    @staticmethod
+    def export_in_memory():
+        # What the export did before: every cell held by a regular Workbook until save().
+        wb = Workbook()
+        ws = wb.active
+        for index, row in enumerate(iter_transaction_rows(Transaction.objects.order_by('-date', '-id')), start=1):
+            ws.append(
+                [
+                    index,
+                    str(row['date']),
+                    row['kind_display'],
+                    float(row['amount']),
+                    float(row['commission']),
+                    row['category__name'],
+                    ', '.join(row['tags']),
+                    row['source_label'],
+                    row['destination_label'],
+                    row['description'],
+                ]
+            )
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return buffer.tell()
+
+    @staticmethod
+    def get_peak_rss_mb():
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
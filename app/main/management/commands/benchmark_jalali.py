@@ -0,0 +1,66 @@
+import time
+import random
+import datetime
+import jdatetime
+from django.core.management.base import BaseCommand
+from ...jcalendar import (
+    get_table,
+    to_jalali_parts,
+    to_jalali_string,
+)
+
+
+class Command(BaseCommand):
+    help = ("Compares per-row Jalali date formatting through jdatetime with the "
+            "precomputed lookup table in main.jcalendar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        today = datetime.date.today()
+        rng = random.Random(0)
+        dates = [
+            today - datetime.timedelta(days=rng.randrange(0, 3650))
+            for _ in range(options['rows'])
+        ]
+
+        started = time.perf_counter()
+        get_table()
+        self.stdout.write(f"table build: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        def with_jdatetime():
+            for d in dates:
+                jdatetime.datetime.fromgregorian(datetime=d).strftime('%Y/%m/%d')
+
+        def with_jdatetime_parts():
+            for d in dates:
+                j = jdatetime.date.fromgregorian(date=d)
+                (j.year, j.month, j.day)
+
+        def with_table():
+            for d in dates:
+                to_jalali_string(d)
+
+        def with_table_parts():
+            for d in dates:
+                to_jalali_parts(d)
+
+        for label, func in (
+            ('jdatetime strftime', with_jdatetime),
+            ('table string', with_table),
+            ('jdatetime parts', with_jdatetime_parts),
+            ('table parts', with_table_parts),
+        ):
+            best = min(self.time_once(func) for _ in range(options['repeat']))
+            self.stdout.write(
+                f"{label:<20} {best * 1000:>9.2f} ms per {options['rows']} rows  "
+                f"({best / options['rows'] * 1e6:.2f} us/row)"
+            )
+
+    @staticmethod
+    def time_once(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
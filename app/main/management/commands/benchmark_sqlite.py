@@ -0,0 +1,108 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from django.core.management.base import BaseCommand
+from ...sqlite import (
+    get_sqlite_pragmas,
+    apply_sqlite_pragmas,
+)
+
+
+class Command(BaseCommand):
+    help = ("Measures concurrent read/write throughput on a scratch SQLite database "
+            "with SQLite defaults and with settings.SQLITE_PRAGMAS applied.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--rows', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('defaults', {}),
+            ('pragmas', get_sqlite_pragmas()),
+        ]
+
+        for label, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'bench.sqlite3')
+                self.seed(path, options['rows'])
+                result = self.run_profile(path, pragmas, options)
+
+            self.stdout.write(
+                f"{label:<10} reads/s: {result['reads'] / options['seconds']:>10.1f}  "
+                f"writes/s: {result['writes'] / options['seconds']:>10.1f}  "
+                f"locked errors: {result['locked']}"
+            )
+
+    @staticmethod
+    def seed(path, rows):
+        conn = sqlite3.connect(path)
+        conn.execute(
+            'CREATE TABLE tx (id INTEGER PRIMARY KEY, kind TEXT, amount INTEGER, date TEXT)'
+        )
+        conn.execute('CREATE INDEX tx_kind_date ON tx (kind, date)')
+        conn.executemany(
+            'INSERT INTO tx (kind, amount, date) VALUES (?, ?, ?)',
+            (
+                ('EIT'[i % 3], i % 10000, f'2024-{1 + i % 12:02d}-{1 + i % 28:02d}')
+                for i in range(rows)
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def run_profile(path, pragmas, options):
+        deadline = time.perf_counter() + options['seconds']
+        counters = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def connect():
+            conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            apply_sqlite_pragmas(conn.cursor(), pragmas)
+            return conn
+
+        def reader():
+            conn, done, locked = connect(), 0, 0
+            while time.perf_counter() < deadline:
+                try:
+                    conn.execute(
+                        "SELECT SUM(amount), COUNT(*) FROM tx WHERE kind = 'E' AND date >= '2024-03-01'"
+                    ).fetchone()
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                counters['reads'] += done
+                counters['locked'] += locked
+
+        def writer():
+            conn, done, locked = connect(), 0, 0
+            while time.perf_counter() < deadline:
+                try:
+                    with conn:
+                        conn.execute(
+                            "INSERT INTO tx (kind, amount, date) VALUES ('E', 100, '2024-06-01')"
+                        )
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                counters['writes'] += done
+                counters['locked'] += locked
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return counters
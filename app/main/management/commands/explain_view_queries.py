@@ -0,0 +1,192 @@
+import re
+import jdatetime
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+)
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from ...models import (
+    Category,
+    Transaction,
+)
+from ...pagination import get_keyset_page
+from ...periods import get_period_range
+from ...pivot import PIVOT_DIMENSIONS
+from ...report_filters import (
+    FILTER_LOOKUPS,
+    ID_PARAMS,
+    ReportFilter,
+    apply_report_filters,
+)
+from ...search import search_transactions
+from ...views.dashboard import (
+    get_current_month_transactions,
+    get_category_tag_payload,
+)
+from ...views.reporting import (
+    get_report_summary,
+    get_commission_summary,
+    prepare_pivot,
+    get_pivot_payload,
+)
+
+
+# Filter values the report queries are planned with.
+SAMPLE_FILTERS = {
+    'type': 'E',
+    **{name: 1 for name in ID_PARAMS},
+}
+
+# Report helpers cache their results; without a cache every call runs the
+# queries a view runs on a miss.
+NO_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ("Runs EXPLAIN QUERY PLAN for the transaction queries issued by the views "
+            "and fails if any of them falls back to a full table scan.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This command only supports the SQLite backend.')
+
+        table = Transaction._meta.db_table
+        # Word boundary, so a scan of the full-text table does not count.
+        table_scan = re.compile(rf'SCAN {table}\b')
+        failures = []
+
+        with override_settings(CACHES=NO_CACHE):
+            for name, query in self.get_view_queries():
+                statements = self.get_statements(query, table)
+                for number, (sql, params) in enumerate(statements, start=1):
+                    label = name if len(statements) == 1 else f'{name} [{number}/{len(statements)}]'
+
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                        plan = [row[-1] for row in cursor.fetchall()]
+
+                    if any(table_scan.match(step) for step in plan):
+                        failures.append(label)
+                        self.stdout.write(self.style.ERROR(f'[SCAN] {label}'))
+                    else:
+                        self.stdout.write(self.style.SUCCESS(f'[ OK ] {label}'))
+
+                    for step in plan:
+                        self.stdout.write(f'         {step}')
+
+        if failures:
+            raise CommandError(
+                f'{len(failures)} query(ies) fall back to a table scan: {", ".join(failures)}'
+            )
+
+    @staticmethod
+    def get_statements(query, table):
+        """(sql, params) of a queryset, or of every SELECT on ``table`` a view helper runs."""
+        if isinstance(query, QuerySet):
+            return [query.query.sql_with_params()]
+
+        with CaptureQueriesContext(connection) as context:
+            query()
+
+        # Captured SQL has its parameters inlined already.
+        return [
+            (captured['sql'], None)
+            for captured in context.captured_queries
+            if captured['sql'].startswith('SELECT') and f'"{table}"' in captured['sql']
+        ]
+
+    @staticmethod
+    def get_view_queries():
+        """(name, queryset or callable running a view's helpers) for every transaction query the views issue."""
+        today = jdatetime.date.today()
+        period = {
+            'report_type': 'monthly',
+            'year': today.year,
+            'month': today.month,
+        }
+        month_start, month_end = get_period_range('month', today.year, today.month)
+        month_queryset = Transaction.objects.filter(
+            date__gte=month_start,
+            date__lt=month_end,
+        )
+
+        queries = [
+            (
+                'transactions / get_transactions_by_month',
+                lambda: (get_keyset_page(month_queryset), month_queryset.count()),
+            ),
+            (
+                'get_current_month_transactions',
+                get_current_month_transactions('E')['transactions'],
+            ),
+            (
+                'get_category_transactions_ajax',
+                month_queryset.filter(category_id=SAMPLE_FILTERS['category']).order_by('-date'),
+            ),
+        ]
+
+        category_id = Category.objects.filter(kind='E').values_list('id', flat=True).first()
+        if category_id:
+            queries.append(
+                (
+                    'category_tag_report_api',
+                    lambda: get_category_tag_payload(category_id, 'E'),
+                )
+            )
+
+        for name in (None, *FILTER_LOOKUPS):
+            report = ReportFilter(
+                {**period, name: SAMPLE_FILTERS[name]} if name else period
+            )
+            queries.append(
+                (
+                    f'filter_transactions_ajax ({name or "period"})',
+                    lambda report=report: (report.get_page(), report.get_totals()),
+                )
+            )
+
+        report = ReportFilter(period)
+        queries += [
+            (
+                'filter_transactions_ajax (summary)',
+                lambda: get_report_summary(report.queryset),
+            ),
+            (
+                'filter_transactions_ajax (commission)',
+                lambda: get_commission_summary(report.queryset),
+            ),
+            (
+                'export_transactions_excel',
+                lambda: next(iter(report.iter_rows()), None),
+            ),
+            (
+                'search_transactions_ajax',
+                search_transactions(
+                    apply_report_filters(Transaction.objects.all(), {}),
+                    'خرید',
+                )[:100],
+            ),
+        ]
+
+        for dimension in PIVOT_DIMENSIONS:
+            pivot_report, _, _ = prepare_pivot({**period, 'dimension': dimension})
+            queries.append(
+                (
+                    f'pivot_report_api ({dimension})',
+                    lambda pivot_report=pivot_report, dimension=dimension: get_pivot_payload(
+                        pivot_report,
+                        dimension,
+                    ),
+                )
+            )
+
+        return queries
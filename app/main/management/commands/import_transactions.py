@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from ...importer import (
+    read_rows,
+    import_transactions,
+)
+
+
+class Command(BaseCommand):
+    help = ("Imports transactions from a CSV or XLSX statement in one bulk, "
+            "all-or-nothing batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate every row without writing anything.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        try:
+            with open(options['path'], 'rb') as file:
+                created, errors = import_transactions(
+                    read_rows(file, options['path']),
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if errors:
+            for error in errors:
+                fields = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+                self.stderr.write(f"row {error['row'] or '-'}: {fields}")
+            raise CommandError(f'{len(errors)} invalid row(s); nothing was imported.')
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {created} transaction(s) in {time.perf_counter() - started:.1f} s.'
+            )
+        )
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from ...models import (
+    Transaction,
+    MonthlyCategoryTotal,
+)
+from ...db_functions import (
+    JalaliYear,
+    JalaliMonth,
+    JalaliDay,
+)
+from ...caching import bump_data_version
+
+
+class Command(BaseCommand):
+    help = ("Re-derives the Transaction jyear/jmonth/jday columns in SQL and regenerates "
+            "the MonthlyCategoryTotal rollup table from the raw transactions.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Transaction.objects.update(
+                jyear=JalaliYear('date'),
+                jmonth=JalaliMonth('date'),
+                jday=JalaliDay('date'),
+            )
+            buckets = MonthlyCategoryTotal.rebuild()
+            bump_data_version()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {buckets} monthly category bucket(s).')
+        )
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from ...search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text index over transaction descriptions."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            indexed = rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} transaction(s).')
+        )
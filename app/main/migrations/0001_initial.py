@@ -0,0 +1,111 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:37
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='شناسه')),
+                ('date', models.DateField(default=django.utils.timezone.now, verbose_name='تاریخ پشتیبان\u200cگیری')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='توضیحات')),
+            ],
+            options={
+                'verbose_name': 'پشتیبان\u200cگیری',
+                'verbose_name_plural': 'پشتیبان\u200cگیری\u200cها',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Card',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('melli', 'بانک ملی'), ('saderat', 'بانک صادرات'), ('sepah', 'بانک سپه'), ('tejarat', 'بانک تجارت'), ('mellat', 'بانک ملت'), ('pasargad', 'بانک پاسارگاد'), ('ayande', 'بانک آینده'), ('blu', 'بانک بلو'), ('refah', 'بانک رفاه'), ('eghtesad_novin', 'بانک اقتصاد نوین'), ('shahr', 'بانک شهر'), ('parsian', 'بانک پارسیان'), ('keshavarzi', 'بانک کشاورزی'), ('saman', 'بانک سامان')], max_length=100, verbose_name='نام بانک')),
+                ('owner', models.CharField(max_length=100, verbose_name='نام صاحب حساب')),
+                ('number', models.CharField(max_length=100, verbose_name='شماره کارت')),
+                ('balance', models.DecimalField(decimal_places=0, default=0, max_digits=15, verbose_name='موجودی')),
+                ('color', models.CharField(choices=[('#007bff', 'آبی'), ('#dc3545', 'قرمز'), ('#28a745', 'سبز'), ('#ffc107', 'زرد'), ('#6f42c1', 'بنفش'), ('#708090', 'سربی'), ('#343a40', 'مشکی ')], default='#007bff', max_length=7, verbose_name='رنگ کارت')),
+                ('active', models.BooleanField(default=True, verbose_name='فعال')),
+            ],
+            options={
+                'verbose_name': 'کارت',
+                'verbose_name_plural': 'کارت\u200cها',
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='نام دسته بندی')),
+                ('kind', models.CharField(choices=[('I', 'درآمد'), ('E', 'هزینه'), ('T', 'انتقال')], default='E', max_length=1, verbose_name='نوع دسته بندی')),
+            ],
+            options={
+                'verbose_name': 'دسته\u200cبندی',
+                'verbose_name_plural': 'دسته\u200cبندی\u200cها',
+            },
+        ),
+        migrations.CreateModel(
+            name='Gold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.DecimalField(decimal_places=3, default=Decimal('0'), max_digits=10, verbose_name='وزن طلا (سوت)')),
+                ('price', models.DecimalField(decimal_places=0, default=Decimal('0'), max_digits=30, verbose_name='مبلغ خرید (ریال)')),
+                ('p_price', models.DecimalField(blank=True, decimal_places=0, default=Decimal('0'), max_digits=30, null=True, verbose_name='مبلغ فروش (ریال)')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='تاریخ خرید')),
+                ('p_date', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ فروش')),
+                ('is_sold', models.BooleanField(default=False, verbose_name='فروخته شده')),
+                ('description', models.TextField(blank=True, verbose_name='توضیحات')),
+            ],
+            options={
+                'verbose_name': 'طلا',
+                'verbose_name_plural': 'طلاها',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='نام تگ')),
+            ],
+            options={
+                'verbose_name': 'تگ',
+                'verbose_name_plural': 'تگ\u200cها',
+            },
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('I', 'درآمد'), ('E', 'هزینه'), ('T', 'انتقال')], max_length=1, verbose_name='نوع تراکنش')),
+                ('amount', models.DecimalField(decimal_places=0, max_digits=15, validators=[django.core.validators.MinValueValidator(0)], verbose_name='مبلغ (ریال)')),
+                ('source_balance_after', models.DecimalField(blank=True, decimal_places=0, max_digits=15, null=True, verbose_name='موجودی حساب مبدا پس از تراکنش')),
+                ('destination_balance_after', models.DecimalField(blank=True, decimal_places=0, max_digits=15, null=True, verbose_name='موجودی حساب مقصد پس از تراکنش')),
+                ('date', models.DateField(default=django.utils.timezone.now, verbose_name='تاریخ تراکنش')),
+                ('description', models.TextField(verbose_name='توضیحات')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='main.category', verbose_name='دسته\u200cبندی')),
+                ('destination', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='incoming_transactions', to='main.card', verbose_name='حساب مقصد')),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='outgoing_transactions', to='main.card', verbose_name='حساب مبدا')),
+                ('tags', models.ManyToManyField(blank=True, to='main.tag', verbose_name='تگ\u200cها')),
+            ],
+            options={
+                'verbose_name': 'تراکنش',
+                'verbose_name_plural': 'تراکنش\u200cها',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
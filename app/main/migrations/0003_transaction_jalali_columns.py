@@ -0,0 +1,65 @@
+import jdatetime
+from django.db import migrations, models
+
+
+# Frozen copy of the conversion, so later changes to main.utils cannot
+# change what this migration writes.
+def get_jalali_parts(date):
+    jdate = jdatetime.date.fromgregorian(date=date)
+    return jdate.year, jdate.month, jdate.day
+
+
+def backfill_jalali_columns(apps, schema_editor):
+    Transaction = apps.get_model('main', 'Transaction')
+
+    batch = []
+    for t in Transaction.objects.only('id', 'date').iterator(chunk_size=2000):
+        t.jyear, t.jmonth, t.jday = get_jalali_parts(t.date)
+        batch.append(t)
+
+        if len(batch) >= 2000:
+            Transaction.objects.bulk_update(batch, ['jyear', 'jmonth', 'jday'])
+            batch = []
+
+    if batch:
+        Transaction.objects.bulk_update(batch, ['jyear', 'jmonth', 'jday'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='jyear',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='سال شمسی'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='jmonth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='ماه شمسی'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='jday',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='روز شمسی'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            backfill_jalali_columns,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['jyear', 'jmonth', 'jday'], name='transaction_jdate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['kind', 'jyear', 'jmonth'], name='transaction_kind_jmonth_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum, Count
+
+
+def populate_monthly_totals(apps, schema_editor):
+    Transaction = apps.get_model('main', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('main', 'MonthlyCategoryTotal')
+
+    totals = Transaction.objects.values(
+        'jyear',
+        'jmonth',
+        'kind',
+        'category_id',
+    ).annotate(
+        sum_amount=Sum('amount'),
+        num=Count('id'),
+    ).order_by()
+
+    MonthlyCategoryTotal.objects.bulk_create(
+        [
+            MonthlyCategoryTotal(
+                jyear=item['jyear'],
+                jmonth=item['jmonth'],
+                kind=item['kind'],
+                category_id=item['category_id'],
+                total=item['sum_amount'],
+                count=item['num'],
+            )
+            for item in totals
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_transaction_jalali_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jyear', models.PositiveSmallIntegerField(verbose_name='سال شمسی')),
+                ('jmonth', models.PositiveSmallIntegerField(verbose_name='ماه شمسی')),
+                ('kind', models.CharField(choices=[('I', 'درآمد'), ('E', 'هزینه'), ('T', 'انتقال')], max_length=1, verbose_name='نوع تراکنش')),
+                ('total', models.DecimalField(decimal_places=0, default=0, max_digits=20, verbose_name='جمع مبالغ (ریال)')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='تعداد تراکنش')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to='main.category', verbose_name='دسته\u200cبندی')),
+            ],
+            options={
+                'verbose_name': 'جمع ماهانه دسته\u200cبندی',
+                'verbose_name_plural': 'جمع\u200cهای ماهانه دسته\u200cبندی\u200cها',
+                'constraints': [models.UniqueConstraint(fields=('jyear', 'jmonth', 'kind', 'category'), name='unique_monthly_category_total')],
+            },
+        ),
+        migrations.RunPython(
+            populate_monthly_totals,
+            migrations.RunPython.noop,
+        ),
+    ]
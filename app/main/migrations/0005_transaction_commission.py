@@ -0,0 +1,78 @@
+import re
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# Frozen copies of the description parsing in main.utils, so later changes
+# there cannot change what this migration writes.
+COMMISSION_PATTERN = re.compile(r'\s*\(کارمزد:\s*([0-9,،\u06F0-\u06F9]+)\s*ریال\)')
+
+
+def extract_commission_from_description(description):
+    if not description:
+        return Decimal(0)
+
+    match = COMMISSION_PATTERN.search(description)
+
+    if match:
+        amount_str = match.group(1)
+
+        persian_to_english = str.maketrans('۰۱۲۳۴۵۶۷۸۹', '0123456789')
+        english_amount_str = amount_str.translate(persian_to_english)
+
+        return Decimal(english_amount_str.replace(',', '').replace('،', ''))
+
+    return Decimal(0)
+
+
+def strip_commission_from_description(description):
+    if not description:
+        return description
+    return COMMISSION_PATTERN.sub('', description).rstrip()
+
+
+def backfill_commission(apps, schema_editor):
+    Transaction = apps.get_model('main', 'Transaction')
+
+    batch = []
+    for t in Transaction.objects.filter(
+        description__contains='کارمزد',
+    ).only('id', 'description').iterator(chunk_size=2000):
+        t.commission = extract_commission_from_description(t.description)
+        t.description = strip_commission_from_description(t.description)
+        batch.append(t)
+
+    Transaction.objects.bulk_update(batch, ['commission', 'description'], batch_size=2000)
+
+
+def restore_commission_description(apps, schema_editor):
+    Transaction = apps.get_model('main', 'Transaction')
+
+    batch = []
+    for t in Transaction.objects.filter(
+        kind='T',
+    ).only('id', 'description', 'commission').iterator(chunk_size=2000):
+        t.description += f" (کارمزد: {t.commission} ریال)"
+        batch.append(t)
+
+    Transaction.objects.bulk_update(batch, ['description'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0004_monthly_category_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='commission',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=15, validators=[django.core.validators.MinValueValidator(0)], verbose_name='کارمزد (ریال)'),
+        ),
+        migrations.RunPython(
+            backfill_commission,
+            restore_commission_description,
+        ),
+    ]
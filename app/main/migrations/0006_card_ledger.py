@@ -0,0 +1,118 @@
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q
+
+
+CHECKPOINT_INTERVAL = 100
+
+
+def backfill_ledger(apps, schema_editor):
+    Card = apps.get_model('main', 'Card')
+    Transaction = apps.get_model('main', 'Transaction')
+    CardLedgerEntry = apps.get_model('main', 'CardLedgerEntry')
+    CardBalanceCheckpoint = apps.get_model('main', 'CardBalanceCheckpoint')
+
+    for card in Card.objects.all():
+        transactions = Transaction.objects.filter(
+            Q(source=card, kind__in=['E', 'T']) | Q(destination=card, kind__in=['I', 'T'])
+        ).order_by('date', 'id')
+
+        legs = []
+        for t in transactions:
+            if t.kind in ('E', 'T') and t.source_id == card.id:
+                legs.append((t, -(t.amount + t.commission), 'source_balance_after'))
+            if t.kind in ('I', 'T') and t.destination_id == card.id:
+                legs.append((t, t.amount, 'destination_balance_after'))
+
+        card.opening_balance = card.balance - sum((amount for _, amount, _ in legs), Decimal(0))
+        card.save(update_fields=['opening_balance'])
+
+        entries, checkpoints, updated = [], [], []
+        running, since_checkpoint = card.opening_balance, 0
+
+        for index, (t, amount, snapshot_field) in enumerate(legs):
+            running += amount
+            since_checkpoint += 1
+
+            entries.append(
+                CardLedgerEntry(
+                    card=card,
+                    transaction=t,
+                    date=t.date,
+                    amount=amount,
+                )
+            )
+            setattr(t, snapshot_field, running)
+            updated.append(t)
+
+            is_last_of_day = index + 1 == len(legs) or legs[index + 1][0].date != t.date
+            if since_checkpoint >= CHECKPOINT_INTERVAL and is_last_of_day:
+                checkpoints.append(
+                    CardBalanceCheckpoint(
+                        card=card,
+                        date=t.date,
+                        balance=running,
+                    )
+                )
+                since_checkpoint = 0
+
+        CardLedgerEntry.objects.bulk_create(entries, batch_size=2000)
+        CardBalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=2000)
+        Transaction.objects.bulk_update(
+            updated,
+            ['source_balance_after', 'destination_balance_after'],
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_transaction_commission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=15, verbose_name='موجودی اولیه'),
+        ),
+        migrations.CreateModel(
+            name='CardBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='تاریخ')),
+                ('balance', models.DecimalField(decimal_places=0, max_digits=20, verbose_name='موجودی در پایان روز')),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='main.card', verbose_name='حساب')),
+            ],
+            options={
+                'verbose_name': 'نقطه کنترل موجودی',
+                'verbose_name_plural': 'نقاط کنترل موجودی',
+                'ordering': ['card', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('card', 'date'), name='unique_card_checkpoint_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CardLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='تاریخ')),
+                ('amount', models.DecimalField(decimal_places=0, max_digits=15, verbose_name='مبلغ (ریال)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='زمان ثبت')),
+                ('card', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='main.card', verbose_name='حساب')),
+                ('reverses', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='reversals', to='main.cardledgerentry', verbose_name='برگشت ثبت')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='main.transaction', verbose_name='تراکنش')),
+            ],
+            options={
+                'verbose_name': 'ثبت دفتر حساب',
+                'verbose_name_plural': 'دفتر حساب\u200cها',
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['card', 'date'], name='ledger_card_date_idx')],
+            },
+        ),
+        migrations.RunPython(
+            backfill_ledger,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+# Frozen copy of the normalization in main.utils, so later changes there
+# cannot change what this migration writes.
+PERSIAN_NORMALIZATION_TABLE = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    '\u200c': None,
+    **{persian: str(digit) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(digit) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+
+
+def normalize_persian_text(text):
+    if not text:
+        return ''
+    return text.translate(PERSIAN_NORMALIZATION_TABLE)
+
+
+def populate_fts(apps, schema_editor):
+    Transaction = apps.get_model('main', 'Transaction')
+
+    rows = [
+        (t.id, normalize_persian_text(t.description))
+        for t in Transaction.objects.only('id', 'description').iterator(chunk_size=2000)
+    ]
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO main_transaction_fts (rowid, description) VALUES (%s, %s)',
+            rows,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_card_ledger'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE main_transaction_fts USING fts5("
+            "description, tokenize = 'unicode61 remove_diacritics 2')",
+            "DROP TABLE main_transaction_fts",
+        ),
+        migrations.RunPython(
+            populate_fts,
+            migrations.RunPython.noop,
+        ),
+    ]
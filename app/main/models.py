@@ -1,10 +1,20 @@
 import uuid
 from decimal import Decimal
 from django.db import models
+from django.db.models import (
+    F,
+    Sum,
+    Count,
+)
 from django.utils import timezone
 from django.core.validators import MinValueValidator
+from .db_functions import (
+    JalaliYear,
+    JalaliMonth,
+)
 from .utils import (
     get_jalali_date,
+    get_jalali_parts,
     BANK_CHOICES,
     CARD_COLOR_CHOICES,
     TRANSACTION_AND_KIND_CHOICES,
@@ -31,6 +41,12 @@ class Card(models.Model):
         default=0,
         verbose_name="موجودی",
     )
+    opening_balance = models.DecimalField(
+        max_digits=15,
+        decimal_places=0,
+        default=0,
+        verbose_name="موجودی اولیه",
+    )
     color = models.CharField(
         max_length=7,
         choices=CARD_COLOR_CHOICES,
@@ -49,6 +65,10 @@ class Card(models.Model):
     def __str__(self):
         return f"{self.name} - {self.owner} - {self.number}"
 
+    def balance_at(self, date):
+        from .ledger import get_balance_at
+        return get_balance_at(self.id, date, self.opening_balance)
+
 
 class Category(models.Model):
     name = models.CharField(
@@ -97,6 +117,13 @@ class Transaction(models.Model):
         validators=[MinValueValidator(0)],
         verbose_name="مبلغ (ریال)",
     )
+    commission = models.DecimalField(
+        max_digits=15,
+        decimal_places=0,
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name="کارمزد (ریال)",
+    )
     source = models.ForeignKey(
         Card,
         on_delete=models.PROTECT,
@@ -145,16 +172,268 @@ class Transaction(models.Model):
         blank=True,
         verbose_name="تگ‌ها",
     )
+    jyear = models.PositiveSmallIntegerField(
+        editable=False,
+        verbose_name="سال شمسی",
+    )
+    jmonth = models.PositiveSmallIntegerField(
+        editable=False,
+        verbose_name="ماه شمسی",
+    )
+    jday = models.PositiveSmallIntegerField(
+        editable=False,
+        verbose_name="روز شمسی",
+    )
 
     class Meta:
         verbose_name = "تراکنش"
         verbose_name_plural = "تراکنش‌ها"
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='transaction_date_id_idx'),
+            models.Index(fields=['kind', 'date'], name='transaction_kind_date_idx'),
+            models.Index(fields=['category', 'date'], name='transaction_category_date_idx'),
+            models.Index(fields=['source', 'date'], name='transaction_source_date_idx'),
+            models.Index(fields=['destination', 'date'], name='transaction_dest_date_idx'),
+            models.Index(fields=['jyear', 'jmonth', 'jday'], name='transaction_jdate_idx'),
+            models.Index(fields=['kind', 'jyear', 'jmonth'], name='transaction_kind_jmonth_idx'),
+        ]
 
     def __str__(self):
         jalali_dt = get_jalali_date(self.date)
         return f"{self.get_kind_display()} - {self.amount:,} تومان در تاریخ {jalali_dt}"
 
+    def save(self, *args, **kwargs):
+        self.date = self._meta.get_field('date').to_python(self.date)
+        self.jyear, self.jmonth, self.jday = get_jalali_parts(self.date)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'date' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'jyear', 'jmonth', 'jday'}
+
+        super().save(*args, **kwargs)
+
+
+class MonthlyCategoryTotal(models.Model):
+    jyear = models.PositiveSmallIntegerField(
+        verbose_name="سال شمسی",
+    )
+    jmonth = models.PositiveSmallIntegerField(
+        verbose_name="ماه شمسی",
+    )
+    kind = models.CharField(
+        max_length=1,
+        choices=TRANSACTION_AND_KIND_CHOICES,
+        verbose_name="نوع تراکنش",
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name='monthly_totals',
+        verbose_name="دسته‌بندی",
+    )
+    total = models.DecimalField(
+        max_digits=20,
+        decimal_places=0,
+        default=0,
+        verbose_name="جمع مبالغ (ریال)",
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="تعداد تراکنش",
+    )
+
+    class Meta:
+        verbose_name = "جمع ماهانه دسته‌بندی"
+        verbose_name_plural = "جمع‌های ماهانه دسته‌بندی‌ها"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['jyear', 'jmonth', 'kind', 'category'],
+                name='unique_monthly_category_total',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.jyear}/{self.jmonth:02d} - {self.get_kind_display()} - {self.category_id}: {self.total:,}"
+
+    @classmethod
+    def apply(cls, transaction, sign=1):
+        """Adds (sign=1) or removes (sign=-1) a transaction from its month's totals.
+
+        Must be called inside the atomic block that writes the transaction.
+        """
+        bucket = cls.objects.filter(
+            jyear=transaction.jyear,
+            jmonth=transaction.jmonth,
+            kind=transaction.kind,
+            category_id=transaction.category_id,
+        )
+
+        updated = bucket.update(
+            total=F('total') + sign * transaction.amount,
+            count=F('count') + sign,
+        )
+
+        if not updated and sign > 0:
+            cls.objects.create(
+                jyear=transaction.jyear,
+                jmonth=transaction.jmonth,
+                kind=transaction.kind,
+                category_id=transaction.category_id,
+                total=transaction.amount,
+                count=1,
+            )
+        elif sign < 0:
+            bucket.filter(count=0).delete()
+
+    @classmethod
+    def apply_many(cls, transactions):
+        """Adds many new transactions with one UPDATE (or INSERT) per touched bucket."""
+        buckets = {}
+        for transaction in transactions:
+            key = (transaction.jyear, transaction.jmonth, transaction.kind, transaction.category_id)
+            total, count = buckets.get(key, (0, 0))
+            buckets[key] = (total + transaction.amount, count + 1)
+
+        missing = []
+        for (jyear, jmonth, kind, category_id), (total, count) in buckets.items():
+            updated = cls.objects.filter(
+                jyear=jyear,
+                jmonth=jmonth,
+                kind=kind,
+                category_id=category_id,
+            ).update(
+                total=F('total') + total,
+                count=F('count') + count,
+            )
+            if not updated:
+                missing.append(
+                    cls(
+                        jyear=jyear,
+                        jmonth=jmonth,
+                        kind=kind,
+                        category_id=category_id,
+                        total=total,
+                        count=count,
+                    )
+                )
+
+        cls.objects.bulk_create(missing)
+        return len(buckets)
+
+    @classmethod
+    def rebuild(cls):
+        """Regenerates every bucket from the raw transactions."""
+        # Bucketed straight from the date so a drifted jyear/jmonth column
+        # cannot leak into the rebuilt totals.
+        totals = Transaction.objects.values(
+            'kind',
+            'category_id',
+            bucket_year=JalaliYear('date'),
+            bucket_month=JalaliMonth('date'),
+        ).annotate(
+            sum_amount=Sum('amount'),
+            num=Count('id'),
+        ).order_by()
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    jyear=item['bucket_year'],
+                    jmonth=item['bucket_month'],
+                    kind=item['kind'],
+                    category_id=item['category_id'],
+                    total=item['sum_amount'],
+                    count=item['num'],
+                )
+                for item in totals
+            ],
+            batch_size=1000,
+        )
+        return len(totals)
+
+
+class CardLedgerEntry(models.Model):
+    card = models.ForeignKey(
+        Card,
+        on_delete=models.PROTECT,
+        related_name='ledger_entries',
+        verbose_name="حساب",
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries',
+        verbose_name="تراکنش",
+    )
+    reverses = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='reversals',
+        verbose_name="برگشت ثبت",
+    )
+    date = models.DateField(
+        verbose_name="تاریخ",
+    )
+    amount = models.DecimalField(
+        max_digits=15,
+        decimal_places=0,
+        verbose_name="مبلغ (ریال)",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="زمان ثبت",
+    )
+
+    class Meta:
+        verbose_name = "ثبت دفتر حساب"
+        verbose_name_plural = "دفتر حساب‌ها"
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['card', 'date'], name='ledger_card_date_idx'),
+        ]
+
+    def __str__(self):
+        jalali_dt = get_jalali_date(self.date)
+        return f"{self.card_id} | {self.amount:,} ریال در تاریخ {jalali_dt}"
+
+
+class CardBalanceCheckpoint(models.Model):
+    card = models.ForeignKey(
+        Card,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+        verbose_name="حساب",
+    )
+    date = models.DateField(
+        verbose_name="تاریخ",
+    )
+    balance = models.DecimalField(
+        max_digits=20,
+        decimal_places=0,
+        verbose_name="موجودی در پایان روز",
+    )
+
+    class Meta:
+        verbose_name = "نقطه کنترل موجودی"
+        verbose_name_plural = "نقاط کنترل موجودی"
+        ordering = ['card', 'date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['card', 'date'],
+                name='unique_card_checkpoint_date',
+            ),
+        ]
+
+    def __str__(self):
+        jalali_dt = get_jalali_date(self.date)
+        return f"{self.card_id} | {self.balance:,} ریال در پایان {jalali_dt}"
+
 
 class Gold(models.Model):
     weight = models.DecimalField(
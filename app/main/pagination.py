@@ -0,0 +1,53 @@
+import base64
+import datetime
+from django.db.models import Q
+from .serializers import get_transaction_rows
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(date, pk):
+    raw = f'{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """(date, id) of the last row of the previous page; raises ValueError for a malformed token."""
+    raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+    date_part, pk_part = raw.split('|')
+    return datetime.date.fromisoformat(date_part), int(pk_part)
+
+
+def get_page_size(params):
+    try:
+        page_size = int(params.get('page_size') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def get_keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """(rows, next cursor) for one page of ``queryset`` walked newest first by (date, id).
+
+    Seeks past the cursor with a (date, id) comparison instead of OFFSET, so
+    every page costs the same and rows inserted meanwhile never shift pages.
+    """
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id)
+        )
+
+    rows = get_transaction_rows(
+        queryset.order_by('-date', '-id')[:page_size + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1]['date'], rows[-1]['id'])
+
+    return rows, next_cursor
+
@@ -0,0 +1,84 @@
+import re
+import datetime
+import jdatetime
+from functools import lru_cache
+from .jcalendar import to_jalali_parts
+from .utils import normalize_persian_text
+
+
+PERIODS = (
+    'day',
+    'week',
+    'month',
+    'quarter',
+    'year',
+)
+
+ONE_DAY = datetime.timedelta(days=1)
+
+DATE_SEPARATORS = re.compile(r'[/\-.]')
+
+
+def _to_gregorian(year, month, day):
+    return jdatetime.date(year, month, day).togregorian()
+
+
+def _month_start(year, month):
+    # Normalizes month overflow so "month 13" is Farvardin of the next year.
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return _to_gregorian(year, month, 1)
+
+
+@lru_cache(maxsize=2048)
+def get_period_range(period, year, month=1, day=1):
+    """Half-open Gregorian range [start, end) of the Jalali ``period`` containing year/month/day.
+
+    Weeks start on Saturday. Raises ValueError for an unknown period or an
+    invalid Jalali date.
+    """
+    anchor = jdatetime.date(year, month, day)
+
+    if period == 'day':
+        start = anchor.togregorian()
+        return start, start + ONE_DAY
+
+    if period == 'week':
+        start = anchor.togregorian() - datetime.timedelta(days=anchor.weekday())
+        return start, start + datetime.timedelta(days=7)
+
+    if period == 'month':
+        return _month_start(year, month), _month_start(year, month + 1)
+
+    if period == 'quarter':
+        first_month = (month - 1) // 3 * 3 + 1
+        return _month_start(year, first_month), _month_start(year, first_month + 3)
+
+    if period == 'year':
+        return _to_gregorian(year, 1, 1), _to_gregorian(year + 1, 1, 1)
+
+    raise ValueError(f'Unknown period: {period!r}')
+
+
+def parse_jalali_parts(value):
+    """(year, month, day) of a 'YYYY/MM/DD' Jalali date, Persian digits allowed; ValueError when malformed."""
+    parts = DATE_SEPARATORS.split(normalize_persian_text(value.strip()))
+    if len(parts) != 3:
+        raise ValueError(value)
+    return tuple(int(part) for part in parts)
+
+
+@lru_cache(maxsize=2048)
+def get_custom_range(start, end):
+    """Half-open Gregorian range covering the inclusive Jalali (y, m, d) dates ``start``..``end``."""
+    start_date = _to_gregorian(*start)
+    end_date = _to_gregorian(*end) + ONE_DAY
+
+    if end_date <= start_date:
+        raise ValueError('The end of a custom period must not be before its start.')
+    return start_date, end_date
+
+
+def get_current_period_range(period):
+    """Range of the Jalali ``period`` containing today."""
+    return get_period_range(period, *to_jalali_parts(datetime.date.today()))
@@ -0,0 +1,151 @@
+from django.db.models import (
+    F,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+from .periods import ONE_DAY
+from .jcalendar import to_jalali_parts
+from .serializers import get_card_labels
+from .utils import MONTHS_NAME
+
+
+# dimension -> (row header, label of rows without one)
+PIVOT_DIMENSIONS = {
+    'category': ('دسته‌بندی', 'بدون دسته‌بندی'),
+    'tag': ('تگ', 'بدون تگ'),
+    'card': ('حساب', 'نامشخص'),
+}
+
+# Dimensions whose rows overlap, so a transaction can appear in several.
+OVERLAPPING_DIMENSIONS = ('tag',)
+
+TOTALS_LABEL = 'جمع'
+DISTINCT_TOTALS_LABEL = 'جمع (هر تراکنش یک بار)'
+
+
+def get_pivot_cells(queryset, dimension):
+    """One grouped query: row id, row label (None for cards), jyear, jmonth and total per non-empty cell.
+
+    A transaction with several tags counts under each of them. Cards are
+    the paying card, or for income the receiving one.
+    """
+    if dimension == 'category':
+        row_fields = {'row_id': F('category_id'), 'label': F('category__name')}
+    elif dimension == 'tag':
+        row_fields = {'row_id': F('tags__id'), 'label': F('tags__name')}
+    else:
+        row_fields = {'row_id': Coalesce('source_id', 'destination_id')}
+
+    return queryset.prefetch_related(None).values(
+        'jyear',
+        'jmonth',
+        **row_fields,
+    ).annotate(
+        total=Sum('amount'),
+    ).order_by()
+
+
+def get_month_totals(queryset):
+    """{(jyear, jmonth): total} with every transaction counted once."""
+    return {
+        (row['jyear'], row['jmonth']): int(row['total'])
+        for row in queryset.prefetch_related(None).values(
+            'jyear',
+            'jmonth',
+        ).annotate(
+            total=Sum('amount'),
+        ).order_by()
+    }
+
+
+def iter_months(first, last):
+    """(year, month) pairs from ``first`` to ``last`` inclusive."""
+    year, month = first
+    while (year, month) <= last:
+        yield year, month
+        year, month = (year, month + 1) if month < 12 else (year + 1, 1)
+
+
+def get_pivot(queryset, dimension, date_range=None):
+    """Dense rows × Jalali months matrix of amount totals, with row, column and grand totals.
+
+    Columns run over every month of ``date_range`` (or of the data when it
+    is None), empty ones included. Rows are sorted by total, largest first.
+    Tag rows overlap, so for tags the column and grand totals come from a
+    second query that counts every transaction once, and are not the sums
+    of the rows.
+    """
+    cells = list(get_pivot_cells(queryset, dimension))
+
+    if date_range:
+        months = list(
+            iter_months(
+                to_jalali_parts(date_range[0])[:2],
+                to_jalali_parts(date_range[1] - ONE_DAY)[:2],
+            )
+        )
+    elif cells:
+        months = list(
+            iter_months(
+                min((cell['jyear'], cell['jmonth']) for cell in cells),
+                max((cell['jyear'], cell['jmonth']) for cell in cells),
+            )
+        )
+    else:
+        months = []
+
+    column_index = {month: index for index, month in enumerate(months)}
+    row_header, unset_label = PIVOT_DIMENSIONS[dimension]
+
+    if dimension == 'card':
+        card_labels = get_card_labels([cell['row_id'] for cell in cells])
+        for cell in cells:
+            cell['label'] = card_labels.get(cell['row_id'])
+
+    rows = {}
+    column_totals = [0] * len(months)
+    grand_total = 0
+
+    for cell in cells:
+        row = rows.get(cell['row_id'])
+        if row is None:
+            row = rows[cell['row_id']] = {
+                'id': cell['row_id'],
+                'label': cell['label'] or unset_label,
+                'values': [0] * len(months),
+                'total': 0,
+            }
+
+        # Amounts are whole rials, so ints keep the matrix exact and compact.
+        total = int(cell['total'])
+        index = column_index[(cell['jyear'], cell['jmonth'])]
+        row['values'][index] += total
+        row['total'] += total
+        column_totals[index] += total
+        grand_total += total
+
+    distinct_totals = dimension in OVERLAPPING_DIMENSIONS
+    if distinct_totals:
+        month_totals = get_month_totals(queryset)
+        column_totals = [month_totals.get(month, 0) for month in months]
+        grand_total = sum(column_totals)
+
+    return {
+        'dimension': dimension,
+        'row_header': row_header,
+        # Whether column and grand totals count each transaction once
+        # rather than adding up rows that may share transactions.
+        'distinct_totals': distinct_totals,
+        'totals_label': DISTINCT_TOTALS_LABEL if distinct_totals else TOTALS_LABEL,
+        'columns': [
+            {
+                'year': year,
+                'month': month,
+                'label': f'{MONTHS_NAME[month - 1]} {year}',
+            }
+            for year, month in months
+        ],
+        'rows': sorted(rows.values(), key=lambda row: (-row['total'], row['label'])),
+        'column_totals': column_totals,
+        'grand_total': grand_total,
+    }
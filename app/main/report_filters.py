@@ -0,0 +1,181 @@
+import hashlib
+from functools import cached_property
+from urllib.parse import urlencode
+from django.db.models import (
+    Sum,
+    Count,
+)
+from .models import Transaction
+from .periods import (
+    get_period_range,
+    get_custom_range,
+    parse_jalali_parts,
+)
+from .caching import get_or_compute
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    get_keyset_page,
+)
+from .serializers import iter_transaction_rows
+
+
+# report_type -> (Jalali period, date parameters it is anchored on)
+REPORT_PERIODS = {
+    'daily': ('day', ('year', 'month', 'day')),
+    'weekly': ('week', ('year', 'month', 'day')),
+    'monthly': ('month', ('year', 'month')),
+    'quarterly': ('quarter', ('year', 'month')),
+    'annual': ('year', ('year',)),
+    'custom': ('custom', ('start', 'end')),
+}
+
+REPORT_TYPE_LABELS = {
+    'daily': 'روزانه',
+    'weekly': 'هفتگی',
+    'monthly': 'ماهانه',
+    'quarterly': 'فصلی',
+    'annual': 'سالانه',
+    'custom': 'بازه دلخواه',
+}
+
+# Query parameter -> lookup it filters on.
+FILTER_LOOKUPS = {
+    'type': 'kind',
+    'category': 'category_id',
+    'tag': 'tags__id',
+    'source': 'source_id',
+    'destination': 'destination_id',
+}
+
+ID_PARAMS = ('category', 'tag', 'source', 'destination')
+
+def get_report_anchor(params):
+    """(period, year[, month[, day]]), or ('custom', start, end) with Jalali (y, m, d) dates.
+
+    None when dates are unrestricted; ValueError for malformed dates.
+    """
+    report_period = REPORT_PERIODS.get(params.get('report_type'))
+    if not report_period:
+        return None
+
+    period, names = report_period
+    values = [params.get(name) for name in names]
+    if not all(values):
+        return None
+
+    if period == 'custom':
+        return (period, *(parse_jalali_parts(value) for value in values))
+    return (period, *(int(value) for value in values))
+
+
+def get_anchor_range(anchor):
+    """Half-open Gregorian range of an anchor from get_report_anchor()."""
+    if anchor[0] == 'custom':
+        return get_custom_range(*anchor[1:])
+    return get_period_range(*anchor)
+
+
+def get_anchor_label(anchor):
+    """Day-month-year text of an anchor's dates for keys and file names, e.g. '5-1403' or '1-1-1403-تا-10-2-1403'."""
+    if anchor[0] == 'custom':
+        return '-تا-'.join(
+            '-'.join(str(part) for part in reversed(date))
+            for date in anchor[1:]
+        )
+    return '-'.join(str(part) for part in reversed(anchor[1:]))
+
+
+def apply_report_filters(queryset, params):
+    for name, lookup in FILTER_LOOKUPS.items():
+        value = params.get(name)
+        if value and value != 'all':
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+class ReportFilter:
+    """A report query string parsed once into its filters, period, canonical key and queryset.
+
+    'all', empty and unused parameters are dropped, so equivalent query
+    strings share a key. Totals and summaries are cached per key and data
+    version; pages are always seeked by (date, id), which costs the same
+    on every page however large the report.
+    """
+
+    def __init__(self, params):
+        self.error = None
+        self.filters = {}
+        for name in FILTER_LOOKUPS:
+            value = params.get(name)
+            if value in (None, '', 'all'):
+                continue
+            if name in ID_PARAMS:
+                try:
+                    value = int(value)
+                except ValueError:
+                    self.error = 'فیلتر انتخاب شده نامعتبر است.'
+                    continue
+            self.filters[name] = value
+
+        self.report_type = None
+        self.anchor = None
+        self.date_range = None
+        try:
+            anchor = get_report_anchor(params)
+            if anchor:
+                self.date_range = get_anchor_range(anchor)
+                self.anchor = anchor
+                self.report_type = params.get('report_type')
+        except (ValueError, TypeError):
+            self.error = 'تاریخ وارد شده نامعتبر است.'
+
+        canonical = sorted(self.filters.items())
+        if self.anchor:
+            canonical.append(('period', f'{self.anchor[0]}-{get_anchor_label(self.anchor)}'))
+        if self.error:
+            canonical.append(('error', self.error))
+        self.canonical = urlencode(canonical)
+        self.key = hashlib.sha1(self.canonical.encode()).hexdigest()
+
+    @property
+    def transaction_type(self):
+        return self.filters.get('type')
+
+    @cached_property
+    def queryset(self):
+        """Unordered queryset of the matching transactions; empty when the parameters are invalid."""
+        if self.error:
+            return Transaction.objects.none()
+
+        queryset = apply_report_filters(Transaction.objects.all(), self.filters)
+        if self.date_range:
+            queryset = queryset.filter(
+                date__gte=self.date_range[0],
+                date__lt=self.date_range[1],
+            )
+        return queryset
+
+    def get_or_compute(self, name, compute):
+        """``compute()``, cached for this report and the current data version."""
+        return get_or_compute(f'report-{name}', [self.key], compute)
+
+    def get_totals(self):
+        """{'total': sum of amounts, 'count': number of rows}."""
+        return self.get_or_compute(
+            'totals',
+            lambda: self.queryset.aggregate(
+                total=Sum('amount'),
+                count=Count('id'),
+            ),
+        )
+
+    def get_page(self, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        """(rows, next cursor) as get_keyset_page() returns them."""
+        return get_keyset_page(self.queryset, cursor=cursor, page_size=page_size)
+
+    def iter_rows(self, chunk_size=2000):
+        """Every matching row newest first, as iter_transaction_rows() yields them."""
+        return iter_transaction_rows(
+            self.queryset.order_by('-date', '-id'),
+            chunk_size=chunk_size,
+        )
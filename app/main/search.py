@@ -0,0 +1,86 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from .utils import normalize_persian_text
+
+
+FTS_TABLE = 'main_transaction_fts'
+
+
+def index_transactions(transactions):
+    """Writes the normalized descriptions of the given transactions into the FTS index."""
+    rows = [
+        (t.id, normalize_persian_text(t.description))
+        for t in transactions
+    ]
+    if not rows:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(row_id,) for row_id, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, description) VALUES (%s, %s)',
+            rows,
+        )
+
+
+def unindex_transactions(transaction_ids):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(transaction_id,) for transaction_id in transaction_ids],
+        )
+
+
+def rebuild_index(chunk_size=2000):
+    from .models import Transaction
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    batch, total = [], 0
+    for t in Transaction.objects.only('id', 'description').iterator(chunk_size=chunk_size):
+        batch.append(t)
+        if len(batch) >= chunk_size:
+            index_transactions(batch)
+            total, batch = total + len(batch), []
+
+    index_transactions(batch)
+    return total + len(batch)
+
+
+def build_match_query(text):
+    """Turns free text into an FTS5 query that requires every word as a prefix."""
+    terms = normalize_persian_text(text).split()
+    return ' '.join(
+        '"{}"*'.format(term.replace('"', '""'))
+        for term in terms
+    )
+
+
+def search_transactions(queryset, text):
+    """Restricts a Transaction queryset to description matches, best matches first."""
+    match_query = build_match_query(text)
+    if not match_query:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+
+    return queryset.filter(
+        id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match_query,),
+        ),
+    ).annotate(
+        rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            (match_query,),
+        ),
+    ).order_by(
+        'rank',
+        '-date',
+        '-id',
+    )
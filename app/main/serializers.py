@@ -0,0 +1,190 @@
+from itertools import islice
+from collections import defaultdict
+from .models import (
+    Card,
+    Transaction,
+)
+from .utils import (
+    get_jalali_date,
+    format_card_number_last4,
+    TRANSACTION_AND_KIND_CHOICES,
+)
+
+
+KIND_DISPLAY = dict(TRANSACTION_AND_KIND_CHOICES)
+
+TRANSACTION_ROW_FIELDS = (
+    'id',
+    'kind',
+    'amount',
+    'commission',
+    'date',
+    'description',
+    'source_id',
+    'destination_id',
+    'category_id',
+    'category__name',
+    'source_balance_after',
+    'destination_balance_after',
+)
+
+# Columns of the opt-in ``format=columnar`` payload, in order.
+COLUMNAR_FIELDS = (
+    'id',
+    'date',
+    'kind',
+    'amount',
+    'commission',
+    'category',
+    'source',
+    'destination',
+    'tags',
+    'description',
+    'source_balance_after',
+    'destination_balance_after',
+)
+
+
+def get_card_label(card):
+    label = f"{card.get_name_display()} ({card.owner}) - {format_card_number_last4(card.number)}"
+    if not card.active:
+        label += " - غیرفعال"
+    return label
+
+
+def get_card_labels(card_ids):
+    """{card id: label} for the given ids, built once per card in a single query."""
+    card_ids = {card_id for card_id in card_ids if card_id}
+    if not card_ids:
+        return {}
+
+    cards = Card.objects.filter(
+        id__in=card_ids,
+    ).only(
+        'id',
+        'name',
+        'owner',
+        'number',
+        'active',
+    )
+    return {card.id: get_card_label(card) for card in cards}
+
+
+def get_tag_links(transaction_ids):
+    """{transaction id: [(tag id, tag name)]} for the given transactions in a single query."""
+    tag_links = defaultdict(list)
+    if not transaction_ids:
+        return tag_links
+
+    links = Transaction.tags.through.objects.filter(
+        transaction_id__in=transaction_ids,
+    ).order_by('id').values_list(
+        'transaction_id',
+        'tag_id',
+        'tag__name',
+    )
+    for transaction_id, tag_id, tag_name in links:
+        tag_links[transaction_id].append((tag_id, tag_name))
+    return tag_links
+
+
+def get_transaction_rows(queryset):
+    """values() rows of ``queryset`` with kind display, card labels and tag names attached.
+
+    Costs three queries however many rows there are: the rows, the cards
+    they reference and their tag links.
+    """
+    rows = list(
+        queryset.select_related(None).prefetch_related(None).values(
+            *TRANSACTION_ROW_FIELDS
+        )
+    )
+
+    card_labels = get_card_labels(
+        [row['source_id'] for row in rows] + [row['destination_id'] for row in rows]
+    )
+    tag_links = get_tag_links([row['id'] for row in rows])
+
+    for row in rows:
+        _add_row_details(row, card_labels, tag_links)
+
+    return rows
+
+
+def iter_transaction_rows(queryset, chunk_size=2000):
+    """Streaming get_transaction_rows() for exports.
+
+    Reads ``queryset`` through iterator() and fetches tag links one chunk
+    at a time, so memory stays flat however many rows there are. Every
+    card is labelled once up front; the card table is small.
+    """
+    card_labels = get_card_labels(Card.objects.values_list('id', flat=True))
+    rows = queryset.select_related(None).prefetch_related(None).values(
+        *TRANSACTION_ROW_FIELDS
+    ).iterator(chunk_size=chunk_size)
+
+    while chunk := list(islice(rows, chunk_size)):
+        tag_links = get_tag_links([row['id'] for row in chunk])
+        for row in chunk:
+            _add_row_details(row, card_labels, tag_links)
+            yield row
+
+
+def _add_row_details(row, card_labels, tag_links):
+    links = tag_links.get(row['id'], [])
+    row['kind_display'] = KIND_DISPLAY.get(row['kind'], row['kind'])
+    row['source_label'] = card_labels.get(row['source_id'])
+    row['destination_label'] = card_labels.get(row['destination_id'])
+    row['tag_ids'] = [tag_id for tag_id, _ in links]
+    row['tags'] = [tag_name for _, tag_name in links]
+
+
+def _to_int(value):
+    # Amounts are whole rials (decimal_places=0) and at most 15 digits, so
+    # plain ints are exact in JS and skip the encoder's Decimal fallback.
+    return None if value is None else int(value)
+
+
+def is_columnar(params):
+    return params.get('format') == 'columnar'
+
+
+def get_columnar_payload(rows):
+    """Rows from get_transaction_rows() as parallel column arrays.
+
+    Cards, categories, tags and kinds are referenced by id and sent once
+    in lookup dicts, instead of repeating their labels on every row.
+    """
+    columns = {name: [] for name in COLUMNAR_FIELDS}
+    cards, categories, tags = {}, {}, {}
+
+    for row in rows:
+        columns['id'].append(row['id'])
+        columns['date'].append(get_jalali_date(row['date']))
+        columns['kind'].append(row['kind'])
+        columns['amount'].append(_to_int(row['amount']))
+        columns['commission'].append(_to_int(row['commission']))
+        columns['category'].append(row['category_id'])
+        columns['source'].append(row['source_id'])
+        columns['destination'].append(row['destination_id'])
+        columns['tags'].append(row['tag_ids'])
+        columns['description'].append(row['description'])
+        columns['source_balance_after'].append(_to_int(row['source_balance_after']))
+        columns['destination_balance_after'].append(_to_int(row['destination_balance_after']))
+
+        if row['category_id'] is not None:
+            categories[row['category_id']] = row['category__name']
+        if row['source_id'] is not None:
+            cards[row['source_id']] = row['source_label']
+        if row['destination_id'] is not None:
+            cards[row['destination_id']] = row['destination_label']
+        tags.update(zip(row['tag_ids'], row['tags']))
+
+    return {
+        'length': len(rows),
+        'columns': columns,
+        'cards': cards,
+        'categories': categories,
+        'tags': tags,
+        'kinds': KIND_DISPLAY,
+    }
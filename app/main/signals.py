@@ -0,0 +1,65 @@
+from django.dispatch import receiver
+from django.db.models.signals import (
+    post_save,
+    post_delete,
+    m2m_changed,
+)
+from .models import (
+    Card,
+    Category,
+    Tag,
+    Gold,
+    Transaction,
+    MonthlyCategoryTotal,
+)
+from .search import (
+    index_transactions,
+    unindex_transactions,
+)
+from .caching import bump_data_version
+
+
+@receiver(post_save, sender=Transaction, dispatch_uid='main.signals.index_transaction')
+def index_transaction(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_transactions([instance])
+
+
+@receiver(post_delete, sender=Transaction, dispatch_uid='main.signals.unindex_transaction')
+def unindex_transaction(sender, instance, **kwargs):
+    unindex_transactions([instance.id])
+
+
+# Every model a cached report reads from. The views only write through
+# save()/create()/delete(), so these receivers see every change they make.
+VERSIONED_MODELS = (
+    Card,
+    Category,
+    Tag,
+    Gold,
+    Transaction,
+    MonthlyCategoryTotal,
+)
+
+
+def invalidate_cached_reports(sender, **kwargs):
+    bump_data_version()
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(
+        invalidate_cached_reports,
+        sender=model,
+        dispatch_uid=f'main.signals.invalidate_cached_reports.save.{model.__name__}',
+    )
+    post_delete.connect(
+        invalidate_cached_reports,
+        sender=model,
+        dispatch_uid=f'main.signals.invalidate_cached_reports.delete.{model.__name__}',
+    )
+
+m2m_changed.connect(
+    invalidate_cached_reports,
+    sender=Transaction.tags.through,
+    dispatch_uid='main.signals.invalidate_cached_reports.transaction_tags',
+)
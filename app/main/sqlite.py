@@ -0,0 +1,75 @@
+import datetime
+from django.conf import settings
+from django.db import connection
+from .jcalendar import (
+    to_jalali_parts,
+    to_jalali_week,
+    to_jalali_weekday,
+)
+
+
+def get_sqlite_pragmas():
+    """settings.SQLITE_PRAGMAS; SQLite's defaults are kept when it is not set."""
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _from_sql_date(func):
+    # DateField values arrive as 'YYYY-MM-DD', DateTimeField values with a
+    # time part appended; both start with the ISO date.
+    def wrapper(value):
+        if value is None:
+            return None
+        return func(datetime.date.fromisoformat(value[:10]))
+    return wrapper
+
+
+JALALI_SQL_FUNCTIONS = {
+    'jalali_year': _from_sql_date(lambda d: to_jalali_parts(d)[0]),
+    'jalali_month': _from_sql_date(lambda d: to_jalali_parts(d)[1]),
+    'jalali_day': _from_sql_date(lambda d: to_jalali_parts(d)[2]),
+    'jalali_week': _from_sql_date(to_jalali_week),
+    'jalali_weekday': _from_sql_date(to_jalali_weekday),
+}
+
+
+def register_jalali_functions(dbapi_connection):
+    for name, func in JALALI_SQL_FUNCTIONS.items():
+        dbapi_connection.create_function(name, 1, func, deterministic=True)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS and the Jalali SQL functions."""
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, get_sqlite_pragmas())
+
+    register_jalali_functions(connection.connection)
+
+
+def insert_rows(model, field_names, rows):
+    """executemany INSERT of plain tuples into ``model``'s table.
+
+    Skips model instances and per-value field conversion, which dominate
+    bulk_create() at import sizes, so values must already be in database
+    form: str for decimals, ISO strings for dates, ids for foreign keys.
+    """
+    columns = ', '.join(
+        connection.ops.quote_name(model._meta.get_field(name).column)
+        for name in field_names
+    )
+    placeholders = ', '.join(['%s'] * len(field_names))
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})',
+            rows,
+        )
@@ -2,6 +2,7 @@ from django import template
 from decimal import Decimal
 from django.utils.safestring import mark_safe
 from django.template.defaultfilters import stringfilter
+from ..utils import get_jalali_date
 
 
 register = template.Library()
@@ -33,11 +34,6 @@ def format_persian_numbers(value):
 
 @register.filter
 def jalali_date(value):
-    def get_jalali_date(date):
-        from jdatetime import datetime as jdt
-        if date is None:
-            return ""
-        return jdt.fromgregorian(datetime=date).strftime('%Y/%m/%d')
     return get_jalali_date(value)
 
 
@@ -1,3 +1,1524 @@
-from django.test import TestCase
+import os
+import base64
+import sys
+import time
+import sqlite3
+import subprocess
+import datetime
+import tempfile
+import jdatetime
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from decimal import Decimal
+from django.contrib import admin
+from django.db import (
+    connection,
+    transaction as db_transaction,
+)
+from django.conf import settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+)
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    RequestFactory,
+)
+from django.urls import reverse
+from django.core.management import call_command
+from django.db.models import (
+    Sum,
+    Count,
+)
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
 
-# Create your tests here.
+from .models import (
+    Card,
+    Category,
+    Tag,
+    Gold,
+    Transaction,
+    MonthlyCategoryTotal,
+    CardBalanceCheckpoint,
+    CardLedgerEntry,
+)
+from .admin import TransactionAdmin
+from .jcalendar import (
+    FIRST_JALALI_YEAR,
+    LAST_JALALI_YEAR,
+    to_gregorian,
+    to_jalali_parts,
+    to_jalali_string,
+    to_jalali_week,
+    to_jalali_weekday,
+)
+from .ledger import (
+    get_balance_at,
+    get_total_balance_at,
+    record_transaction,
+    reverse_transaction,
+)
+from .pagination import encode_cursor
+from .periods import get_current_period_range
+from .report_filters import ReportFilter
+from .search import search_transactions
+from .utils import (
+    MONTHS_NAME,
+    format_currency,
+)
+from .caching import (
+    bump_data_version,
+    get_data_version,
+)
+from .exports import (
+    _write_job,
+    get_artifact_path,
+    get_job_id,
+    get_spool_dir,
+    prune_spool,
+    read_job,
+)
+from .views.reporting import (
+    get_report_summary,
+    write_export_file,
+)
+
+
+class DashboardQueryCountTests(TestCase):
+    # Session, user, card list, card total, gold totals, month rollup,
+    # year rollup and category extremes.
+    DASHBOARD_QUERIES = 8
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.jtoday = jdatetime.date.today()
+
+    def add_data(self, size):
+        for i in range(size):
+            Card.objects.create(
+                name=f'کارت {i}',
+                owner='تست',
+                number=f'{i:016d}',
+                balance=Decimal(1000 * (i + 1)),
+            )
+
+            category = Category.objects.create(
+                name=f'دسته {i}',
+                kind='E',
+            )
+
+            MonthlyCategoryTotal.objects.create(
+                jyear=self.jtoday.year,
+                jmonth=self.jtoday.month,
+                kind='E',
+                category=category,
+                total=Decimal(500 * (i + 1)),
+                count=1,
+            )
+
+            Gold.objects.create(
+                weight=Decimal(100),
+                price=Decimal(5000),
+                p_price=Decimal(6000),
+                is_sold=bool(i % 2),
+            )
+
+    def test_query_count_is_constant(self):
+        url = reverse('dashboard')
+
+        self.add_data(2)
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        self.add_data(20)
+        with self.assertNumQueries(self.DASHBOARD_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_totals(self):
+        self.add_data(3)
+        response = self.client.get(reverse('dashboard'))
+        context = response.context
+
+        self.assertEqual(context['total_balance'], '6,000')
+        self.assertEqual(context['total_gold_price'], Decimal(15000))
+        self.assertEqual(context['total_sold_price'], Decimal(6000))
+        self.assertEqual(context['top_e'].name, 'دسته 2')
+        self.assertEqual(context['top_e'].total_spent, Decimal(1500))
+        self.assertEqual(context['low_e'].name, 'دسته 0')
+
+
+class TransactionListQueryCountTests(TestCase):
+    # Session, user, month count, transaction rows, referenced cards and tag links.
+    MONTH_QUERIES = 6
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.jtoday = jdatetime.date.today()
+        self.month_start, _ = get_current_period_range('month')
+
+        self.category = Category.objects.create(name='خوراک', kind='E')
+        self.tags = [
+            Tag.objects.create(name='تگ ۱'),
+            Tag.objects.create(name='تگ ۲'),
+        ]
+        self.cards = [
+            Card.objects.create(
+                name='melli',
+                owner='تست',
+                number=f'{i:016d}',
+                balance=Decimal(10 ** 9),
+                active=bool(i % 2),
+            )
+            for i in range(3)
+        ]
+
+    def add_transactions(self, size):
+        for i in range(size):
+            transaction = Transaction.objects.create(
+                kind='T',
+                amount=Decimal(1000 + i),
+                category=self.category,
+                source=self.cards[i % 3],
+                destination=self.cards[(i + 1) % 3],
+                date=self.month_start,
+            )
+            transaction.tags.set(self.tags[:i % 3])
+
+    def get_month(self):
+        return self.client.get(
+            reverse('get_transactions_by_month'),
+            {
+                'year': self.jtoday.year,
+                'month': self.jtoday.month,
+            },
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_query_count_is_constant(self):
+        self.add_transactions(3)
+        with self.assertNumQueries(self.MONTH_QUERIES):
+            response = self.get_month()
+        self.assertEqual(response.json()['total'], 3)
+
+        self.add_transactions(40)
+        with self.assertNumQueries(self.MONTH_QUERIES):
+            response = self.get_month()
+        self.assertEqual(response.json()['total'], 43)
+
+    def test_rows_carry_labels_and_tags(self):
+        self.add_transactions(3)
+        rows = {row['id']: row for row in self.get_month().json()['transactions']}
+        transaction = Transaction.objects.order_by('id')[2]
+        row = rows[transaction.id]
+
+        self.assertEqual(row['source_card'], 'بانک ملی (تست) - 0002 - غیرفعال')
+        self.assertEqual(row['destination_card'], 'بانک ملی (تست) - 0000 - غیرفعال')
+        self.assertEqual(row['tags'], ['تگ ۱', 'تگ ۲'])
+        self.assertEqual(row['category_name'], 'خوراک')
+
+
+class KeysetPagingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.jtoday = jdatetime.date.today()
+        self.month_start, _ = get_current_period_range('month')
+        self.card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        self.category = Category.objects.create(name='خوراک', kind='E')
+
+        # Ids rise against the dates, and three rows share each date.
+        for day in (2, 0, 1, 2, 0, 1, 2, 0, 1):
+            self.add(day)
+
+    def add(self, day):
+        return Transaction.objects.create(
+            kind='E',
+            amount=Decimal(10),
+            category=self.category,
+            source=self.card,
+            date=self.month_start + datetime.timedelta(days=day),
+        )
+
+    def get_month(self, **params):
+        return self.client.get(
+            reverse('get_transactions_by_month'),
+            {
+                'year': self.jtoday.year,
+                'month': self.jtoday.month,
+                **params,
+            },
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def walk(self, page_size):
+        pages, cursor = [], ''
+        while True:
+            payload = self.get_month(page_size=page_size, cursor=cursor).json()
+            pages.append([row['id'] for row in payload['transactions']])
+            cursor = payload['next_cursor']
+            if not cursor:
+                return pages
+
+    def test_pages_cover_ties_once_in_order(self):
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+
+        for page_size in (1, 2, 3, 4, 9, 10):
+            pages = self.walk(page_size)
+            self.assertEqual(sum(pages, []), expected, page_size)
+            # No empty trailing page when the rows divide evenly.
+            self.assertEqual(len(pages), -(-len(expected) // page_size), page_size)
+
+    def test_rows_added_behind_the_cursor_do_not_shift_pages(self):
+        first_page = self.get_month(page_size=4).json()
+        # Same date as the cursor row but a higher id, so it sorts before it.
+        self.add(1)
+        second_page = self.get_month(page_size=4, cursor=first_page['next_cursor']).json()
+
+        seen = [row['id'] for row in first_page['transactions'] + second_page['transactions']]
+        expected = list(
+            Transaction.objects.exclude(
+                id=Transaction.objects.latest('id').id,
+            ).order_by('-date', '-id').values_list('id', flat=True)[:8]
+        )
+        self.assertEqual(seen, expected)
+
+    def test_malformed_cursor_is_refused(self):
+        for cursor in (
+            'not-a-cursor',
+            encode_cursor(self.month_start, 1)[:-2],
+            base64.urlsafe_b64encode(b'2024-01-01').decode(),
+            base64.urlsafe_b64encode(b'2024-13-01|5').decode(),
+            base64.urlsafe_b64encode(b'2024-01-01|x').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe|1').decode(),
+        ):
+            response = self.get_month(cursor=cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json()['error'], 'نشانگر صفحه نامعتبر است.')
+
+
+class JalaliCalendarTests(SimpleTestCase):
+    def assert_matches_jdatetime(self, date):
+        expected = jdatetime.date.fromgregorian(date=date)
+        parts = (expected.year, expected.month, expected.day)
+        self.assertEqual(to_jalali_parts(date), parts, date)
+        self.assertEqual(to_jalali_string(date), expected.strftime('%Y/%m/%d'), date)
+        self.assertEqual(to_jalali_weekday(date), expected.weekday(), date)
+        self.assertEqual(to_jalali_week(date), expected.weeknumber(), date)
+        self.assertEqual(to_gregorian(*parts), date, date)
+
+    def test_every_day_of_the_table_and_beyond_its_edges(self):
+        first = jdatetime.date(FIRST_JALALI_YEAR - 1, 1, 1).togregorian()
+        last = jdatetime.date(LAST_JALALI_YEAR + 1, 12, 29).togregorian()
+        date = first
+        while date <= last:
+            self.assert_matches_jdatetime(date)
+            date += datetime.timedelta(days=1)
+
+    def test_far_outside_the_table(self):
+        for date in (
+            datetime.date(1900, 1, 1),
+            datetime.date(1971, 3, 20),
+            datetime.date(2072, 3, 20),
+            datetime.date(2200, 12, 31),
+        ):
+            self.assert_matches_jdatetime(date)
+
+    def test_datetimes_use_their_own_wall_clock_date(self):
+        tehran = datetime.timezone(datetime.timedelta(hours=3, minutes=30))
+        # Still 19 March in UTC, already Nowruz in Tehran.
+        moment = datetime.datetime(2024, 3, 20, 1, 0, tzinfo=tehran)
+        self.assertEqual(to_jalali_parts(moment), (1403, 1, 1))
+        self.assertEqual(to_jalali_string(moment), '1403/01/01')
+
+        outside = moment.replace(year=1960)
+        self.assertEqual(
+            to_jalali_string(outside),
+            jdatetime.date.fromgregorian(date=outside.date()).strftime('%Y/%m/%d'),
+        )
+
+    def test_invalid_dates_are_refused(self):
+        for year, month, day in (
+            (1404, 12, 30),
+            (1403, 13, 1),
+            (1403, 0, 1),
+            (1403, 7, 31),
+            (1403, 1, 0),
+            (LAST_JALALI_YEAR + 2, 12, 31),
+        ):
+            with self.assertRaises(ValueError, msg=(year, month, day)):
+                to_gregorian(year, month, day)
+        self.assertEqual(to_gregorian(1403, 12, 30), datetime.date(2025, 3, 20))
+
+
+class LedgerTestCase(TestCase):
+    """One card with an opening balance, and helpers that post to and replay its ledger."""
+
+    def setUp(self):
+        self.card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            opening_balance=Decimal(1000),
+            balance=Decimal(1000),
+        )
+        self.income = Category.objects.create(name='حقوق', kind='I')
+        self.expense = Category.objects.create(name='خوراک', kind='E')
+        self.first_day = datetime.date(2024, 3, 20)
+
+        # A small interval so the few transactions below cross checkpoints.
+        patcher = mock.patch('main.ledger.CHECKPOINT_INTERVAL', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add(self, kind, amount, day, card=None):
+        card = card or self.card
+        with db_transaction.atomic():
+            t = Transaction.objects.create(
+                kind=kind,
+                amount=Decimal(amount),
+                category=self.income if kind == 'I' else self.expense,
+                source=card if kind == 'E' else None,
+                destination=card if kind == 'I' else None,
+                date=self.first_day + datetime.timedelta(days=day),
+            )
+            record_transaction(t)
+            MonthlyCategoryTotal.apply(t)
+        return t
+
+    def delete(self, t):
+        with db_transaction.atomic():
+            reverse_transaction(t)
+            MonthlyCategoryTotal.apply(t, sign=-1)
+            t.delete()
+
+    def assert_ledger_consistent(self):
+        """Replays every transaction from the opening balance and compares what the ledger stored."""
+        running = self.card.opening_balance
+        balances_by_date = {}
+        for t in Transaction.objects.order_by('date', 'id'):
+            if t.kind == 'E':
+                running -= t.amount + t.commission
+                self.assertEqual(t.source_balance_after, running)
+            else:
+                running += t.amount
+                self.assertEqual(t.destination_balance_after, running)
+            balances_by_date[t.date] = running
+
+        self.card.refresh_from_db()
+        self.assertEqual(self.card.balance, running)
+
+        def replayed_balance_at(date):
+            earlier = [d for d in balances_by_date if d <= date]
+            return balances_by_date[max(earlier)] if earlier else self.card.opening_balance
+
+        for date, balance in balances_by_date.items():
+            self.assertEqual(get_balance_at(self.card.id, date), balance)
+
+        # A checkpoint may outlive the transactions of its own day.
+        checkpoints = CardBalanceCheckpoint.objects.filter(card=self.card)
+        self.assertTrue(checkpoints.exists())
+        for checkpoint in checkpoints:
+            self.assertEqual(checkpoint.balance, replayed_balance_at(checkpoint.date))
+
+    def assert_rollup_consistent(self):
+        """Monthly buckets hold exactly the totals and counts of the stored transactions."""
+        expected = {
+            (row['jyear'], row['jmonth'], row['kind'], row['category_id']): (row['total'], row['count'])
+            for row in Transaction.objects.values(
+                'jyear',
+                'jmonth',
+                'kind',
+                'category_id',
+            ).annotate(
+                total=Sum('amount'),
+                count=Count('id'),
+            ).order_by()
+        }
+        stored = {
+            (bucket.jyear, bucket.jmonth, bucket.kind, bucket.category_id): (bucket.total, bucket.count)
+            for bucket in MonthlyCategoryTotal.objects.all()
+        }
+        self.assertEqual(stored, expected)
+
+
+class LedgerConsistencyTests(LedgerTestCase):
+    def test_back_dated_insert_and_delete(self):
+        for day in (1, 3, 5, 7, 9):
+            self.add('I', 100, day)
+        self.assert_ledger_consistent()
+
+        back_dated = self.add('E', 250, 2)
+        self.assert_ledger_consistent()
+        self.assertEqual(
+            Transaction.objects.get(date=self.first_day + datetime.timedelta(days=3)).destination_balance_after,
+            Decimal(1000 + 100 - 250 + 100),
+        )
+
+        self.delete(back_dated)
+        self.assert_ledger_consistent()
+        self.assertEqual(self.card.balance, Decimal(1500))
+
+    def test_admin_edit_and_delete_go_through_ledger(self):
+        for day in (1, 1, 3, 5):
+            self.add('I', 100, day)
+        first = Transaction.objects.order_by('id').first()
+        model_admin = TransactionAdmin(Transaction, admin.site)
+        request = RequestFactory().post('/')
+
+        first.amount = Decimal(40)
+        first.kind = 'E'
+        first.category = self.expense
+        first.source, first.destination = self.card, None
+        model_admin.save_model(request, first, None, True)
+        self.assert_ledger_consistent()
+        self.assertEqual(self.card.balance, Decimal(1000 - 40 + 300))
+
+        model_admin.delete_model(request, Transaction.objects.order_by('id').last())
+        self.assert_ledger_consistent()
+        self.assertEqual(self.card.balance, Decimal(1000 - 40 + 200))
+
+
+class BalanceAtTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other_card = Card.objects.create(
+            name='mellat',
+            owner='تست',
+            number='1' * 16,
+            opening_balance=Decimal(500),
+            balance=Decimal(500),
+        )
+        for kind, amount, day, card in (
+            ('I', 100, 1, self.card),
+            ('E', 30, 3, self.card),
+            ('I', 70, 3, self.other_card),
+            ('I', 100, 5, self.card),
+            ('E', 60, 6, self.other_card),
+            ('E', 20, 7, self.card),
+            ('I', 40, 9, self.other_card),
+            ('I', 100, 9, self.card),
+        ):
+            self.add(kind, amount, day, card)
+
+    def replayed_balance_at(self, card, date):
+        balance = card.opening_balance
+        for t in Transaction.objects.filter(date__lte=date):
+            if t.destination_id == card.id:
+                balance += t.amount
+            if t.source_id == card.id:
+                balance -= t.amount + t.commission
+        return balance
+
+    def test_balance_at_matches_replay_around_checkpoints(self):
+        checkpoint_dates = set(CardBalanceCheckpoint.objects.values_list('date', flat=True))
+        self.assertTrue(checkpoint_dates)
+
+        for day in range(-1, 12):
+            date = self.first_day + datetime.timedelta(days=day)
+            for card in (self.card, self.other_card):
+                self.assertEqual(
+                    card.balance_at(date),
+                    self.replayed_balance_at(card, date),
+                    f'{card.name} on day {day}',
+                )
+
+            with self.assertNumQueries(1):
+                total = get_total_balance_at(date)
+            self.assertEqual(
+                total,
+                self.replayed_balance_at(self.card, date) + self.replayed_balance_at(self.other_card, date),
+                f'total on day {day}',
+            )
+
+    def test_total_balance_respects_the_card_selection(self):
+        date = self.first_day + datetime.timedelta(days=6)
+        self.other_card.active = False
+        self.other_card.save()
+
+        self.assertEqual(get_total_balance_at(date), self.replayed_balance_at(self.card, date))
+        self.assertEqual(
+            get_total_balance_at(date, Card.objects.filter(pk=self.other_card.pk)),
+            self.replayed_balance_at(self.other_card, date),
+        )
+
+
+class MonthlyRollupTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+
+    def post_transaction(self, kind, amount, date):
+        response = self.client.post(
+            reverse('add_transaction'),
+            {
+                'kind': kind,
+                'amount': str(amount),
+                'category': str((self.income if kind == 'I' else self.expense).id),
+                'source': str(self.card.id) if kind == 'E' else '',
+                'destination': str(self.card.id) if kind == 'I' else '',
+                'date': date,
+                'description': 'تست',
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        return Transaction.objects.latest('id')
+
+    def delete_transaction(self, t):
+        response = self.client.post(
+            reverse('delete_transaction'),
+            {
+                'transaction_id': t.id,
+            },
+            headers={
+                'x-requested-with': 'XMLHttpRequest',
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_views_keep_the_rollup_in_step(self):
+        self.post_transaction('I', 500, '1403/01/05')
+        first_expense = self.post_transaction('E', 100, '1403/01/31')
+        self.post_transaction('E', 40, '1403/01/10')
+        only_in_month = self.post_transaction('E', 70, '1403/02/01')
+        self.assert_rollup_consistent()
+        self.assertEqual(
+            MonthlyCategoryTotal.objects.get(jyear=1403, jmonth=1, kind='E').total,
+            Decimal(140),
+        )
+
+        self.delete_transaction(first_expense)
+        self.assert_rollup_consistent()
+
+        # Removing the last transaction of a bucket removes the bucket.
+        self.delete_transaction(only_in_month)
+        self.assert_rollup_consistent()
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(jmonth=2).exists())
+
+    def test_rebuild_command_repairs_drifted_rollup(self):
+        for kind, amount, day in (('I', 500, 1), ('E', 100, 3), ('E', 40, 40)):
+            self.add(kind, amount, day)
+
+        # A wrong total, a stray bucket and a jmonth column out of step with its date.
+        MonthlyCategoryTotal.objects.filter(kind='I').update(total=Decimal(1))
+        MonthlyCategoryTotal.objects.create(
+            jyear=1402,
+            jmonth=5,
+            kind='E',
+            category=self.expense,
+            total=Decimal(99),
+            count=1,
+        )
+        Transaction.objects.filter(kind='E').update(jmonth=9)
+
+        call_command('rebuild_monthly_totals', stdout=StringIO())
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('jmonth', flat=True)),
+            [1, 1, 2],
+        )
+        self.assert_rollup_consistent()
+
+
+class ImportTransactionsTests(LedgerTestCase):
+    HEADER = 'date,kind,amount,category,tags,source,destination,description'
+
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+
+    def row(self, kind, amount, day, tags='', description='وارد شده'):
+        date = jdatetime.date.fromgregorian(
+            date=self.first_day + datetime.timedelta(days=day),
+        )
+        return ','.join(
+            [
+                date.strftime('%Y/%m/%d'),
+                kind,
+                str(amount),
+                str((self.income if kind == 'I' else self.expense).id),
+                f'"{tags}"',
+                str(self.card.id) if kind == 'E' else '',
+                str(self.card.id) if kind == 'I' else '',
+                description,
+            ]
+        )
+
+    def upload(self, *rows, name='import.csv', content=None):
+        if content is None:
+            content = '\n'.join([self.HEADER, *rows]).encode('utf-8')
+        return self.client.post(
+            reverse('import_transactions_file'),
+            {
+                'file': SimpleUploadedFile(name, content),
+            },
+        )
+
+    def test_back_dated_import_into_existing_data(self):
+        for day in (1, 3, 5, 7, 9):
+            self.add('I', 100, day)
+
+        response = self.upload(
+            # Out of date order on purpose, and sharing days with existing rows.
+            self.row('I', 70, 9, description='پاداش'),
+            self.row('E', 250, 2, description='خرید کتاب'),
+            self.row('E', 30, 5, description='تاکسی'),
+            self.row('I', 40, 0, description='سود'),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 4)
+
+        self.assert_ledger_consistent()
+        self.assert_rollup_consistent()
+        self.assertEqual(self.card.balance, Decimal(1000 + 500 + 70 - 250 - 30 + 40))
+        self.assertEqual(
+            CardLedgerEntry.objects.filter(card=self.card).aggregate(total=Sum('amount'))['total'],
+            self.card.balance - self.card.opening_balance,
+        )
+
+        # Imported rows sort after the existing rows of their day.
+        same_day = Transaction.objects.filter(
+            date=self.first_day + datetime.timedelta(days=5),
+        ).order_by('id')
+        self.assertEqual([t.kind for t in same_day], ['I', 'E'])
+
+        found = search_transactions(Transaction.objects.all(), 'كتاب')
+        self.assertEqual([t.description for t in found], ['خرید کتاب'])
+
+    def test_tagged_import(self):
+        Tag.objects.create(name='سفر')
+
+        response = self.upload(
+            self.row('E', 10, 1, tags='سفر، غذا'),
+            self.row('E', 20, 2, tags='غذا,غذا'),
+            self.row('E', 30, 3),
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(Tag.objects.filter(name='غذا').count(), 1)
+        tags = {
+            t.amount: sorted(tag.name for tag in t.tags.all())
+            for t in Transaction.objects.prefetch_related('tags')
+        }
+        self.assertEqual(
+            tags,
+            {
+                Decimal(10): ['سفر', 'غذا'],
+                Decimal(20): ['غذا'],
+                Decimal(30): [],
+            },
+        )
+        self.assert_ledger_consistent()
+        self.assert_rollup_consistent()
+
+    def test_bad_rows_are_rejected_with_nothing_written(self):
+        response = self.upload(
+            self.row('E', 10, 1),
+            self.row('E', '12.5', 2),
+            self.row('E', -5, 3),
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error['row'] for error in response.json()['errors']],
+            [3, 4],
+        )
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(CardLedgerEntry.objects.exists())
+        self.assertFalse(MonthlyCategoryTotal.objects.exists())
+
+    def test_rows_may_not_overdraw_a_card_partway(self):
+        # The income comes first in the file but a day after the expense,
+        # so the card would be 500 short in between.
+        response = self.upload(
+            self.row('I', 1000, 2),
+            self.row('E', 1500, 1),
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [3])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_corrupt_files_are_rejected(self):
+        for name, content in (
+            ('import.xlsx', b'not a workbook'),
+            ('import.csv', b'\xff\xfe\x00broken'),
+        ):
+            response = self.upload(name=name, content=content)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+        self.assertFalse(Transaction.objects.exists())
+
+
+class ReportSummaryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.first, self.second = (
+            Card.objects.create(
+                name='melli',
+                owner='تست',
+                number=f'{i:016d}',
+                balance=Decimal(10 ** 6),
+            )
+            for i in range(2)
+        )
+        date, _ = get_current_period_range('month')
+        for kind, amount, commission, source, destination in (
+            ('E', 100, 0, self.first, None),
+            ('I', 300, 0, None, self.first),
+            ('T', 200, 5, self.first, self.second),
+        ):
+            Transaction.objects.create(
+                kind=kind,
+                amount=Decimal(amount),
+                commission=Decimal(commission),
+                category=Category.objects.create(name=f'دسته {kind}', kind=kind),
+                source=source,
+                destination=destination,
+                date=date,
+            )
+        cache.clear()
+
+    def test_one_grouped_query(self):
+        # The grouped aggregate and the card labels.
+        with self.assertNumQueries(2):
+            get_report_summary(Transaction.objects.all())
+
+    def test_payload_amounts_are_numbers(self):
+        summary = self.client.get(
+            reverse('filter_transactions_ajax'),
+            {
+                'summary': '1',
+            },
+        ).json()['summary']
+
+        self.assertEqual(
+            {row['kind']: (row['total'], row['count']) for row in summary['kinds']},
+            {'E': (100, 1), 'I': (300, 1), 'T': (200, 1)},
+        )
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['commission'], 5)
+        self.assertEqual(summary['net_flow'], 300 - 100 - 5)
+        self.assertEqual(
+            {card['id']: (card['inflow'], card['outflow'], card['net']) for card in summary['cards']},
+            {
+                self.first.id: (300, 100 + 200 + 5, 300 - 305),
+                self.second.id: (200, 0, 200),
+            },
+        )
+        self.assertEqual(
+            sorted(category['total'] for category in summary['categories']),
+            [100, 200, 300],
+        )
+
+
+class ExportStreamingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        category = Category.objects.create(name='خوراک', kind='E')
+        date, _ = get_current_period_range('month')
+        for amount in (10, 20):
+            Transaction.objects.create(
+                kind='E',
+                amount=Decimal(amount),
+                category=category,
+                source=card,
+                date=date,
+            )
+        cache.clear()
+
+    def test_csv_header_goes_out_before_the_rows_are_read(self):
+        table = Transaction._meta.db_table
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('export_transactions_excel'),
+                {
+                    'format': 'csv',
+                    'type': 'E',
+                },
+            )
+            chunks = iter(response.streaming_content)
+            first_chunk = next(chunks)
+        self.assertFalse([query for query in context.captured_queries if f'"{table}"' in query['sql']])
+        self.assertTrue(first_chunk.startswith('\ufeff'.encode('utf-8')))
+
+        lines = b''.join([first_chunk, *chunks]).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 1 + 2 + 2)
+        self.assertEqual(lines[-1], 'جمع مبالغ:,,,30')
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        self.category = Category.objects.create(name='خوراک', kind='E')
+        date, _ = get_current_period_range('month')
+        Transaction.objects.create(
+            kind='E',
+            amount=Decimal(10),
+            category=self.category,
+            source=card,
+            date=date,
+        )
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            EXPORT_SPOOL_DIR=Path(directory.name, 'exports'),
+            DATA_VERSION_FILE=Path(directory.name, 'data-version'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Jobs run inline, on the test's connection, instead of on the pool.
+        for name, value in (
+            ('get_export_executor', lambda: mock.Mock(submit=lambda job, *args: job(*args))),
+            ('close_old_connections', lambda: None),
+        ):
+            patcher = mock.patch(f'main.exports.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        patcher = mock.patch(
+            'main.views.reporting.write_export_file',
+            side_effect=write_export_file,
+        )
+        self.write = patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    def start_job(self, **params):
+        return self.client.post(
+            reverse('start_export_job'),
+            {
+                'format': 'csv',
+                'type': 'E',
+                **params,
+            },
+        )
+
+    def test_equivalent_filters_share_a_job(self):
+        job_id = self.start_job(category=str(self.category.id)).json()['job_id']
+
+        response = self.start_job(
+            category=f'0{self.category.id}',
+            tag='all',
+            source='',
+        )
+        self.assertEqual(response.json()['job_id'], job_id)
+        self.assertNotEqual(self.start_job().json()['job_id'], job_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_data_version()
+        self.assertNotEqual(self.start_job(category=str(self.category.id)).json()['job_id'], job_id)
+
+    def test_finished_artifact_is_reused(self):
+        first = self.start_job()
+        self.assertEqual(first.status_code, 202)
+
+        second = self.start_job()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['status'], 'done')
+        self.assertEqual(self.write.call_count, 1)
+
+        download = self.client.get(second.json()['download_url'])
+        content = b''.join(download.streaming_content).decode('utf-8-sig')
+        self.assertEqual(content.splitlines()[-1], 'جمع مبالغ:,,,10')
+
+    def test_stale_jobs_are_queued_again(self):
+        job_id = get_job_id('csv', ReportFilter({'type': 'E'}).key)
+
+        # Left "running" by a worker process that has since exited.
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        _write_job(
+            job_id,
+            id=job_id,
+            format='csv',
+            file_name='stale.csv',
+            status='running',
+            done=0,
+            total=None,
+            pid=process.pid,
+        )
+        self.assertEqual(self.start_job().json()['job_id'], job_id)
+        self.assertEqual(self.write.call_count, 1)
+        self.assertEqual(read_job(job_id)['status'], 'done')
+
+        # Done, but the artifact is gone.
+        get_artifact_path(job_id, 'csv').unlink()
+        self.assertEqual(self.client.get(reverse('download_export_job', args=[job_id])).status_code, 404)
+        self.assertEqual(self.start_job().status_code, 202)
+        self.assertEqual(self.write.call_count, 2)
+        self.assertTrue(get_artifact_path(job_id, 'csv').exists())
+
+    @override_settings(EXPORT_SPOOL_MAX_AGE=60)
+    def test_prune_spool_deletes_only_old_files(self):
+        spool_dir = get_spool_dir()
+        old_path = Path(spool_dir, 'old.csv')
+        new_path = Path(spool_dir, 'new.csv')
+        for path in (old_path, new_path):
+            path.write_text('x')
+        old = time.time() - 120
+        os.utime(old_path, (old, old))
+
+        prune_spool()
+        self.assertFalse(old_path.exists())
+        self.assertTrue(new_path.exists())
+
+
+class ColumnarPayloadTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.jtoday = jdatetime.date.today()
+        date, _ = get_current_period_range('month')
+        cards = [
+            Card.objects.create(
+                name=name,
+                owner='تست',
+                number=f'{i:016d}',
+                balance=Decimal(10 ** 6),
+            )
+            for i, name in enumerate(('melli', 'mellat'))
+        ]
+        categories = {
+            kind: Category.objects.create(name=f'دسته {kind}', kind=kind)
+            for kind in ('E', 'I', 'T')
+        }
+        tags = [
+            Tag.objects.create(name='تگ ۱'),
+            Tag.objects.create(name='تگ ۲'),
+        ]
+        for i, (kind, source, destination, commission) in enumerate((
+            ('E', cards[0], None, 0),
+            ('I', None, cards[1], 0),
+            ('T', cards[0], cards[1], 500),
+            ('E', cards[1], None, 0),
+        )):
+            t = Transaction.objects.create(
+                kind=kind,
+                amount=Decimal(1000 * (i + 1)),
+                commission=Decimal(commission),
+                category=categories[kind],
+                source=source,
+                destination=destination,
+                source_balance_after=Decimal(5000) if source else None,
+                destination_balance_after=Decimal(7000) if destination else None,
+                date=date + datetime.timedelta(days=i % 2),
+                description=f'ردیف {i}',
+            )
+            t.tags.set(tags[:i % 3])
+        cache.clear()
+
+    def get_both(self, url_name, **params):
+        """(dict rows, columnar payload, the rest of both responses) for the same request."""
+        responses = [
+            self.client.get(
+                reverse(url_name),
+                {
+                    **params,
+                    **extra,
+                },
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            ).json()
+            for extra in ({}, {'format': 'columnar'})
+        ]
+        rows, columnar = (response.pop('transactions') for response in responses)
+        self.assertEqual(responses[0], responses[1])
+        self.assertEqual(columnar['length'], len(rows))
+        return rows, columnar
+
+    def iter_columnar_rows(self, payload):
+        """Each row of a columnar payload with its lookups resolved."""
+        columns = payload['columns']
+        for index in range(payload['length']):
+            row = {name: values[index] for name, values in columns.items()}
+            source, destination = row['source'], row['destination']
+            yield {
+                **row,
+                'kind_display': payload['kinds'][row['kind']],
+                'category_name': payload['categories'][str(row['category'])],
+                'source_label': payload['cards'][str(source)] if source is not None else None,
+                'destination_label': payload['cards'][str(destination)] if destination is not None else None,
+                'tag_names': [payload['tags'][str(tag_id)] for tag_id in row['tags']],
+            }
+
+    def test_report_rows_match_the_dict_format(self):
+        rows, columnar = self.get_both('filter_transactions_ajax', page_size=3)
+        self.assertEqual(len(rows), 3)
+
+        rebuilt = [
+            {
+                'id': row['id'],
+                'date': row['date'],
+                'kind': row['kind'],
+                'kind_display': row['kind_display'],
+                'category_name': row['category_name'],
+                'amount': format_currency(row['amount']),
+                'commission': format_currency(row['commission']) if row['commission'] else None,
+                'source_card_name': row['source_label'] or 'نامشخص',
+                'destination_card_name': row['destination_label'] or 'نامشخص',
+                'description': row['description'],
+                'tag_names': ', '.join(row['tag_names']),
+            }
+            for row in self.iter_columnar_rows(columnar)
+        ]
+        expected = [
+            {
+                **{name: row[name] for name in rebuilt[0] if name not in ('amount', 'commission')},
+                'amount': row['amount_formatted'],
+                'commission': row['commission_formatted'],
+            }
+            for row in rows
+        ]
+        self.assertEqual(rebuilt, expected)
+
+    def test_month_rows_match_the_dict_format(self):
+        rows, columnar = self.get_both(
+            'get_transactions_by_month',
+            year=self.jtoday.year,
+            month=self.jtoday.month,
+        )
+        self.assertEqual(len(rows), 4)
+
+        rebuilt = []
+        for row in self.iter_columnar_rows(columnar):
+            year, month, day = row['date'].split('/')
+            rebuilt.append(
+                {
+                    'id': row['id'],
+                    'kind': row['kind_display'],
+                    'amount_display': format_currency(row['amount']),
+                    'commission': format_currency(row['commission']) if row['commission'] else None,
+                    'source_card': row['source_label'],
+                    'destination_card': row['destination_label'],
+                    'category_name': row['category_name'],
+                    'year': year,
+                    'month': MONTHS_NAME[int(month) - 1],
+                    'day': day,
+                    'tags': row['tag_names'],
+                    'description': row['description'],
+                    'source_balance_after': format_currency(row['source_balance_after'])
+                    if row['source_balance_after'] is not None else None,
+                    'destination_balance_after': format_currency(row['destination_balance_after'])
+                    if row['destination_balance_after'] is not None else None,
+                }
+            )
+        self.assertEqual(rebuilt, rows)
+
+
+class TransactionSearchTests(TestCase):
+    def setUp(self):
+        card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        category = Category.objects.create(name='خوراک', kind='E')
+        date, _ = get_current_period_range('month')
+        self.transactions = {
+            name: Transaction.objects.create(
+                kind='E',
+                amount=Decimal(10),
+                category=category,
+                source=card,
+                date=date,
+                description=description,
+            )
+            for name, description in (
+                ('arabic', 'خريد كتاب درسي'),
+                ('digits', 'قبض برق ماه ۱۲'),
+                ('zwnj', 'هزینه‌های خانه'),
+                ('plain', 'خرید نان'),
+            )
+        }
+
+    def search(self, text):
+        found = search_transactions(Transaction.objects.all(), text)
+        return {t.id for t in found}
+
+    def ids(self, *names):
+        return {self.transactions[name].id for name in names}
+
+    def test_text_is_normalized_on_both_sides(self):
+        # Arabic yeh/kaf in the stored text match their Persian forms and back.
+        self.assertEqual(self.search('کتاب درسی'), self.ids('arabic'))
+        self.assertEqual(self.search('خريد'), self.ids('arabic', 'plain'))
+        # Persian digits are indexed and searched as ASCII digits.
+        self.assertEqual(self.search('12'), self.ids('digits'))
+        self.assertEqual(self.search('ماه ۱۲'), self.ids('digits'))
+        # A zero-width non-joiner may be typed or left out.
+        self.assertEqual(self.search('هزینههای'), self.ids('zwnj'))
+        self.assertEqual(self.search('هزینه‌ها'), self.ids('zwnj'))
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.search('خری'), self.ids('arabic', 'plain'))
+        self.assertEqual(self.search('خرید نا'), self.ids('plain'))
+        self.assertEqual(self.search('خرید برق'), set())
+        self.assertEqual(self.search('"'), set())
+
+    def test_index_follows_edits_and_deletes(self):
+        plain = self.transactions['plain']
+        plain.description = 'خرید شیر'
+        plain.save()
+        self.assertEqual(self.search('نان'), set())
+        self.assertEqual(self.search('شیر'), {plain.id})
+
+        plain.delete()
+        self.assertEqual(self.search('خرید'), self.ids('arabic'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM main_transaction_fts WHERE rowid = %s',
+                [plain.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class PivotReportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        self.category = Category.objects.create(name='خوراک', kind='E')
+        self.date, _ = get_current_period_range('month')
+        # Writes inside a TestCase never commit, so the data version that
+        # keys cached reports does not move between tests.
+        cache.clear()
+
+    def test_tag_totals_count_each_transaction_once(self):
+        transaction = Transaction.objects.create(
+            kind='E',
+            amount=Decimal(1000),
+            category=self.category,
+            source=self.card,
+            date=self.date,
+        )
+        transaction.tags.set(
+            [
+                Tag.objects.create(name='تگ ۱'),
+                Tag.objects.create(name='تگ ۲'),
+            ]
+        )
+
+        pivot = self.client.get(
+            reverse('pivot_report_api'),
+            {
+                'dimension': 'tag',
+            },
+        ).json()
+
+        self.assertEqual([row['total'] for row in pivot['rows']], [1000, 1000])
+        self.assertEqual(pivot['column_totals'], [1000])
+        self.assertEqual(pivot['grand_total'], 1000)
+        self.assertTrue(pivot['distinct_totals'])
+
+
+class ReportFilterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.card = Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(10 ** 6),
+        )
+        self.category = Category.objects.create(name='خوراک', kind='E')
+        self.date, _ = get_current_period_range('month')
+        cache.clear()
+
+    def add_transactions(self, count, date=None):
+        return [
+            Transaction.objects.create(
+                kind='E',
+                amount=Decimal(10),
+                category=self.category,
+                source=self.card,
+                date=date or self.date,
+            )
+            for _ in range(count)
+        ]
+
+    def get_report(self, **params):
+        return self.client.get(reverse('filter_transactions_ajax'), params)
+
+    def test_equivalent_query_strings_share_a_key(self):
+        key = ReportFilter(
+            {
+                'type': 'E',
+                'category': '3',
+            }
+        ).key
+        self.assertEqual(
+            ReportFilter(
+                {
+                    'category': '3',
+                    'type': 'E',
+                    'tag': 'all',
+                    'source': '',
+                    'unused': 'x',
+                }
+            ).key,
+            key,
+        )
+        self.assertNotEqual(ReportFilter({'type': 'E'}).key, key)
+
+    def test_malformed_id_filter_is_refused(self):
+        response = self.get_report(category='abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'فیلتر انتخاب شده نامعتبر است.')
+
+        export = self.client.get(
+            reverse('export_transactions_excel'),
+            {
+                'format': 'csv',
+                'source': '1x',
+            },
+        )
+        self.assertEqual(export.status_code, 400)
+
+    def test_pages_seek_past_deleted_cursor_rows(self):
+        transactions = self.add_transactions(5)
+
+        first_page = self.get_report(page_size=2).json()
+        self.assertEqual(
+            [row['id'] for row in first_page['transactions']],
+            [transactions[4].id, transactions[3].id],
+        )
+
+        # The row the cursor points at is gone; the next page still starts after it.
+        transactions[3].delete()
+        second_page = self.get_report(page_size=2, cursor=first_page['next_cursor']).json()
+        self.assertEqual(
+            [row['id'] for row in second_page['transactions']],
+            [transactions[2].id, transactions[1].id],
+        )
+
+        self.assertEqual(self.get_report(cursor='not-a-cursor').status_code, 400)
+
+
+class CustomPeriodTests(TestCase):
+    def test_custom_range_is_inclusive_and_validated(self):
+        report = ReportFilter(
+            {
+                'report_type': 'custom',
+                'start': '۱۴۰۳/۰۱/۰۱',
+                'end': '1403-01-31',
+            }
+        )
+
+        self.assertIsNone(report.error)
+        self.assertEqual(
+            report.date_range,
+            (datetime.date(2024, 3, 20), datetime.date(2024, 4, 20)),
+        )
+        self.assertEqual(report.key, ReportFilter(
+            {
+                'report_type': 'custom',
+                'start': '1403/1/1',
+                'end': '1403/1/31',
+            }
+        ).key)
+
+        reversed_range = ReportFilter(
+            {
+                'report_type': 'custom',
+                'start': '1403/02/01',
+                'end': '1403/01/01',
+            }
+        )
+        self.assertEqual(reversed_range.error, 'تاریخ وارد شده نامعتبر است.')
+
+
+class DataVersionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='خوراک', kind='E')
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            DATA_VERSION_FILE=os.path.join(directory.name, 'data-version'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def add_monthly_total(self, amount):
+        jtoday = jdatetime.date.today()
+        # Commits as far as on_commit callbacks go, which is where the version moves.
+        with self.captureOnCommitCallbacks(execute=True):
+            MonthlyCategoryTotal.objects.create(
+                jyear=jtoday.year,
+                jmonth=jtoday.month,
+                kind='E',
+                category=self.category,
+                total=Decimal(amount),
+                count=1,
+            )
+
+    def get_monthly_data(self, **headers):
+        return self.client.get(
+            reverse('monthly_data_api'),
+            {
+                'kind': 'E',
+            },
+            headers=headers,
+        )
+
+    def test_write_invalidates_cached_payload(self):
+        self.assertEqual(self.get_monthly_data().json()['total_amount'], '0')
+
+        self.add_monthly_total(500)
+        self.assertEqual(self.get_monthly_data().json()['total_amount'], '500')
+
+    def test_version_is_shared_through_the_file(self):
+        version = get_data_version()
+        self.get_monthly_data()
+
+        # Another worker process bumping the version: the file changes
+        # without anything happening in this process's cache.
+        with open(settings.DATA_VERSION_FILE, 'w') as file:
+            file.write('another-process')
+        self.assertNotEqual(get_data_version(), version)
+
+        with mock.patch('main.views.dashboard.get_monthly_data_payload', return_value={}) as compute:
+            self.get_monthly_data()
+        compute.assert_called_once()
+
+    def test_etag_revalidation_follows_writes(self):
+        response = self.get_monthly_data()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.assertEqual(self.get_monthly_data(if_none_match=etag).status_code, 304)
+
+        self.add_monthly_total(500)
+        response = self.get_monthly_data(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_errors_carry_no_validators(self):
+        response = self.client.get(
+            reverse('monthly_data_api'),
+            {
+                'kind': 'X',
+            },
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+
+class BackupTests(TransactionTestCase):
+    # The backup waits for other transactions, so the test cannot hold one
+    # open around the request.
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='tester',
+            password='secret',
+        )
+        self.client.force_login(self.user)
+
+    def test_backup_is_a_complete_database(self):
+        Card.objects.create(
+            name='melli',
+            owner='تست',
+            number='0' * 16,
+            balance=Decimal(1000),
+        )
+
+        response = self.client.post(
+            reverse('create_backup'),
+            {
+                'description': 'تست',
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'backup.sqlite3')
+            with open(path, 'wb') as file:
+                file.write(b''.join(response.streaming_content))
+            response.close()
+
+            backup = sqlite3.connect(path)
+            try:
+                count, = backup.execute(
+                    f'SELECT COUNT(*) FROM {Card._meta.db_table}'
+                ).fetchone()
+            finally:
+                backup.close()
+        self.assertEqual(count, 1)
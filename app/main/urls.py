@@ -12,15 +12,18 @@ from .views.auth import (
 # Dashboard
 from .views.dashboard import (
     dashboard,
+    dashboard_async,
     monthly_data_api,
     get_annual_chart_data,
     category_tag_report_api,
+    heatmap_api,
 )
 # Transactions
 from .views.transactions import (
     transactions,
     add_transaction,
     delete_transaction,
+    import_transactions_file,
     get_categories_by_kind,
     get_transactions_by_month,
     get_transaction_details_by_id,
@@ -45,6 +48,7 @@ from .views.cards import (
     add_card,
     activate_card,
     deactivate_card,
+    card_balance_at_api,
 )
 # Gold
 from .views.gold import (
@@ -56,7 +60,13 @@ from .views.gold import (
 from .views.reporting import (
     reporting,
     filter_transactions_ajax,
+    search_transactions_ajax,
     export_transactions_excel,
+    start_export_job,
+    export_job_status,
+    download_export_job,
+    pivot_report_api,
+    export_pivot_report,
 )
 # Backup
 from .views.backup import (
@@ -81,12 +91,15 @@ urlpatterns = [
     path('dashboard', dashboard, name="dashboard"),
     path('api/monthly-data/', monthly_data_api, name='monthly_data_api'),
     path('api/annual-data/', get_annual_chart_data, name='get_annual_chart_data'),
+    path('async/dashboard', dashboard_async, name='dashboard_async'),
     path('api/reports/category_tags/', category_tag_report_api, name='category_tag_report_api'),
+    path('api/heatmap/', heatmap_api, name='heatmap_api'),
 
     # Transactions
     path('transactions', transactions, name="transactions"),
     path('transactions/add/', add_transaction, name='add_transaction'),
     path('transactions/delete/', delete_transaction, name='delete_transaction'),
+    path('transactions/import/', import_transactions_file, name='import_transactions_file'),
     path('get_categories/', get_categories_by_kind, name='get_categories_by_kind'),
     path('transactions/details/', get_transaction_details_by_id, name='get_transaction_details'),
     path('transactions/get_by_month/', get_transactions_by_month, name='get_transactions_by_month'),
@@ -108,6 +121,7 @@ urlpatterns = [
     path('cards/add/', add_card, name='add_card'),
     path('cards/activate/', activate_card, name='activate_card'),
     path('cards/deactivate/', deactivate_card, name='deactivate_card'),
+    path('api/cards/balance-at/', card_balance_at_api, name='card_balance_at_api'),
 
     # Gold
     path('gold', gold, name='gold'),
@@ -117,7 +131,13 @@ urlpatterns = [
     # Reporting
     path('reporting', reporting, name='reporting'),
     path('api/reports/filter/', filter_transactions_ajax, name='filter_transactions_ajax'),
+    path('api/reports/search/', search_transactions_ajax, name='search_transactions_ajax'),
     path('api/reports/export/', export_transactions_excel, name='export_transactions_excel'),
+    path('api/reports/export/jobs/', start_export_job, name='start_export_job'),
+    path('api/reports/export/jobs/<str:job_id>/', export_job_status, name='export_job_status'),
+    path('api/reports/export/jobs/<str:job_id>/download/', download_export_job, name='download_export_job'),
+    path('api/reports/pivot/', pivot_report_api, name='pivot_report_api'),
+    path('api/reports/pivot/export/', export_pivot_report, name='export_pivot_report'),
 
     # Backup
     path('backup/', backup, name='backup'),
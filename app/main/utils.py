@@ -1,7 +1,10 @@
 import re
 import jdatetime
-from datetime import timedelta, date
 from decimal import Decimal, ROUND_HALF_UP
+from .jcalendar import (
+    to_jalali_parts,
+    to_jalali_string,
+)
 
 
 # CONSTs:
@@ -29,6 +32,17 @@ MONTHS_NAME = [
     'اسفند',
 ]
 
+COMMISSION_PATTERN = re.compile(r'\s*\(کارمزد:\s*([0-9,،\u06F0-\u06F9]+)\s*ریال\)')
+
+PERSIAN_NORMALIZATION_TABLE = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    '\u200c': None,
+    **{persian: str(digit) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(digit) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+
 CARD_COLOR_CHOICES = (
     ('#007bff', 'آبی',),
     ('#dc3545', 'قرمز',),
@@ -68,9 +82,11 @@ def format_currency(amount):
 def get_jalali_date(date):
     if date is None:
         return ""
-    return jdatetime.datetime.fromgregorian(
-        datetime=date
-    ).strftime('%Y/%m/%d')
+    return to_jalali_string(date)
+
+
+def get_jalali_parts(date):
+    return to_jalali_parts(date)
 
 
 def format_card_number_last4(number):
@@ -78,73 +94,17 @@ def format_card_number_last4(number):
     return last
 
 
+def normalize_persian_text(text):
+    if not text:
+        return ''
+    return text.translate(PERSIAN_NORMALIZATION_TABLE)
+
+
 def english_to_persian_numbers(text):
     translation_table = str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')
     return text.translate(translation_table)
 
 
-def get_date_range_persian(time_filter):
-
-    today_greg = date.today()
-    today_jalali = jdatetime.date.fromgregorian(date=today_greg)
-
-    start_jalali, end_jalali = None, None
-
-    if time_filter == 'year':
-        start_jalali = jdatetime.date(
-            today_jalali.year,
-            1,
-            1,
-        )
-        try:
-            end_jalali = jdatetime.date(
-                today_jalali.year,
-                12,
-                30,
-            )
-        except ValueError:
-            end_jalali = jdatetime.date(
-                today_jalali.year,
-                12,
-                29,
-            )
-
-    else:
-        start_jalali = jdatetime.date(
-            today_jalali.year,
-            today_jalali.month,
-            1,
-        )
-
-        month = today_jalali.month
-
-        if month <= 6:
-            end_day = 31
-        elif month <= 11:
-            end_day = 30
-        else:
-            try:
-                jdatetime.date(
-                    today_jalali.year,
-                    12,
-                    30,
-                )
-                end_day = 30
-            except ValueError:
-                end_day = 29
-
-        end_jalali = jdatetime.date(
-            today_jalali.year,
-            today_jalali.month,
-            end_day,
-        )
-
-    start_date_greg = start_jalali.togregorian()
-    end_date_greg = end_jalali.togregorian() + timedelta(days=1)
-
-    return start_date_greg, end_date_greg
-
-
 def convert_sut_to_gram(sut_weight, precision=3):
     try:
         sut_decimal = Decimal(sut_weight)
@@ -177,9 +137,7 @@ def extract_commission_from_description(description):
     if not description:
         return Decimal(0)
 
-    commission_pattern = re.compile(r'\(کارمزد:\s*([0-9,،\u06F0-\u06F9]+)\s*ریال\)')
-
-    match = commission_pattern.search(description)
+    match = COMMISSION_PATTERN.search(description)
 
     if match:
         amount_str = match.group(1)
@@ -189,4 +147,10 @@ def extract_commission_from_description(description):
 
         return Decimal(english_amount_str.replace(',', '').replace('،', ''))
 
-    return Decimal(0)
\ No newline at end of file
+    return Decimal(0)
+
+
+def strip_commission_from_description(description):
+    if not description:
+        return description
+    return COMMISSION_PATTERN.sub('', description).rstrip()
\ No newline at end of file
@@ -1,13 +1,12 @@
 import os
-import shutil
+import sqlite3
 import urllib.parse
 from django.conf import settings
-from django.db import connections
+from django.db import connection
 from django.contrib import messages
 from django.http import FileResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-from django.db.backends.sqlite3.base import DatabaseWrapper
 from django.shortcuts import (
     render,
     redirect,
@@ -24,19 +23,26 @@ def backup(request):
     return render(request, 'main/backup.html', context)
 
 
-@login_required
-@require_POST
-def create_backup(request):
-    db_name = settings.DATABASES['default']['NAME']
+def write_sqlite_backup(path):
+    """Copies the live database to ``path`` with SQLite's online backup API.
+
+    The copy is a consistent snapshot that includes whatever is still in
+    the WAL file, so writes committed meanwhile are never half there.
+    """
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
     try:
-        conn = connections[
-            settings.DATABASES['default']['NAME']
-        ]
-        if isinstance(conn, DatabaseWrapper):
-            conn.close()
+        connection.connection.backup(target)
     except Exception:
-        pass
+        target.close()
+        os.remove(path)
+        raise
+    target.close()
 
+
+@login_required
+@require_POST
+def create_backup(request):
     temp_backup_dir = os.path.join(
         settings.BASE_DIR,
         'backups',
@@ -58,7 +64,7 @@ def create_backup(request):
         temp_backup_path = os.path.join(temp_backup_dir, server_filename)
         download_filename = f"{unique_filename_part}.sqlite3"
 
-        shutil.copy2(db_name, temp_backup_path)
+        write_sqlite_backup(temp_backup_path)
 
         file_handle = open(temp_backup_path, 'rb')
         response = FileResponse(
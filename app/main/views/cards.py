@@ -1,3 +1,4 @@
+import jdatetime
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from decimal import (
@@ -13,11 +14,14 @@ from django.views.decorators.http import (
     require_http_methods,
 )
 from ..models import Card
+from ..ledger import get_total_balance_at
 from ..utils import (
     BANK_CHOICES,
     CARD_COLOR_CHOICES,
+    format_currency,
     english_to_persian_numbers,
 )
+from ..caching import conditional_on_data
 
 
 @login_required
@@ -91,6 +95,7 @@ def add_card(request):
             owner=owner,
             number=number,
             balance=balance_value,
+            opening_balance=balance_value,
             color=color,
         )
         return JsonResponse(
@@ -202,4 +207,60 @@ def deactivate_card(request):
                 'message': str(e),
             },
             status=500,
-        )
\ No newline at end of file
+        )
+
+
+@login_required
+@require_http_methods(["GET"])
+@conditional_on_data
+def card_balance_at_api(request):
+    date_str = request.GET.get('date', '').strip()
+    card_id = request.GET.get('card_id', 'all')
+    card_ids_str = request.GET.get('card_ids', '')
+
+    try:
+        balance_date = jdatetime.datetime.strptime(
+            date_str,
+            '%Y/%m/%d',
+        ).togregorian().date()
+    except ValueError:
+        return JsonResponse(
+            {
+                'success': False,
+                'message': 'قالب تاریخ نامعتبر است. (انتظار: YYYY/MM/DD)',
+            },
+            status=400,
+        )
+
+    if card_id and card_id != 'all':
+        try:
+            card = Card.objects.get(id=card_id)
+        except (Card.DoesNotExist, ValueError):
+            return JsonResponse(
+                {
+                    'success': False,
+                    'message': 'کارت مورد نظر یافت نشد.',
+                },
+                status=404,
+            )
+        balance = card.balance_at(balance_date)
+    else:
+        cards_q = Card.objects.filter(active=True)
+        card_ids = [
+            int(cid.strip())
+            for cid in card_ids_str.split(',')
+            if cid.strip().isdigit()
+        ]
+        if card_ids:
+            cards_q = Card.objects.filter(id__in=card_ids)
+        balance = get_total_balance_at(balance_date, cards_q)
+
+    return JsonResponse(
+        {
+            'success': True,
+            'card_id': card_id,
+            'date': date_str,
+            'balance': balance,
+            'balance_formatted': format_currency(balance),
+        },
+    )
@@ -4,21 +4,19 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
-from django.db.models import (
-    Q,
-    Sum,
-    Count,
-)
+from django.db.models import Sum
 from ..models import (
     Category,
     Transaction,
+    MonthlyCategoryTotal,
 )
 from ..utils import (
     MONTHS_NAME,
     get_jalali_date,
-    get_date_range_persian,
-    format_card_number_last4,
 )
+from ..periods import get_current_period_range
+from ..serializers import get_transaction_rows
+from ..caching import conditional_on_data
 
 
 @login_required
@@ -34,24 +32,35 @@ def categories(request):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional_on_data
 def get_filtered_categories_ajax(request):
     category_type = request.GET.get('type', 'all')
     time_filter = request.GET.get('time', 'month')
 
-    start_date, end_date = get_date_range_persian(time_filter)
+    jtoday = jdatetime.date.today()
 
-    amount_filters = Q(
-        date__gte=start_date,
-        date__lt=end_date,
+    totals_queryset = MonthlyCategoryTotal.objects.filter(
+        jyear=jtoday.year,
     )
+    if time_filter != 'year':
+        totals_queryset = totals_queryset.filter(jmonth=jtoday.month)
     if category_type != 'all':
-        amount_filters &= Q(kind=category_type)
+        totals_queryset = totals_queryset.filter(kind=category_type)
+
+    category_totals = {
+        item['category_id']: item
+        for item in totals_queryset.values(
+            'category_id',
+        ).annotate(
+            total_amount=Sum('total'),
+            transaction_count=Sum('count'),
+        ).order_by()
+    }
 
-    total_amount_in_scope = Transaction.objects.filter(
-        amount_filters
-    ).aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+    total_amount_in_scope = sum(
+        item['total_amount']
+        for item in category_totals.values()
+    ) or 0
 
     if total_amount_in_scope == 0:
         total_amount_in_scope = 1
@@ -60,25 +69,15 @@ def get_filtered_categories_ajax(request):
     if category_type != 'all':
         category_queryset = category_queryset.filter(kind=category_type)
 
-    annotation_filters = Q(
-        transaction__date__gte=start_date,
-        transaction__date__lt=end_date,
-    )
-    if category_type != 'all':
-        annotation_filters &= Q(
-            transaction__kind=category_type
-        )
+    categories_with_stats = []
+    for category in category_queryset:
+        stats = category_totals.get(category.id, {})
+        category.total_amount = stats.get('total_amount')
+        category.transaction_count = stats.get('transaction_count')
+        categories_with_stats.append(category)
 
-    categories_with_stats = category_queryset.annotate(
-        total_amount=Sum(
-            'transaction__amount',
-            filter=annotation_filters,),
-        transaction_count=Count(
-            'transaction',
-            filter=annotation_filters,),
-    ).order_by(
-        '-total_amount',
-        'name',
+    categories_with_stats.sort(
+        key=lambda c: (-(c.total_amount or 0), c.name),
     )
 
     color_map = {
@@ -166,6 +165,7 @@ def add_category_ajax(request):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional_on_data
 def get_category_transactions_ajax(request):
     category_id = request.GET.get('category_id')
     time_filter = request.GET.get('time_filter', 'month')
@@ -180,54 +180,30 @@ def get_category_transactions_ajax(request):
         )
 
     try:
-        start_date, end_date = get_date_range_persian(time_filter)
+        start_date, end_date = get_current_period_range(
+            'year' if time_filter == 'year' else 'month'
+        )
 
         transactions = Transaction.objects.filter(
             category_id=category_id,
             date__gte=start_date,
             date__lt=end_date,
-        ).select_related(
-            'source', 'destination',
         ).order_by('-date')
 
         category_name = Category.objects.get(id=category_id).name
 
-        transaction_list = []
-        for t in transactions:
-            jalali_date = jdatetime.datetime.fromgregorian(
-                date=t.date
-            ).strftime('%Y/%m/%d')
-
-            source_display = "نامشخص"
-            destination_display = "نامشخص"
-
-            if t.source:
-                if t.source.active:
-                    source_display = (f"{t.source.get_name_display()} ({t.source.owner}) - "
-                                      f"{format_card_number_last4(t.source.number)}")
-                else:
-                    source_display = (f"{t.source.get_name_display()} ({t.source.owner}) - "
-                                      f"{format_card_number_last4(t.source.number)} - غیرفعال")
-
-            if t.destination:
-                if t.destination.active:
-                    destination_display = (f"{t.destination.get_name_display()} ({t.destination.owner}) - "
-                                           f"{format_card_number_last4(t.destination.number)}")
-                else:
-                    destination_display = (f"{t.destination.get_name_display()} ({t.destination.owner}) - "
-                                           f"{format_card_number_last4(t.destination.number)} - غیرفعال")
-
-            transaction_list.append(
-                {
-                    'kind_display': t.get_kind_display(),
-                    'amount': f"{int(t.amount):,}",
-                    'date': jalali_date,
-                    'source_display': source_display,
-                    'destination_display': destination_display,
-                    'description': t.description,
-                    'kind_code': t.kind,
-                },
-            )
+        transaction_list = [
+            {
+                'kind_display': row['kind_display'],
+                'amount': f"{int(row['amount']):,}",
+                'date': get_jalali_date(row['date']),
+                'source_display': row['source_label'] or "نامشخص",
+                'destination_display': row['destination_label'] or "نامشخص",
+                'description': row['description'],
+                'kind_code': row['kind'],
+            }
+            for row in get_transaction_rows(transactions)
+        ]
         return JsonResponse(
             {
                 'status': 'success',
@@ -1,17 +1,17 @@
 import json
+import asyncio
 import jdatetime
 from decimal import Decimal
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
+from asgiref.sync import sync_to_async
 
-from datetime import (
-    date,
-    datetime,
-    timedelta,
-)
+from datetime import date
 from django.db.models import (
+    Q,
     Sum,
+    Count,
     DecimalField,
 )
 from ..models import (
@@ -19,6 +19,7 @@ from ..models import (
     Card,
     Category,
     Gold,
+    MonthlyCategoryTotal,
 )
 from ..utils import (
     get_jalali_date,
@@ -26,97 +27,79 @@ from ..utils import (
     MONTHS_NAME,
     convert_sut_to_gram,
 )
+from ..periods import get_current_period_range
+from ..db_functions import (
+    JalaliWeek,
+    JalaliWeekday,
+)
+from ..caching import (
+    get_or_compute,
+    conditional_on_data,
+)
+from ..concurrency import run_in_pool
+
+
+def get_expense_category_extremes():
+    cyear = jdatetime.date.today().year
+    category_totals = list(
+        MonthlyCategoryTotal.objects.filter(
+            kind='E',
+            jyear=cyear,
+        ).values(
+            'category',
+            'category__name',
+        ).annotate(
+            total_spent=Sum(
+                'total',
+                output_field=DecimalField(),
+            )
+        ).order_by('-total_spent', 'category')
+    )
 
+    if not category_totals:
+        return None, None
 
-def get_most_expensive_category():
-    cyear = datetime.now().year
-    most_expensive = Transaction.objects.filter(
-        kind='E',
-        date__year=cyear,
-    ).values('category').annotate(
-        total_spent=Sum(
-            'amount',
-            output_field=DecimalField(),
-        )
-    ).order_by('-total_spent').first()
-
-    if most_expensive:
-        try:
-            category_id = most_expensive['category']
-            most_expensive_category = Category.objects.get(pk=category_id)
-            most_expensive_category.total_spent = most_expensive['total_spent']
-            return most_expensive_category
-        except Category.DoesNotExist:
-            return None
-    return None
-
-
-def get_least_expensive_category():
-    cyear = datetime.now().year
-    least_expensive = Transaction.objects.filter(
-        kind='E',
-        date__year=cyear,
-    ).values('category').annotate(
-        total_spent=Sum(
-            'amount',
-            output_field=DecimalField(),
+    extremes = []
+    for item in (category_totals[0], category_totals[-1]):
+        category = Category(
+            pk=item['category'],
+            name=item['category__name'],
         )
-    ).order_by('total_spent').first()
+        category.total_spent = item['total_spent']
+        extremes.append(category)
 
-    if least_expensive:
-        try:
-            category_id = least_expensive['category']
-            least_expensive_category = Category.objects.get(pk=category_id)
-            least_expensive_category.total_spent = least_expensive['total_spent']
-            return least_expensive_category
-        except Category.DoesNotExist:
-            return None
-    return None
+    return tuple(extremes)
 
 
 def get_current_month_transactions(kind='E'):
     jtoday = jdatetime.date.today()
     jyear, jmonth = jtoday.year, jtoday.month
 
-    j_start_date = jdatetime.date(
-        jyear,
-        jmonth,
-        1,
-    )
-
-    if jmonth < 12:
-        j_next_month = jdatetime.date(
-            jyear,
-            jmonth + 1,
-            1,
-        )
-    else:
-        j_next_month = jdatetime.date(
-            jyear + 1,
-            1,
-            1,
-        )
-
-    g_start_date = j_start_date.togregorian()
-    g_end_date = j_next_month.togregorian() - timedelta(days=1)
-
-    days_passed = (jdatetime.date.today() - j_start_date).days + 1
+    days_passed = jtoday.day
 
     transactions = Transaction.objects.filter(
         kind=kind,
-        date__range=[g_start_date, g_end_date],
+        jyear=jyear,
+        jmonth=jmonth,
     ).order_by('-date')
 
-    total_amount = transactions.aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal(0)
+    cat_summary = list(
+        MonthlyCategoryTotal.objects.filter(
+            kind=kind,
+            jyear=jyear,
+            jmonth=jmonth,
+        ).values(
+            'category__name',
+            'category__id',
+        ).annotate(
+            amount=Sum('total')
+        ).order_by('-amount')
+    )
 
-    cat_summary = transactions.values(
-        'category__name',
-        'category__id',
-    ).annotate(
-        amount=Sum('amount')
-    ).order_by('-amount')
+    total_amount = sum(
+        (item['amount'] for item in cat_summary),
+        Decimal(0),
+    )
 
     final_cat = {}
     total_amount_for_division = total_amount or Decimal(1)
@@ -144,18 +127,7 @@ def get_current_month_transactions(kind='E'):
     }
 
 
-@login_required
-def monthly_data_api(request):
-    kind = request.GET.get('kind', 'E')
-
-    if kind not in ['E', 'I', 'T']:
-        return JsonResponse(
-            {
-                'error': 'Invalid kind parameter',
-            },
-            status=400,
-        )
-
+def get_monthly_data_payload(kind):
     data = get_current_month_transactions(kind=kind)
 
     total_amount = data['total_amount']
@@ -167,79 +139,74 @@ def monthly_data_api(request):
     else:
         average_daily = Decimal(0)
 
-    return JsonResponse({
+    return {
         'total_amount': format_currency(total_amount),
         'categories_summary': categories_summary,
         'average_daily': format_currency(average_daily),
         'kind': kind,
-    })
+    }
+
+
+@login_required
+@conditional_on_data
+def monthly_data_api(request):
+    kind = request.GET.get('kind', 'E')
+
+    if kind not in ['E', 'I', 'T']:
+        return JsonResponse(
+            {
+                'error': 'Invalid kind parameter',
+            },
+            status=400,
+        )
+
+    return JsonResponse(
+        get_or_compute(
+            'monthly-data',
+            [kind],
+            lambda: get_monthly_data_payload(kind),
+        )
+    )
 
 
 def get_yearly_summary_data(kind: str, year=None) -> list:
     current_jdate = jdatetime.date.today()
     j_year = current_jdate.year if year is None else year
 
-    start_jdate = jdatetime.date(
-        j_year,
-        1,
-        1,
+    yearly_totals = MonthlyCategoryTotal.objects.filter(
+        kind=kind,
+        jyear=j_year,
     )
-    start_gdate = start_jdate.togregorian()
 
     if j_year == current_jdate.year:
-        end_gdate = current_jdate.togregorian()
-    else:
-        end_jdate = jdatetime.date(
-            j_year,
-            12,
-            29,
+        yearly_totals = yearly_totals.filter(
+            jmonth__lte=current_jdate.month,
         )
-        end_gdate = end_jdate.togregorian()
 
-    yearly_transactions = Transaction.objects.filter(
-        kind=kind,
-        date__gte=start_gdate,
-        date__lte=end_gdate,
-    ).values('date', 'amount')
-
-    yearly_summary = {}
-
-    for transaction in yearly_transactions:
-        g_date = transaction['date']
-        j_date = jdatetime.date.fromgregorian(date=g_date)
-
-        if j_date.year == j_year:
-            j_month_index = j_date.month
-            amount = float(transaction['amount'] or 0)
+    monthly_totals = yearly_totals.values(
+        'jmonth',
+    ).annotate(
+        total_amount=Sum('total'),
+    ).order_by('jmonth')
 
-            if j_month_index in yearly_summary:
-                yearly_summary[j_month_index]['total_amount'] += amount
-            else:
-                month_name = MONTHS_NAME[j_month_index - 1].strip()
-                yearly_summary[j_month_index] = {
-                    'month_name_fa': month_name,
-                    'total_amount': amount,
-                }
+    yearly_summary = {
+        item['jmonth']: float(item['total_amount'] or 0)
+        for item in monthly_totals
+    }
 
     final_list = []
     for m in range(1, 13):
         month_name = MONTHS_NAME[m - 1].strip()
-
-        if m in yearly_summary:
-            final_list.append(yearly_summary[m])
-        else:
-            final_list.append(
-                {
-                    'month_name_fa': month_name,
-                    'total_amount': 0,
-                }
-            )
+        final_list.append(
+            {
+                'month_name_fa': month_name,
+                'total_amount': yearly_summary.get(m, 0),
+            }
+        )
     return final_list
 
 
-@login_required
-def get_annual_chart_data(request):
-    kind = request.GET.get('kind', 'E').upper()
+def get_annual_chart_payload(kind):
     yearly_data = get_yearly_summary_data(kind=kind)
 
     chart_labels = [
@@ -252,55 +219,93 @@ def get_annual_chart_data(request):
         for item in yearly_data
     ]
 
-    return JsonResponse({
+    return {
         'labels': chart_labels,
         'series': chart_series,
-    })
+    }
 
 
 @login_required
-def category_tag_report_api(request):
-    category_id = request.GET.get('category_id')
-    kind = request.GET.get('kind', 'E')
+@conditional_on_data
+def get_annual_chart_data(request):
+    kind = request.GET.get('kind', 'E').upper()
 
-    if not category_id:
+    return JsonResponse(
+        get_or_compute(
+            'annual-data',
+            [kind],
+            lambda: get_annual_chart_payload(kind),
+        )
+    )
+
+
+def get_heatmap_payload(kind, year):
+    cells = Transaction.objects.filter(
+        kind=kind,
+        jyear=year,
+    ).values(
+        week=JalaliWeek('date'),
+        weekday=JalaliWeekday('date'),
+    ).annotate(
+        total=Sum('amount'),
+        count=Count('id'),
+    ).order_by('week', 'weekday')
+
+    cell_list = [
+        {
+            'week': cell['week'],
+            'weekday': cell['weekday'],
+            'total': float(cell['total']),
+            'total_formatted': format_currency(cell['total']),
+            'count': cell['count'],
+        }
+        for cell in cells
+    ]
+
+    return {
+        'year': year,
+        'kind': kind,
+        'cells': cell_list,
+        'max_total': max((cell['total'] for cell in cell_list), default=0),
+    }
+
+
+@login_required
+@conditional_on_data
+def heatmap_api(request):
+    kind = request.GET.get('kind', 'E').upper()
+
+    if kind not in ['E', 'I', 'T']:
         return JsonResponse(
             {
-                'error': 'Category ID is required.',
+                'error': 'Invalid kind parameter',
             },
             status=400,
         )
 
     try:
-        category = Category.objects.get(id=category_id)
-    except Category.DoesNotExist:
+        year = int(request.GET.get('year') or jdatetime.date.today().year)
+    except ValueError:
         return JsonResponse(
             {
-                'error': 'Category not found.',
+                'error': 'Invalid year parameter',
             },
-            status=404,
+            status=400,
         )
 
-    jtoday = jdatetime.date.today()
-    jyear, jmonth = jtoday.year, jtoday.month
-
-    j_start_date = jdatetime.date(
-        jyear,
-        jmonth,
-        1,
-    )
-    j_next_month = jdatetime.date(
-        jyear,
-        jmonth + 1,
-        1,
-    ) if jmonth < 12 else jdatetime.date(
-        jyear + 1,
-        1,
-        1,
+    return JsonResponse(
+        get_or_compute(
+            'heatmap',
+            [kind, year],
+            lambda: get_heatmap_payload(kind, year),
+        )
     )
 
-    g_start_date = j_start_date.togregorian()
-    g_end_date = j_next_month.togregorian()
+
+def get_category_tag_payload(category_id, kind):
+    category = Category.objects.get(id=category_id)
+
+    g_start_date, g_end_date = get_current_period_range('month')
 
     transactions_in_category = Transaction.objects.filter(
         kind=kind,
@@ -314,18 +319,12 @@ def category_tag_report_api(request):
     )['total'] or Decimal(0)
 
     if total_category_amount == Decimal(0):
-        return JsonResponse({
+        return {
             'category_name': category.name,
             'total_category_amount_formatted': format_currency(Decimal(0)),
             'total_tagged_amount_formatted': format_currency(Decimal(0)),
             'tags_summary': [],
-        })
-
-    tagged_transactions_amount = Transaction.objects.filter(
-        tags__isnull=False
-    ).aggregate(
-        total=Sum('amount')
-    )['total'] or Decimal(0)
+        }
 
     tagged_transactions_qs = transactions_in_category.filter(
         tags__isnull=False
@@ -387,118 +386,170 @@ def category_tag_report_api(request):
         reverse=True,
     )
 
-    return JsonResponse(
-        {
-            'category_name': category.name,
-            'total_category_amount_formatted': format_currency(total_category_amount),
-            'total_tagged_amount_formatted': format_currency(tagged_transactions_amount),
-            'tags_summary': final_tags,
-        }
-    )
+    return {
+        'category_name': category.name,
+        'total_category_amount_formatted': format_currency(total_category_amount),
+        'total_tagged_amount_formatted': format_currency(tagged_transactions_amount),
+        'tags_summary': final_tags,
+    }
 
 
 @login_required
-def dashboard(request):
-    current_date = date.today()
-    jy, jm, _ = get_jalali_date(current_date).split('/')
+@conditional_on_data
+def category_tag_report_api(request):
+    category_id = request.GET.get('category_id')
+    kind = request.GET.get('kind', 'E')
 
-    cards = Card.objects.filter(active=True)
-    golds = Gold.objects.filter(is_sold=False)
-    all_golds = Gold.objects.all()
-    sold_golds = Gold.objects.filter(is_sold=True)
+    if not category_id:
+        return JsonResponse(
+            {
+                'error': 'Category ID is required.',
+            },
+            status=400,
+        )
 
-    total_gold = 0
-    for g in golds:
-        total_gold += g.weight
+    try:
+        payload = get_or_compute(
+            'category-tag-report',
+            [category_id, kind],
+            lambda: get_category_tag_payload(category_id, kind),
+        )
+    except Category.DoesNotExist:
+        return JsonResponse(
+            {
+                'error': 'Category not found.',
+            },
+            status=404,
+        )
 
-    total_gold_price = 0
-    total_all_gold = 0
-    for g in all_golds:
-        total_gold_price += g.price
-        total_all_gold += g.weight
+    return JsonResponse(payload)
 
-    f_total_all_gold = convert_sut_to_gram(total_all_gold)
-    total_all_gold_label = 'سوت'
 
-    if f_total_all_gold < 1:
-        total_all_gold = f'{total_all_gold:,.0f}'
-    else:
-        total_all_gold = f_total_all_gold
-        total_all_gold_label = 'گرم'
+def format_gold_weight(weight):
+    grams = convert_sut_to_gram(weight)
 
-    f_total_gold = convert_sut_to_gram(total_gold)
-    total_gold_label = 'سوت'
+    if grams < 1:
+        return f'{weight:,.0f}', 'سوت'
+    return grams, 'گرم'
 
-    if f_total_gold < 1:
-        total_gold = f'{total_gold:,.0f}'
-    else:
-        total_gold = f_total_gold
-        total_gold_label = 'گرم'
 
-    total_sold_gold = 0
-    total_sold_price = 0
-    for g in sold_golds:
-        total_sold_gold += g.weight
-        total_sold_price += g.p_price
+def get_card_summary():
+    cards = Card.objects.filter(active=True)
+
+    total_balance = cards.aggregate(
+        total=Sum('balance'),
+    )['total'] or 0
 
-    f_total_sold_gold = convert_sut_to_gram(total_sold_gold)
-    total_sold_gold_label = 'سوت'
+    return {
+        'cards': list(cards),
+        'total_balance': format_currency(total_balance),
+    }
 
-    if f_total_sold_gold < 1:
-        total_sold_gold = f'{total_sold_gold:,.0f}'
-    else:
-        total_sold_gold = f_total_sold_gold
-        total_sold_gold_label = 'گرم'
 
-    total_balance = 0
-    for c in cards:
-        total_balance += int(c.balance)
+def get_gold_summary():
+    gold_totals = Gold.objects.aggregate(
+        total_gold=Sum('weight', filter=Q(is_sold=False)),
+        total_all_gold=Sum('weight'),
+        total_gold_price=Sum('price'),
+        total_sold_gold=Sum('weight', filter=Q(is_sold=True)),
+        total_sold_price=Sum('p_price', filter=Q(is_sold=True)),
+    )
+
+    total_gold, total_gold_label = format_gold_weight(
+        gold_totals['total_gold'] or 0
+    )
+    total_all_gold, total_all_gold_label = format_gold_weight(
+        gold_totals['total_all_gold'] or 0
+    )
+    total_sold_gold, total_sold_gold_label = format_gold_weight(
+        gold_totals['total_sold_gold'] or 0
+    )
+
+    return {
+        'total_gold': total_gold,
+        'total_gold_label': total_gold_label,
+        'total_gold_price': gold_totals['total_gold_price'] or 0,
+        'total_sold_gold': total_sold_gold,
+        'total_sold_gold_label': total_sold_gold_label,
+        'total_sold_price': gold_totals['total_sold_price'] or 0,
+        'total_all_gold': total_all_gold,
+        'total_all_gold_label': total_all_gold_label,
+    }
+
 
+def get_current_month_summary():
     monthly_data = get_current_month_transactions(kind='E')
-    current_expenses = monthly_data['transactions']
     total_current_expenses = monthly_data['total_amount']
-    final_e_cat = monthly_data['categories_summary']
-    days_passed = monthly_data['days_passed']
-    total_current_expenses_raw_str = str(total_current_expenses)
 
+    return {
+        'current_e': monthly_data['transactions'],
+        'total_current_e': format_currency(total_current_expenses),
+        'e_cat': monthly_data['categories_summary'],
+        'total_current_expenses_raw': str(total_current_expenses),
+        'days_passed': monthly_data['days_passed'],
+    }
+
+
+def get_yearly_chart_summary():
     yearly_expenses_data = get_yearly_summary_data(kind='E')
 
     chart_labels = [item['month_name_fa'] for item in yearly_expenses_data]
     chart_series = [item['total_amount'] for item in yearly_expenses_data]
 
-    y_status = True
-    for x in chart_series:
-        if x > 0:
-            break
-    else:
-        y_status = False
-
-    top_e = get_most_expensive_category()
-    low_e = get_least_expensive_category()
-
-    context = {
-        'cards': cards,
-        'total_balance': format_currency(total_balance),
-        'current_month': MONTHS_NAME[int(jm) - 1],
-        'current_year': jy,
-        'current_e': current_expenses,
-        'total_current_e': format_currency(total_current_expenses),
-        'e_cat': final_e_cat,
-        'total_current_expenses_raw': total_current_expenses_raw_str,
-        'days_passed': days_passed,
+    return {
         'yearly_chart_labels': json.dumps(chart_labels),
         'yearly_chart_series': json.dumps(chart_series),
-        'year_status': y_status,
-        'total_gold': total_gold,
-        'total_gold_label': total_gold_label,
-        'total_gold_price': total_gold_price,
-        'total_sold_gold': total_sold_gold,
-        'total_sold_gold_label': total_sold_gold_label,
-        'total_sold_price': total_sold_price,
-        'total_all_gold': total_all_gold,
-        'total_all_gold_label': total_all_gold_label,
+        'year_status': any(x > 0 for x in chart_series),
+    }
+
+
+def get_category_extremes_summary():
+    top_e, low_e = get_expense_category_extremes()
+
+    return {
         'top_e': top_e,
         'low_e': low_e,
     }
 
-    return render(request, 'main/dashboard.html', context)
\ No newline at end of file
+
+# Independent parts of the dashboard context. Each one runs its own
+# aggregates, so the async dashboard can evaluate them concurrently.
+DASHBOARD_SECTIONS = (
+    get_card_summary,
+    get_gold_summary,
+    get_current_month_summary,
+    get_yearly_chart_summary,
+    get_category_extremes_summary,
+)
+
+
+def get_dashboard_base_context():
+    jy, jm, _ = get_jalali_date(date.today()).split('/')
+
+    return {
+        'current_month': MONTHS_NAME[int(jm) - 1],
+        'current_year': jy,
+    }
+
+
+@login_required
+def dashboard(request):
+    context = get_dashboard_base_context()
+
+    for section in DASHBOARD_SECTIONS:
+        context.update(section())
+
+    return render(request, 'main/dashboard.html', context)
+
+
+@login_required
+async def dashboard_async(request):
+    context = get_dashboard_base_context()
+
+    sections = await asyncio.gather(
+        *(run_in_pool(section) for section in DASHBOARD_SECTIONS)
+    )
+    for section in sections:
+        context.update(section)
+
+    return await sync_to_async(render)(request, 'main/dashboard.html', context)
@@ -10,7 +10,9 @@ from ..models import (
     Card,
     Category,
     Transaction,
+    MonthlyCategoryTotal,
 )
+from ..ledger import record_transaction
 
 
 @login_required
@@ -97,8 +99,6 @@ def add_gold(request):
                         },
                         status=400,
                     )
-                source_card.balance = current_balance - price
-                source_card.save()
 
             Gold.objects.create(
                 weight=weight,
@@ -108,7 +108,7 @@ def add_gold(request):
             )
 
             if is_buying and price != 0:
-                Transaction.objects.create(
+                purchase_transaction = Transaction.objects.create(
                     kind='E',
                     amount=price,
                     date=timezone.now(),
@@ -117,6 +117,8 @@ def add_gold(request):
                     category=transaction_category,
                     description=f'خرید {weight} سوت طلا',
                 )
+                record_transaction(purchase_transaction)
+                MonthlyCategoryTotal.apply(purchase_transaction)
 
             if is_buying:
                 message = 'خرید طلا با موفقیت ثبت شد و مبلغ از حساب کسر گردید.'
@@ -210,10 +212,7 @@ def sell_gold(request):
             gold_record.p_price = selling_price
             gold_record.save()
 
-            destination_card.balance = Decimal(destination_card.balance) + selling_price
-            destination_card.save()
-
-            Transaction.objects.create(
+            sale_transaction = Transaction.objects.create(
                 kind='I',
                 amount=selling_price,
                 date=timezone.now(),
@@ -222,6 +221,8 @@ def sell_gold(request):
                 category=transaction_category,
                 description=f'فروش {gold_record.weight:,.0f} سوت طلا ',
             )
+            record_transaction(sale_transaction)
+            MonthlyCategoryTotal.apply(sale_transaction)
 
             return JsonResponse(
                 {
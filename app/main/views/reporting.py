@@ -1,9 +1,23 @@
-import jdatetime
+import io
+import csv
+import json
+import tempfile
 from datetime import date
+from functools import partial
+from itertools import islice
 from openpyxl import Workbook
-from django.db.models import Sum
-from django.utils import timezone
-from django.http import JsonResponse
+from openpyxl.cell import WriteOnlyCell
+from django.db.models import (
+    Q,
+    Sum,
+    Count,
+)
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from openpyxl.utils import get_column_letter
 from django.utils.encoding import escape_uri_path
 from django.contrib.auth.decorators import login_required
@@ -12,22 +26,248 @@ from openpyxl.styles import (
     Font,
     Alignment,
 )
-from django.shortcuts import (
-    render,
-    HttpResponse,
-)
+from django.urls import reverse
+from django.shortcuts import render
 from ..models import (
     Tag,
     Card,
     Category,
     Transaction,
 )
+from ..search import search_transactions
+from ..serializers import (
+    KIND_DISPLAY,
+    is_columnar,
+    get_card_labels,
+    get_transaction_rows,
+    get_columnar_payload,
+)
+from ..pagination import get_page_size
+from ..pivot import (
+    PIVOT_DIMENSIONS,
+    get_pivot,
+)
+from ..report_filters import (
+    REPORT_TYPE_LABELS,
+    ReportFilter,
+    get_anchor_label,
+    apply_report_filters,
+)
 from ..utils import (
+    MONTHS_NAME,
     get_jalali_date,
     format_currency,
-    format_card_number_last4,
-    TRANSACTION_AND_KIND_CHOICES,
 )
+from ..caching import conditional_on_data
+from ..exports import (
+    read_job,
+    get_job_id,
+    is_job_usable,
+    get_artifact_path,
+    submit_export_job,
+)
+
+
+EXCEL_COLUMNS = [
+    'ردیف',
+    'تاریخ',
+    'نوع تراکنش',
+    'مبلغ (تومان)',
+    'کارمزد',
+    'دسته‌بندی',
+    'تگ‌ها',
+    'حساب مبدأ',
+    'حساب مقصد',
+    'توضیحات',
+]
+
+# Rows read per query (and per tag-link lookup) while exporting.
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+def get_report_row(row):
+    """Report dict for a row produced by get_transaction_rows()."""
+    return {
+        'id': row['id'],
+        'date': get_jalali_date(row['date']),
+        'kind': row['kind'],
+        'kind_display': row['kind_display'],
+        'category_name': row['category__name'] or '---',
+        'amount': row['amount'],
+        'amount_formatted': format_currency(row['amount']),
+        'commission': row['commission'],
+        'commission_formatted': format_currency(row['commission']) if row['commission'] else None,
+        'source_card_name': row['source_label'] or 'نامشخص',
+        'destination_card_name': row['destination_label'] or 'نامشخص',
+        'description': row['description'],
+        'tag_names': ', '.join(row['tags']),
+    }
+
+
+def get_commission_summary(queryset):
+    commission_rows = queryset.prefetch_related(None).filter(
+        commission__gt=0,
+    ).values(
+        'source_id',
+        'jyear',
+        'jmonth',
+    ).annotate(
+        total=Sum('commission'),
+    ).order_by(
+        'jyear',
+        'jmonth',
+    )
+
+    by_card, by_month = {}, {}
+    for row in commission_rows:
+        month_key = (row['jyear'], row['jmonth'])
+        by_card[row['source_id']] = by_card.get(row['source_id'], 0) + row['total']
+        by_month[month_key] = by_month.get(month_key, 0) + row['total']
+
+    card_labels = get_card_labels(by_card)
+
+    card_list = []
+    for card_id, total in sorted(by_card.items(), key=lambda item: -item[1]):
+        card_list.append(
+            {
+                'card_name': card_labels.get(card_id, 'نامشخص'),
+                'amount': total,
+                'amount_formatted': format_currency(total),
+            }
+        )
+
+    month_list = [
+        {
+            'year': jyear,
+            'month': jmonth,
+            'month_name': MONTHS_NAME[jmonth - 1],
+            'amount': total,
+            'amount_formatted': format_currency(total),
+        }
+        for (jyear, jmonth), total in by_month.items()
+    ]
+
+    total_commission = sum(by_card.values())
+
+    return {
+        'total': total_commission,
+        'total_formatted': format_currency(total_commission),
+        'by_card': card_list,
+        'by_month': month_list,
+    }
+
+
+def get_report_summary(queryset):
+    """Per-kind, per-category and per-card totals of ``queryset`` without reading its rows.
+
+    One query groups by (category, source, destination) with a conditional
+    sum and count per kind; the groups are folded here. Net flow is
+    income minus expenses and commissions, as transfers stay inside.
+    """
+    groups = queryset.prefetch_related(None).values(
+        'category_id',
+        'category__name',
+        'category__kind',
+        'source_id',
+        'destination_id',
+    ).annotate(
+        commission=Sum('commission'),
+        **{
+            f'total_{kind}': Sum('amount', filter=Q(kind=kind))
+            for kind in KIND_DISPLAY
+        },
+        **{
+            f'count_{kind}': Count('id', filter=Q(kind=kind))
+            for kind in KIND_DISPLAY
+        },
+    ).order_by()
+
+    kinds = {kind: {'total': 0, 'count': 0} for kind in KIND_DISPLAY}
+    categories, cards = {}, {}
+    total_commission = 0
+
+    for group in groups:
+        # Amounts are whole rials, so ints keep every total a JSON number.
+        amounts = {kind: int(group[f'total_{kind}'] or 0) for kind in KIND_DISPLAY}
+        commission = int(group['commission'] or 0)
+        total_commission += commission
+        group_total, group_count = 0, 0
+
+        for kind, totals in kinds.items():
+            amount = amounts[kind]
+            totals['total'] += amount
+            totals['count'] += group[f'count_{kind}']
+            group_total += amount
+            group_count += group[f'count_{kind}']
+
+        category = categories.setdefault(
+            group['category_id'],
+            {
+                'name': group['category__name'] or '---',
+                'kind': group['category__kind'],
+                'total': 0,
+                'count': 0,
+            },
+        )
+        category['total'] += group_total
+        category['count'] += group_count
+
+        if group['source_id'] is not None:
+            card = cards.setdefault(group['source_id'], {'inflow': 0, 'outflow': 0})
+            card['outflow'] += amounts['E'] + amounts['T'] + commission
+        if group['destination_id'] is not None:
+            card = cards.setdefault(group['destination_id'], {'inflow': 0, 'outflow': 0})
+            card['inflow'] += amounts['I'] + amounts['T']
+
+    card_labels = get_card_labels(cards)
+    net_flow = kinds['I']['total'] - kinds['E']['total'] - total_commission
+
+    return {
+        'kinds': [
+            {
+                'kind': kind,
+                'kind_display': KIND_DISPLAY[kind],
+                'total': totals['total'],
+                'total_formatted': format_currency(totals['total']),
+                'count': totals['count'],
+            }
+            for kind, totals in kinds.items()
+        ],
+        'count': sum(totals['count'] for totals in kinds.values()),
+        'commission': total_commission,
+        'commission_formatted': format_currency(total_commission),
+        'net_flow': net_flow,
+        'net_flow_formatted': format_currency(net_flow),
+        'categories': [
+            {
+                'id': category_id,
+                'name': category['name'],
+                'kind': category['kind'],
+                'total': category['total'],
+                'total_formatted': format_currency(category['total']),
+                'count': category['count'],
+            }
+            for category_id, category in sorted(categories.items(), key=lambda item: -item[1]['total'])
+        ],
+        'cards': [
+            {
+                'id': card_id,
+                'card_name': card_labels.get(card_id, 'نامشخص'),
+                'inflow': card['inflow'],
+                'inflow_formatted': format_currency(card['inflow']),
+                'outflow': card['outflow'],
+                'outflow_formatted': format_currency(card['outflow']),
+                'net': card['inflow'] - card['outflow'],
+                'net_formatted': format_currency(card['inflow'] - card['outflow']),
+            }
+            for card_id, card in sorted(cards.items(), key=lambda item: -(item[1]['inflow'] + item[1]['outflow']))
+        ],
+    }
 
 
 @login_required
@@ -47,397 +287,556 @@ def reporting(request):
 
 @login_required
 @require_http_methods(["GET"])
+@conditional_on_data
 def filter_transactions_ajax(request):
-    transaction_type = request.GET.get('type')
-    category_id = request.GET.get('category')
-    source_card_id = request.GET.get('source')
-    destination_card_id = request.GET.get('destination')
-    tag_id = request.GET.get('tag')
-    report_type = request.GET.get('report_type')
-    day = request.GET.get('day')
-    month = request.GET.get('month')
-    year = request.GET.get('year')
-
-    queryset = Transaction.objects.select_related(
-        'category',
-        'source',
-        'destination',
-    ).prefetch_related('tags').all()
-
-    if transaction_type and transaction_type != 'all':
-        queryset = queryset.filter(kind=transaction_type)
-    if category_id and category_id != 'all':
-        queryset = queryset.filter(category_id=category_id)
-    if tag_id and tag_id != 'all':
-        queryset = queryset.filter(tags__id=tag_id)
-    if source_card_id and source_card_id != 'all':
-        queryset = queryset.filter(source_id=source_card_id)
-    if destination_card_id and destination_card_id != 'all':
-        queryset = queryset.filter(destination_id=destination_card_id)
-
-    start_date_gregorian, end_date_gregorian = None, None
-    try:
-        int_year = int(year) if year else None
-        int_month = int(month) if month else None
-        int_day = int(day) if day else None
-
-        if report_type == 'daily' and int_year and int_month and int_day:
-            jalali_date = jdatetime.date(
-                int_year,
-                int_month,
-                int_day,
-            )
-            start_date_gregorian = jalali_date.togregorian()
-            end_date_gregorian = start_date_gregorian
-
-        elif report_type == 'monthly' and int_year and int_month:
-            start_jalali = jdatetime.date(
-                int_year,
-                int_month,
-                1,
-            )
-            start_date_gregorian = start_jalali.togregorian()
-
-            try:
-                end_jalali = jdatetime.date(
-                    int_year,
-                    int_month,
-                    31,
-                )
-            except ValueError:
-                try:
-                    end_jalali = jdatetime.date(
-                        int_year,
-                        int_month,
-                        30,
-                    )
-                except ValueError:
-                    end_jalali = jdatetime.date(
-                        int_year,
-                        int_month,
-                        29,
-                    )
-            end_date_gregorian = end_jalali.togregorian()
-
-        elif report_type == 'annual' and int_year:
-            start_jalali = jdatetime.date(
-                int_year,
-                1,
-                1,
-            )
-            start_date_gregorian = start_jalali.togregorian()
-
-            try:
-                end_date_gregorian = jdatetime.date(
-                    int_year,
-                    12,
-                    30,
-                ).togregorian()
-            except ValueError:
-                end_date_gregorian = jdatetime.date(
-                    int_year,
-                    12,
-                    29,
-                ).togregorian()
-
-        if start_date_gregorian and end_date_gregorian:
-            queryset = queryset.filter(
-                date__range=(
-                    start_date_gregorian,
-                    end_date_gregorian,
-                ),
-            )
-    except (ValueError, TypeError):
+    report = ReportFilter(request.GET)
+    if report.error:
         return JsonResponse(
             {
                 'transactions': [],
-                'error': 'تاریخ وارد شده نامعتبر است.',
+                'error': report.error,
             },
             status=400,
         )
 
-    total_amount = None
-    if transaction_type and transaction_type != 'all':
-        total_sum = queryset.aggregate(total=Sum('amount'))
-        if total_sum and total_sum['total'] is not None:
-            total_amount = total_sum['total']
-
-    transactions_list = []
-    for tx in queryset:
-        jalali_dt = get_jalali_date(tx.date)
-        amount_formatted = format_currency(tx.amount)
-
-        source_display = 'نامشخص'
-        if tx.source:
-            if not tx.source.active:
-                source_display = (f"{tx.source.get_name_display()} ({tx.source.owner}) - "
-                                  f"{format_card_number_last4(tx.source.number)} - غیرفعال")
-            else:
-                source_display = (f"{tx.source.get_name_display()} ({tx.source.owner}) - "
-                                  f"{format_card_number_last4(tx.source.number)}")
-
-        destination_display = 'نامشخص'
-        if tx.destination:
-            if not tx.destination.active:
-                destination_display = (f"{tx.destination.get_name_display()} ({tx.destination.owner}) - "
-                                       f"{format_card_number_last4(tx.destination.number)} - غیرفعال")
-            else:
-                destination_display = (f"{tx.destination.get_name_display()} ({tx.destination.owner}) - "
-                                       f"{format_card_number_last4(tx.destination.number)}")
-
-        tag_names = ', '.join(
-            [
-                tag.name
-                for tag in tx.tags.all()
-            ]
+    # Totals only: nothing is paged or serialized row by row.
+    if request.GET.get('summary') == '1':
+        return JsonResponse(
+            {
+                'summary': report.get_or_compute(
+                    'summary',
+                    lambda: get_report_summary(report.queryset),
+                ),
+            },
         )
 
-        transactions_list.append({
-            'id': tx.id,
-            'date': jalali_dt,
-            'kind': tx.kind,
-            'kind_display': tx.get_kind_display(),
-            'category_name': tx.category.name if tx.category else '---',
-            'amount': tx.amount,
-            'amount_formatted': amount_formatted,
-            'source_card_name': source_display,
-            'destination_card_name': destination_display,
-            'description': tx.description,
-            'tag_names': tag_names,
-        })
+    try:
+        rows, next_cursor = report.get_page(
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request.GET),
+        )
+    except ValueError:
+        return JsonResponse(
+            {
+                'transactions': [],
+                'error': 'نشانگر صفحه نامعتبر است.',
+            },
+            status=400,
+        )
+
+    totals = report.get_totals()
+
+    total_amount = None
+    if report.transaction_type:
+        total_amount = totals['total']
 
     return JsonResponse(
         {
-            'transactions': transactions_list,
+            'transactions': get_columnar_payload(rows)
+            if is_columnar(request.GET) else [get_report_row(row) for row in rows],
+            'next_cursor': next_cursor,
+            'total_count': totals['count'],
             'total_amount': total_amount,
             'total_amount_formatted': format_currency(total_amount)
-            if total_amount is not None else None
+            if total_amount is not None else None,
+            'commission_summary': report.get_or_compute(
+                'commission-summary',
+                lambda: get_commission_summary(report.queryset),
+            ),
         },
     )
 
 
 @login_required
 @require_http_methods(["GET"])
-def export_transactions_excel(request):
-    transaction_type = request.GET.get('type')
-    category_id = request.GET.get('category')
-    source_card_id = request.GET.get('source')
-    destination_card_id = request.GET.get('destination')
-    report_type = request.GET.get('report_type')
-    tag_id = request.GET.get('tag')
-    day = request.GET.get('day')
-    month = request.GET.get('month')
-    year = request.GET.get('year')
-
-    queryset = Transaction.objects.select_related(
-        'category',
-        'source',
-        'destination',
-    ).prefetch_related('tags').all()
-
-    if transaction_type and transaction_type != 'all':
-        queryset = queryset.filter(kind=transaction_type)
-    if category_id and category_id != 'all':
-        queryset = queryset.filter(category_id=category_id)
-    if tag_id and tag_id != 'all':
-        queryset = queryset.filter(tags__id=tag_id)
-    if source_card_id and source_card_id != 'all':
-        queryset = queryset.filter(source_id=source_card_id)
-    if destination_card_id and destination_card_id != 'all':
-        queryset = queryset.filter(destination_id=destination_card_id)
-
-    start_date_gregorian, end_date_gregorian = None, None
-    report_type_display = 'کل-تاریخ‌ها'
-    date_part = ''
+@conditional_on_data
+def search_transactions_ajax(request):
+    query = request.GET.get('q', '').strip()
 
     try:
-        jdate = jdatetime_date if 'jdatetime_date' in globals() else jdatetime.date
-
-        int_year = int(year) if year else None
-        int_month = int(month) if month else None
-        int_day = int(day) if day else None
-
-        if report_type == 'daily' and int_year and int_month and int_day:
-            jalali_date = jdate(
-                int_year,
-                int_month,
-                int_day,
-            )
-            start_date_gregorian = jalali_date.togregorian()
-            end_date_gregorian = start_date_gregorian
-            report_type_display = 'روزانه'
-            date_part = f"{int_day}-{int_month}-{int_year}"
-
-        elif report_type == 'monthly' and int_year and int_month:
-            start_jalali = jdate(
-                int_year,
-                int_month,
-                1,
-            )
-            start_date_gregorian = start_jalali.togregorian()
-            try:
-                end_jalali = jdate(
-                    int_year,
-                    int_month,
-                    31,
-                )
-            except ValueError:
-                try:
-                    end_jalali = jdate(
-                        int_year,
-                        int_month,
-                        30,
-                    )
-                except ValueError:
-                    end_jalali = jdate(
-                        int_year,
-                        int_month,
-                        29,
-                    )
-            end_date_gregorian = end_jalali.togregorian()
-            report_type_display = 'ماهانه'
-            date_part = f"{int_month}-{int_year}"
-
-        elif report_type == 'annual' and int_year:
-            start_date_gregorian = jdate(
-                int_year,
-                1,
-                1,
-            ).togregorian()
-            try:
-                end_date_gregorian = jdate(
-                    int_year,
-                    12,
-                    30,
-                ).togregorian()
-            except ValueError:
-                end_date_gregorian = jdate(
-                    int_year,
-                    12,
-                    29,
-                ).togregorian()
-            report_type_display = 'سالانه'
-            date_part = f"{int_year}"
-
-        if start_date_gregorian and end_date_gregorian:
-            end_date_with_time = end_date_gregorian + timezone.timedelta(days=1)
-            queryset = queryset.filter(
-                date__gte=start_date_gregorian,
-                date__lt=end_date_with_time,
-            )
-    except (ValueError, TypeError):
-        queryset = Transaction.objects.none()
+        limit = min(int(request.GET.get('limit', 100)), 500)
+    except ValueError:
+        limit = 100
 
-    total_amount = None
-    if transaction_type and transaction_type != 'all':
-        total_sum = queryset.aggregate(total=Sum('amount'))
-        if total_sum and total_sum['total'] is not None:
-            total_amount = total_sum['total']
+    if not query:
+        return JsonResponse(
+            {
+                'transactions': [],
+                'error': 'عبارت جستجو الزامی است.',
+            },
+            status=400,
+        )
 
-    transactions = queryset.order_by('-date')
+    queryset = apply_report_filters(
+        Transaction.objects.all(),
+        request.GET,
+    )
+
+    rows = get_transaction_rows(search_transactions(queryset, query)[:limit])
+
+    return JsonResponse(
+        {
+            'transactions': get_columnar_payload(rows)
+            if is_columnar(request.GET) else [get_report_row(row) for row in rows],
+            'query': query,
+            'total': len(rows),
+        },
+    )
+
+
+def get_period_file_name_part(report):
+    if not report.anchor:
+        return 'کل-تاریخ‌ها'
+
+    return f"{REPORT_TYPE_LABELS[report.report_type]}-{get_anchor_label(report.anchor)}"
+
+
+def prepare_export(params):
+    """(ReportFilter, whether a totals row is due, file name without extension, error message) for an export request.
+
+    The error is the ReportFilter's: a malformed filter or date is refused
+    rather than exported unfiltered or empty.
+    """
+    report = ReportFilter(params)
+    if report.error:
+        return report, False, None, report.error
+
+    # Amounts of different kinds are only summed for a single-kind export.
+    with_total = bool(report.transaction_type)
 
-    kind_choices_map = dict(TRANSACTION_AND_KIND_CHOICES)
     file_name_parts = ['گزارش']
 
-    if transaction_type and transaction_type != 'all':
-        kind_name = kind_choices_map.get(transaction_type, 'نامشخص')
-        file_name_parts.append(kind_name)
+    if with_total:
+        file_name_parts.append(KIND_DISPLAY.get(report.transaction_type, 'نامشخص'))
+
+    file_name_parts.append(get_period_file_name_part(report))
+    file_name = "-".join(file_name_parts).replace(" ", "_")
+
+    return report, with_total, file_name, None
 
-    final_report_type_part = report_type_display
-    if date_part:
-        final_report_type_part += f"-{date_part}"
 
-    file_name_parts.append(final_report_type_part)
-    filename = "-".join(file_name_parts) + ".xlsx"
-    filename = filename.replace(" ", "_")
+def get_export_cells(index, row):
+    """One sheet/CSV row, in EXCEL_COLUMNS order."""
+    return [
+        index,
+        get_jalali_date(row['date']),
+        row['kind_display'],
+        int(row['amount']),
+        int(row['commission']),
+        row['category__name'] or '---',
+        ', '.join(row['tags']),
+        row['source_label'] or 'نامشخص',
+        row['destination_label'] or 'نامشخص',
+        row['description'],
+    ]
+
+
+def get_export_record(row):
+    """One NDJSON record: raw values, with ids next to the display names."""
+    return {
+        'id': row['id'],
+        'date': get_jalali_date(row['date']),
+        'kind': row['kind'],
+        'kind_display': row['kind_display'],
+        'amount': int(row['amount']),
+        'commission': int(row['commission']),
+        'category_id': row['category_id'],
+        'category': row['category__name'],
+        'tag_ids': row['tag_ids'],
+        'tags': row['tags'],
+        'source_id': row['source_id'],
+        'source': row['source_label'],
+        'destination_id': row['destination_id'],
+        'destination': row['destination_label'],
+        'description': row['description'],
+    }
 
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="{escape_uri_path(filename)}"'
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "گزارش تراکنش‌ها"
+def write_excel_export(rows, with_total, file):
+    # write_only keeps only the current row in memory and spills the sheet
+    # to a temp file while it is built.
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("گزارش تراکنش‌ها")
     ws.sheet_view.rightToLeft = True
 
-    columns = [
-        'ردیف',
-        'تاریخ',
-        'نوع تراکنش',
-        'مبلغ (تومان)',
-        'دسته‌بندی',
-        'تگ‌ها',
-        'حساب مبدأ',
-        'حساب مقصد',
-        'توضیحات',
-    ]
-    ws.append(columns)
-
-    current_row = ws.max_row
-    for index, tx in enumerate(transactions, start=1):
-        current_row += 1
-        source_display = 'نامشخص'
-        if tx.source:
-            if not tx.source.active:
-                source_display = (f"{tx.source.get_name_display()} ({tx.source.owner}) - "
-                                  f"{format_card_number_last4(tx.source.number)} - غیرفعال")
-            else:
-                source_display = (f"{tx.source.get_name_display()} ({tx.source.owner}) - "
-                                  f"{format_card_number_last4(tx.source.number)}")
-
-        destination_display = 'نامشخص'
-        if tx.destination:
-            if not tx.destination.active:
-                destination_display = (f"{tx.destination.get_name_display()} ({tx.destination.owner}) - "
-                                       f"{format_card_number_last4(tx.destination.number)} - غیرفعال")
-            else:
-                destination_display = (f"{tx.destination.get_name_display()} ({tx.destination.owner}) - "
-                                       f"{format_card_number_last4(tx.destination.number)}")
-
-        jalali_dt = get_jalali_date(tx.date)
-
-        tag_names = ', '.join(
-            [
-                tag.name
-                for tag in tx.tags.all()
-            ]
+    # Column widths must be set before the first row in write-only mode.
+    for col_idx, column in enumerate(EXCEL_COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = len(column) + 5
+
+    ws.append(EXCEL_COLUMNS)
+
+    row_count, total_amount = 0, 0
+    for row_count, row in enumerate(rows, start=1):
+        ws.append(get_export_cells(row_count, row))
+        total_amount += row['amount']
+
+    if with_total and row_count:
+        bold_font = Font(bold=True)
+
+        label_cell = WriteOnlyCell(ws, value='جمع مبالغ:')
+        label_cell.font = bold_font
+        label_cell.alignment = Alignment(horizontal='left')
+
+        amount_cell = WriteOnlyCell(ws, value=int(total_amount))
+        amount_cell.font = bold_font
+        amount_cell.number_format = '#,##0'
+
+        # One blank row after the header and the transactions, as before.
+        totals_row = row_count + 3
+        ws.append([])
+        ws.append([label_cell, None, None, amount_cell])
+        ws.merged_cells.add(f'A{totals_row}:C{totals_row}')
+
+    wb.save(file)
+
+
+def iter_report_rows(report):
+    """report.iter_rows(), which only starts querying once the first row is asked for.
+
+    Streamed exports pass it in, so the response and its first chunk go out
+    before the rows are read.
+    """
+    yield from report.iter_rows(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_csv_export(rows, with_total):
+    """Encoded CSV chunks of EXPORT_CHUNK_SIZE rows; the BOM and header go out before the query runs."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    # The BOM makes Excel read the file as UTF-8 instead of the ANSI code page.
+    buffer.write('\ufeff')
+    writer.writerow(EXCEL_COLUMNS)
+    yield flush()
+
+    row_count, total_amount = 0, 0
+    for row_count, row in enumerate(rows, start=1):
+        writer.writerow(get_export_cells(row_count, row))
+        total_amount += row['amount']
+        if row_count % EXPORT_CHUNK_SIZE == 0:
+            yield flush()
+
+    if with_total and row_count:
+        writer.writerow([])
+        writer.writerow(['جمع مبالغ:', '', '', int(total_amount)])
+    yield flush()
+
+
+def stream_ndjson_export(rows):
+    """One JSON object per line in chunks of EXPORT_CHUNK_SIZE rows; no BOM, which JSON parsers reject."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, EXPORT_CHUNK_SIZE)):
+        yield ''.join(
+            json.dumps(get_export_record(row), ensure_ascii=False) + '\n'
+            for row in chunk
+        ).encode('utf-8')
+
+
+def write_export_file(report, with_total, export_format, file, progress):
+    """Writes the whole export to ``file``, calling ``progress(done, total)`` every EXPORT_CHUNK_SIZE rows."""
+    total = report.get_totals()['count']
+    progress(0, total)
+
+    def tracked_rows():
+        rows = report.iter_rows(chunk_size=EXPORT_CHUNK_SIZE)
+        for done, row in enumerate(rows, start=1):
+            yield row
+            if done % EXPORT_CHUNK_SIZE == 0:
+                progress(done, total)
+
+    if export_format == 'xlsx':
+        write_excel_export(tracked_rows(), with_total, file)
+    else:
+        if export_format == 'csv':
+            chunks = stream_csv_export(tracked_rows(), with_total)
+        else:
+            chunks = stream_ndjson_export(tracked_rows())
+        for chunk in chunks:
+            file.write(chunk)
+    progress(total, total)
+
+
+def get_export_format(params):
+    export_format = params.get('format') or 'xlsx'
+    return export_format if export_format in EXPORT_CONTENT_TYPES else None
+
+
+def get_attachment_header(file_name):
+    return f'attachment; filename="{escape_uri_path(file_name)}"'
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_transactions_excel(request):
+    export_format = get_export_format(request.GET)
+    if export_format is None:
+        return JsonResponse(
+            {
+                'error': 'قالب خروجی نامعتبر است.',
+            },
+            status=400,
         )
 
-        row = [
-            index,
-            jalali_dt,
-            tx.get_kind_display(),
-            float(tx.amount),
-            tx.category.name if tx.category else '---',
-            tag_names,
-            source_display,
-            destination_display,
-            tx.description,
-        ]
-        ws.append(row)
+    report, with_total, file_name, error = prepare_export(request.GET)
+    if error:
+        return JsonResponse(
+            {
+                'error': error,
+            },
+            status=400,
+        )
 
-    if total_amount is not None:
-        current_row += 2
+    # A background job may already have built this very report.
+    job = read_job(get_job_id(export_format, report.key))
+    if job and job['status'] == 'done' and is_job_usable(job):
+        response = FileResponse(
+            open(get_artifact_path(job['id'], export_format), 'rb'),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+    elif export_format == 'xlsx':
+        spool = tempfile.TemporaryFile()
+        write_excel_export(
+            report.iter_rows(chunk_size=EXPORT_CHUNK_SIZE),
+            with_total,
+            spool,
+        )
+        spool.seek(0)
+        response = FileResponse(
+            spool,
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+    else:
+        rows = iter_report_rows(report)
+        if export_format == 'csv':
+            chunks = stream_csv_export(rows, with_total)
+        else:
+            chunks = stream_ndjson_export(rows)
+        response = StreamingHttpResponse(
+            chunks,
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
 
-        start_cell_merge = f'A{current_row}'
-        amount_cell = f'D{current_row}'
-        end_cell_merge = f'C{current_row}'
+    response['Content-Disposition'] = get_attachment_header(f"{file_name}.{export_format}")
+    return response
 
-        ws[start_cell_merge] = 'جمع مبالغ:'
-        ws[amount_cell] = float(total_amount)
 
-        ws.merge_cells(f'{start_cell_merge}:{end_cell_merge}')
+def get_job_payload(job):
+    done, total = job['done'], job['total']
+    payload = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'done': done,
+        'total': total,
+        'percent': 100 if job['status'] == 'done' else int(done * 100 / total) if total else 0,
+        'status_url': reverse('export_job_status', args=[job['id']]),
+    }
+    if job['status'] == 'done':
+        payload['download_url'] = reverse('download_export_job', args=[job['id']])
+    if job['status'] == 'failed':
+        payload['error'] = 'ساخت فایل خروجی با خطا مواجه شد.'
+    return payload
 
-        bold_font = Font(bold=True)
 
-        ws[start_cell_merge].font = bold_font
-        ws[amount_cell].font = bold_font
+@login_required
+@require_http_methods(["POST"])
+def start_export_job(request):
+    export_format = get_export_format(request.POST)
+    if export_format is None:
+        return JsonResponse(
+            {
+                'error': 'قالب خروجی نامعتبر است.',
+            },
+            status=400,
+        )
 
-        ws[start_cell_merge].alignment = Alignment(horizontal='left')
+    report, with_total, file_name, error = prepare_export(request.POST)
+    if error:
+        return JsonResponse(
+            {
+                'error': error,
+            },
+            status=400,
+        )
+    job = submit_export_job(
+        get_job_id(export_format, report.key),
+        export_format,
+        f"{file_name}.{export_format}",
+        partial(write_export_file, report, with_total, export_format),
+    )
+    return JsonResponse(
+        get_job_payload(job),
+        status=200 if job['status'] == 'done' else 202,
+    )
 
-        ws[amount_cell].number_format = '#,##0'
 
-    for col_idx, column in enumerate(columns, 1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = len(column) + 5
+@login_required
+@require_http_methods(["GET"])
+def export_job_status(request, job_id):
+    job = read_job(job_id)
+    if job is None:
+        return JsonResponse(
+            {
+                'error': 'درخواست خروجی یافت نشد.',
+            },
+            status=404,
+        )
+    return JsonResponse(get_job_payload(job))
+
+
+@login_required
+@require_http_methods(["GET"])
+def download_export_job(request, job_id):
+    job = read_job(job_id)
+    if job is None or job['status'] != 'done' or not is_job_usable(job):
+        return JsonResponse(
+            {
+                'error': 'فایل خروجی آماده نیست.',
+            },
+            status=404,
+        )
+
+    response = FileResponse(
+        open(get_artifact_path(job['id'], job['format']), 'rb'),
+        content_type=EXPORT_CONTENT_TYPES[job['format']],
+    )
+    response['Content-Disposition'] = get_attachment_header(job['file_name'])
+    return response
+
+
+def prepare_pivot(params):
+    """(ReportFilter, dimension, error message) for a pivot request; the kind defaults to expenses."""
+    dimension = params.get('dimension', 'category')
+    if dimension not in PIVOT_DIMENSIONS:
+        return None, None, 'محور گزارش نامعتبر است.'
+
+    params = params.copy()
+    if params.get('type') in (None, '', 'all'):
+        params['type'] = 'E'
+    if params['type'] not in KIND_DISPLAY:
+        return None, None, 'نوع تراکنش نامعتبر است.'
+
+    report = ReportFilter(params)
+    return report, dimension, report.error
+
+
+def get_pivot_payload(report, dimension):
+    return report.get_or_compute(
+        f'pivot-{dimension}',
+        lambda: get_pivot(report.queryset, dimension, report.date_range),
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+@conditional_on_data
+def pivot_report_api(request):
+    report, dimension, error = prepare_pivot(request.GET)
+    if error:
+        return JsonResponse(
+            {
+                'error': error,
+            },
+            status=400,
+        )
+
+    return JsonResponse(
+        {
+            'kind': report.transaction_type,
+            'kind_display': KIND_DISPLAY[report.transaction_type],
+            **get_pivot_payload(report, dimension),
+        }
+    )
+
+
+def get_pivot_table(pivot):
+    """Header, one row per pivot row and the totals row, as sheet/CSV rows."""
+    return [
+        [pivot['row_header'], *(column['label'] for column in pivot['columns']), 'جمع'],
+        *([row['label'], *row['values'], row['total']] for row in pivot['rows']),
+        [pivot['totals_label'], *pivot['column_totals'], pivot['grand_total']],
+    ]
+
+
+def write_pivot_excel(table, file):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("گزارش تجمیعی")
+    ws.sheet_view.rightToLeft = True
+
+    ws.column_dimensions['A'].width = 40
+    for col_idx in range(2, len(table[0]) + 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 16
+
+    bold_font = Font(bold=True)
+    last_index = len(table) - 1
+    for index, values in enumerate(table):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            if isinstance(value, int):
+                cell.number_format = '#,##0'
+            if index in (0, last_index):
+                cell.font = bold_font
+            cells.append(cell)
+        ws.append(cells)
+
+    wb.save(file)
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_pivot_report(request):
+    export_format = request.GET.get('format', 'xlsx')
+    if export_format not in ('xlsx', 'csv'):
+        return JsonResponse(
+            {
+                'error': 'قالب خروجی نامعتبر است.',
+            },
+            status=400,
+        )
+
+    report, dimension, error = prepare_pivot(request.GET)
+    if error:
+        return JsonResponse(
+            {
+                'error': error,
+            },
+            status=400,
+        )
+
+    table = get_pivot_table(get_pivot_payload(report, dimension))
+
+    if export_format == 'xlsx':
+        spool = tempfile.TemporaryFile()
+        write_pivot_excel(table, spool)
+        spool.seek(0)
+        response = FileResponse(
+            spool,
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+    else:
+        buffer = io.StringIO()
+        # The BOM makes Excel read the file as UTF-8 instead of the ANSI code page.
+        buffer.write('\ufeff')
+        csv.writer(buffer).writerows(table)
+        response = HttpResponse(
+            buffer.getvalue().encode('utf-8'),
+            content_type=EXPORT_CONTENT_TYPES[export_format],
+        )
+
+    file_name = "-".join(
+        [
+            'گزارش-تجمیعی',
+            PIVOT_DIMENSIONS[dimension][0],
+            KIND_DISPLAY[report.transaction_type],
+            get_period_file_name_part(report),
+        ]
+    ).replace(" ", "_")
 
-    wb.save(response)
-    return response
\ No newline at end of file
+    response['Content-Disposition'] = get_attachment_header(f"{file_name}.{export_format}")
+    return response
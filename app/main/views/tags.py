@@ -5,6 +5,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from ..models import Tag
+from ..caching import conditional_on_data
 
 
 @login_required
@@ -23,6 +24,7 @@ def tags(request):
 
 
 @login_required()
+@conditional_on_data
 def get_all_tags(request):
     if request.method == 'GET' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         try:
@@ -1,6 +1,7 @@
-import datetime
 import jdatetime
 from decimal import Decimal
+from zipfile import BadZipFile
+from openpyxl.utils.exceptions import InvalidFileException
 from django.shortcuts import render
 from django.db import transaction
 from django.utils import timezone
@@ -11,18 +12,41 @@ from ..models import (
     Card,
     Category,
     Transaction,
+    MonthlyCategoryTotal,
 )
+from ..ledger import (
+    record_transaction,
+    reverse_transaction,
+)
+from ..periods import get_period_range
 from ..utils import (
     MONTHS_NAME,
     get_jalali_date,
     format_currency,
     get_month_year_list,
-    format_card_number_last4,
-    extract_commission_from_description,
 )
+from ..serializers import (
+    is_columnar,
+    get_card_label,
+    get_columnar_payload,
+)
+from ..pagination import (
+    get_page_size,
+    get_keyset_page,
+)
+from ..importer import (
+    read_rows,
+    import_transactions,
+)
+from ..caching import conditional_on_data
+
+
+# Errors returned to the browser for a rejected import; the rest are only counted.
+IMPORT_ERRORS_SHOWN = 50
 
 
 @login_required
+@conditional_on_data
 def get_transaction_details_by_id(request):
     if request.method == 'GET' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         transaction_id = request.GET.get('transaction_id')
@@ -34,19 +58,8 @@ def get_transaction_details_by_id(request):
                 'category',
             ).get(pk=transaction_id)
 
-            source_name = "نامشخص"
-            if t.source:
-                source_name = (f"{t.source.get_name_display()} ({t.source.owner}) - "
-                               f"{format_card_number_last4(t.source.number)}")
-                if not t.source.active:
-                    source_name += " - غیرفعال"
-
-            destination_name = "نامشخص"
-            if t.destination:
-                destination_name = (f"{t.destination.get_name_display()} ({t.destination.owner}) - "
-                                    f"{format_card_number_last4(t.destination.number)}")
-                if not t.destination.active:
-                    destination_name += " - غیرفعال"
+            source_name = get_card_label(t.source) if t.source else "نامشخص"
+            destination_name = get_card_label(t.destination) if t.destination else "نامشخص"
 
             description = t.description
             if len(description) > 50:
@@ -56,6 +69,7 @@ def get_transaction_details_by_id(request):
                 'id': t.id,
                 'kind': t.get_kind_display(),
                 'amount': format_currency(t.amount),
+                'commission': format_currency(t.commission) if t.commission else None,
                 'jalali_date': get_jalali_date(t.date),
                 'category_name': t.category.name,
                 'source_name': source_name,
@@ -96,52 +110,27 @@ def get_transaction_details_by_id(request):
     )
 
 
-def get_transaction_details(transactions_queryset):
-    transaction_data = []
-
-    for t in transactions_queryset:
-        source_card = None
-        if t.source:
-            if not t.source.active:
-                source_card = (f"{t.source.get_name_display()} ({t.source.owner}) - "
-                               f"{format_card_number_last4(t.source.number)} - غیرفعال")
-            else:
-                source_card = (f"{t.source.get_name_display()} ({t.source.owner}) - "
-                               f"{format_card_number_last4(t.source.number)}")
-
-        destination_card = None
-        if t.destination:
-            if not t.destination.active:
-                destination_card = (f"{t.destination.get_name_display()} ({t.destination.owner}) - "
-                                    f"{format_card_number_last4(t.destination.number)} - غیرفعال")
-            else:
-                destination_card = (f"{t.destination.get_name_display()} ({t.destination.owner}) - "
-                                    f"{format_card_number_last4(t.destination.number)}")
-
-        transaction_tags = [tag.name for tag in t.tags.all()]
-
-        y, m, d = get_jalali_date(t.date).split('/')
-
-        data = {
-            'id': t.id,
-            'kind': t.get_kind_display(),
-            'amount_display': format_currency(t.amount),
-            'source_card': source_card,
-            'destination_card': destination_card,
-            'category_name': t.category.name if t.category else None,
-            'year': y,
-            'month': MONTHS_NAME[int(m) - 1],
-            'day': d,
-            'tags': transaction_tags,
-            'description': t.description,
-            'source_balance_after': format_currency(
-                t.source_balance_after) if t.source_balance_after is not None else None,
-            'destination_balance_after': format_currency(
-                t.destination_balance_after) if t.destination_balance_after is not None else None,
-        }
-        transaction_data.append(data)
-
-    return transaction_data
+def get_transaction_detail(row):
+    y, m, d = get_jalali_date(row['date']).split('/')
+
+    return {
+        'id': row['id'],
+        'kind': row['kind_display'],
+        'amount_display': format_currency(row['amount']),
+        'commission': format_currency(row['commission']) if row['commission'] else None,
+        'source_card': row['source_label'],
+        'destination_card': row['destination_label'],
+        'category_name': row['category__name'],
+        'year': y,
+        'month': MONTHS_NAME[int(m) - 1],
+        'day': d,
+        'tags': row['tags'],
+        'description': row['description'],
+        'source_balance_after': format_currency(
+            row['source_balance_after']) if row['source_balance_after'] is not None else None,
+        'destination_balance_after': format_currency(
+            row['destination_balance_after']) if row['destination_balance_after'] is not None else None,
+    }
 
 
 @login_required
@@ -150,40 +139,21 @@ def transactions(request):
 
     today_jalali = get_jalali_date(timezone.now())
 
-    first_day_greg = jdatetime.date(
+    month_start, month_end = get_period_range(
+        'month',
         current_year,
         current_month_index,
-        1,
-    ).togregorian()
-
-    if current_month_index == 12:
-        next_month_greg = jdatetime.date(
-            current_year + 1,
-            1,
-            1,
-        ).togregorian()
-    else:
-        next_month_greg = jdatetime.date(
-            current_year,
-            current_month_index + 1,
-            1,
-        ).togregorian()
-
-    last_day_greg = next_month_greg - datetime.timedelta(days=1)
+    )
 
     ta = Transaction.objects.filter(
-        date__range=[
-            first_day_greg,
-            last_day_greg,
-        ]
-    ).order_by(
-        '-date',
-        '-id',
+        date__gte=month_start,
+        date__lt=month_end,
     )
 
-    transaction_data = get_transaction_details(ta)
+    rows, next_cursor = get_keyset_page(ta)
+    transaction_data = [get_transaction_detail(row) for row in rows]
 
-    tac = len(transaction_data)
+    tac = ta.count()
 
     cards = Card.objects.filter(active=True)
     category = Category.objects.all()
@@ -192,6 +162,7 @@ def transactions(request):
         'transactions': transaction_data,
         'today_jalali': today_jalali,
         'total': tac,
+        'next_cursor': next_cursor,
         'category': category,
         'cards': cards,
         'MONTHS_NAME': months_list,
@@ -203,6 +174,7 @@ def transactions(request):
 
 
 @login_required
+@conditional_on_data
 def get_transactions_by_month(request):
     if not request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse(
@@ -224,43 +196,37 @@ def get_transactions_by_month(request):
                 status=400,
             )
 
-        year, month = int(year), int(month)
-        first_day_greg = jdatetime.date(
-            year,
-            month,
-            1,
-        ).togregorian()
-
-        if month == 12:
-            next_month_greg = jdatetime.date(
-                year + 1,
-                1,
-                1,
-            ).togregorian()
-        else:
-            next_month_greg = jdatetime.date(
-                year,
-                month + 1,
-                1,
-            ).togregorian()
-
-        last_day_greg = next_month_greg - datetime.timedelta(days=1)
+        month_start, month_end = get_period_range(
+            'month',
+            int(year),
+            int(month),
+        )
 
         ta = Transaction.objects.filter(
-            date__range=[
-                first_day_greg,
-                last_day_greg,
-            ]
-        ).order_by(
-            '-date',
-            '-id',
+            date__gte=month_start,
+            date__lt=month_end,
         )
-        transaction_data = get_transaction_details(ta)
+
+        try:
+            rows, next_cursor = get_keyset_page(
+                ta,
+                cursor=request.GET.get('cursor'),
+                page_size=get_page_size(request.GET),
+            )
+        except ValueError:
+            return JsonResponse(
+                {
+                    'error': 'نشانگر صفحه نامعتبر است.',
+                },
+                status=400,
+            )
 
         return JsonResponse(
             {
-                'transactions': transaction_data,
-                'total': len(transaction_data)
+                'transactions': get_columnar_payload(rows)
+                if is_columnar(request.GET) else [get_transaction_detail(row) for row in rows],
+                'total': ta.count(),
+                'next_cursor': next_cursor,
             },
         )
     except Exception as e:
@@ -392,35 +358,17 @@ def add_transaction(request):
                         status=400,
                     )
 
-                source_card.balance = current_balance - total_deduction
-                source_card.save()
-                source_balance_after = source_card.balance
-            else:
-                source_balance_after = None
-
-            if kind in ['I', 'T'] and destination_card:
-                current_balance = Decimal(destination_card.balance)
-
-                destination_card.balance = current_balance + amount
-                destination_card.save()
-                destination_balance_after = destination_card.balance
-            else:
-                destination_balance_after = None
-
-            if kind == 'T':
-                description += f" (کارمزد: {commission} ریال)"
-
             new_transaction = Transaction.objects.create(
                 kind=kind,
                 amount=amount,
+                commission=commission,
                 date=transaction_date_gregorian,
                 source=source_card if kind in ['E', 'T'] else None,
-                source_balance_after=source_balance_after,
                 destination=destination_card if kind in ['I', 'T'] else None,
-                destination_balance_after=destination_balance_after,
                 category=transaction_category,
                 description=description,
             )
+            record_transaction(new_transaction)
 
             if tag_ids_str:
                 tag_ids = [
@@ -431,6 +379,8 @@ def add_transaction(request):
                 if tag_ids:
                     new_transaction.tags.set(tag_ids)
 
+            MonthlyCategoryTotal.apply(new_transaction)
+
             return JsonResponse(
                 {
                     'success': True,
@@ -458,26 +408,8 @@ def delete_transaction(request):
     try:
         with transaction.atomic():
             t = Transaction.objects.select_for_update().get(pk=transaction_id)
-            commission = extract_commission_from_description(t.description)
-            kind, amount = t.kind, t.amount
-
-            match kind:
-                case 'E':
-                    if t.source:
-                        t.source.balance += amount
-                        t.source.save()
-                case 'I':
-                    if t.destination:
-                        t.destination.balance -= amount
-                        t.destination.save()
-                case 'T':
-                    if t.source:
-                        t.source.balance += amount
-                        t.source.balance += commission
-                        t.source.save()
-                    if t.destination:
-                        t.destination.balance -= amount
-                        t.destination.save()
+            reverse_transaction(t)
+            MonthlyCategoryTotal.apply(t, sign=-1)
             t.delete()
 
             return JsonResponse(
@@ -504,6 +436,53 @@ def delete_transaction(request):
         )
 
 
+@login_required
+@require_POST
+def import_transactions_file(request):
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse(
+            {
+                'success': False,
+                'errors': 'فایل CSV یا XLSX را انتخاب کنید.',
+            },
+            status=400,
+        )
+
+    try:
+        created, errors = import_transactions(
+            read_rows(upload, upload.name),
+            dry_run=request.POST.get('dry_run') == '1',
+        )
+    except (ValueError, BadZipFile, InvalidFileException) as e:
+        return JsonResponse(
+            {
+                'success': False,
+                'errors': str(e),
+            },
+            status=400,
+        )
+
+    if errors:
+        return JsonResponse(
+            {
+                'success': False,
+                'errors': errors[:IMPORT_ERRORS_SHOWN],
+                'error_count': len(errors),
+            },
+            status=400,
+        )
+
+    return JsonResponse(
+        {
+            'success': True,
+            'created': created,
+            'message': f'{created} تراکنش با موفقیت وارد شد.',
+        },
+    )
+
+
+@conditional_on_data
 def get_categories_by_kind(request):
     if request.method == 'GET' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         kind = request.GET.get('kind')